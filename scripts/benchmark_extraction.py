@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PDF extraction pipeline on synthetic flyers.
+
+This script:
+1. Builds synthetic art approval flyers with PyMuPDF (N pages, M images per page,
+   caption layout, duplicate ratio and image size are all parameters)
+2. Times each stage of extract_pdf_images_with_captions.py on them:
+   lines_from_page, images_from_page, find_caption_for_image, assign_captions,
+   categorize_image, update_college_config and a full extract_images_with_captions run
+3. Records the peak Python memory of each stage with tracemalloc
+4. Optionally times full runs over growing page counts (scaling curve)
+5. Writes everything as JSON and compares it against an earlier baseline
+
+Dependencies:
+    pip install PyMuPDF pandas numpy
+
+Usage:
+    # Record a baseline
+    python scripts/benchmark_extraction.py --out bench/baseline.json
+
+    # After a change: same parameters, compare against the baseline
+    python scripts/benchmark_extraction.py --out bench/new.json --compare bench/baseline.json
+
+    # Scaling curve up to a several-hundred-page catalogue
+    python scripts/benchmark_extraction.py --scale 10,50,100,200,400 --out bench/scaling.json
+
+Key Options:
+    --pages / --images: flyer size (default 20 pages x 8 images)
+    --layout: below, above, mixed or sparse (every 5th image has no caption)
+    --dup_ratio: fraction of images that repeat an earlier image (default 0.2)
+    --image_px: image width in pixels (height is 1.25x) (default 300)
+    --repeat: timed runs per stage, the fastest counts (default 3)
+    --scale: comma separated page counts for the scaling curve
+    --compare: baseline JSON to compare against
+    --threshold: slowdown ratio reported as a regression (default 0.10 = 10%)
+
+Note:
+    tracemalloc only sees allocations made through Python; memory used inside
+    MuPDF itself is not included in the peaks. Timings use the fastest of
+    --repeat runs; memory is measured in one extra run so it doesn't slow the
+    timed ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import extract_pdf_images_with_captions as extractor  # noqa: E402
+
+# ----------------------------
+# Synthetic flyers
+# ----------------------------
+
+CAPTION_LAYOUTS = ("below", "above", "mixed", "sparse")
+
+# Product descriptions spread over the categorization rules
+PRODUCTS = [
+    "Custom DTF on Maroon", "Jr Socrates DTF on Steel", "Custom Logo Maroon Beanie",
+    "Custom Hood Pullover", "Custom DTF Gray Jogger", "Banner 3x5", "Custom Logo Socks",
+    "Custom Logo White or Gray", "Fleece Jacket", "Youth Tee", "Plush Bear", "Water Bottle",
+    "Car Magnet", "Die Cut Sticker", "Side Print Shorts", "Flannels Red Plaid", "Backpack Navy",
+]
+
+def make_image(rng: random.Random, width: int) -> bytes:
+    """Blocky RGB mockup: an 8x10 grid of random colours scaled up to width."""
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    height = int(width * 1.25)
+    grid = np.array([rng.randrange(256) for _ in range(8 * 10 * 3)], dtype=np.uint8).reshape(10, 8, 3)
+    pixels = np.repeat(np.repeat(grid, -(-height // 10), axis=0)[:height], -(-width // 8), axis=1)[:, :width]
+    pix = fitz.Pixmap(fitz.csRGB, width, height, np.ascontiguousarray(pixels).tobytes(), 0)
+    return pix.tobytes("png")
+
+def build_flyer(
+    path: Path,
+    pages: int = 20,
+    images_per_page: int = 8,
+    layout: str = "below",
+    dup_ratio: float = 0.2,
+    image_px: int = 300,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """
+    Write a synthetic flyer: images on a 4-column grid, each with an M-code
+    caption below or above it (per layout). A dup_ratio share of the images
+    reuse an earlier image's bytes. Returns counts of what was placed.
+    """
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    pool: List[bytes] = []
+    placed = captioned = 0
+    columns = 4
+    rows = -(-images_per_page // columns)
+    cell_w = 552 / columns
+    cell_h = 720 / rows
+    for pno in range(pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((30, 30), f"Art approval page {pno + 1}", fontsize=12)
+        for i in range(images_per_page):
+            col, row = i % columns, i // columns
+            x0 = 30 + col * cell_w
+            y0 = 50 + row * cell_h
+            rect = fitz.Rect(x0 + 5, y0 + 14, x0 + cell_w - 5, y0 + cell_h - 16)
+            if pool and rng.random() < dup_ratio:
+                data = rng.choice(pool)
+            else:
+                data = make_image(rng, image_px)
+                pool.append(data)
+            page.insert_image(rect, stream=data, keep_proportion=False)
+            placed += 1
+
+            if layout == "sparse" and placed % 5 == 0:
+                continue
+            above = layout == "above" or (layout == "mixed" and i % 2)
+            baseline = rect.y0 - 4 if above else rect.y1 + 9
+            caption = f"M10{placed:07d} SH2FDC {PRODUCTS[placed % len(PRODUCTS)]}"
+            page.insert_text((rect.x0, baseline), caption, fontsize=5)
+            captioned += 1
+    doc.save(path.as_posix(), deflate=True)
+    doc.close()
+    return {"pages": pages, "images": placed, "unique_images": len(pool), "captions": captioned}
+
+# ----------------------------
+# Measurement
+# ----------------------------
+
+def measure(fn: Callable[[], Any], repeat: int = 3, memory: bool = True) -> Dict[str, Any]:
+    """
+    Time fn() repeat times (stdout discarded) and, if memory is set, run it
+    once more under tracemalloc. Returns seconds (min/median) and peak KiB.
+    """
+    times = []
+    for _ in range(repeat):
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    result: Dict[str, Any] = {
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "runs": repeat,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            with redirect_stdout(io.StringIO()):
+                fn()
+            result["peak_kib"] = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+def make_project(root: Path) -> Path:
+    """Minimal project tree (scripts/, src/config/colleges/, public/) for config and extraction runs."""
+    (root / "scripts").mkdir(parents=True, exist_ok=True)
+    (root / "public" / "Bench").mkdir(parents=True, exist_ok=True)
+    config_dir = root / "src" / "config" / "colleges"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    config = {"name": "Bench", "logo": "/logo/bench.png", "categories": [{"name": "Beanies", "path": "beanie", "images": []}]}
+    with open(config_dir / "bench.json", "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return root / "scripts"
+
+def benchmark_stages(pdf_path: Path, work_dir: Path, repeat: int) -> Dict[str, Any]:
+    """Time every pipeline stage on one flyer; returns {stage: measurement}."""
+    import fitz  # PyMuPDF
+    import pandas as pd
+
+    doc = fitz.open(pdf_path.as_posix())
+    pages = [doc[pno] for pno in range(doc.page_count)]
+    parsed = [(page.rect.height, extractor.lines_from_page(page), extractor.images_from_page(page)) for page in pages]
+    captions = [text for _, lines, _ in parsed for text, _ in lines]
+    n_images = sum(len(images) for _, _, images in parsed)
+
+    def categorize_all() -> None:
+        extractor._category_rules = None  # cold: compile rules, empty memo
+        for caption in captions:
+            extractor.categorize_image(caption)
+
+    def find_each() -> None:
+        for height, lines, images in parsed:
+            for placement in images:
+                extractor.find_caption_for_image(placement["bbox"], lines, height)
+
+    def assign_pages() -> None:
+        for _, lines, images in parsed:
+            extractor.assign_captions([p["bbox"] for p in images], lines)
+
+    script_dir = make_project(work_dir / "project")
+    outdir = script_dir.parent / "public" / "Bench"
+
+    def extract_full() -> None:
+        shutil.rmtree(outdir, ignore_errors=True)
+        extractor.extract_images_with_captions(pdf_path, outdir, cache=None, store=None)
+
+    stages: Dict[str, Any] = {}
+    stages["lines_from_page"] = measure(lambda: [extractor.lines_from_page(p) for p in pages], repeat)
+    stages["images_from_page"] = measure(lambda: [extractor.images_from_page(p) for p in pages], repeat)
+    stages["find_caption_for_image"] = measure(find_each, repeat)
+    stages["assign_captions"] = measure(assign_pages, repeat)
+    stages["categorize_image"] = measure(categorize_all, repeat)
+    stages["extract_images_with_captions"] = measure(extract_full, repeat)
+
+    df = pd.read_csv(outdir / "manifest.csv")
+    category_image_map, hood_only_images = extractor.build_category_image_map(df)
+    stages["update_college_config"] = measure(
+        lambda: extractor.update_college_config("bench", category_image_map, script_dir, hood_only_images), repeat,
+    )
+    doc.close()
+
+    items = {
+        "lines_from_page": len(pages), "images_from_page": len(pages),
+        "find_caption_for_image": n_images, "assign_captions": len(pages),
+        "categorize_image": len(captions), "extract_images_with_captions": len(pages),
+        "update_college_config": int(len(df)),
+    }
+    for name, count in items.items():
+        stages[name]["items"] = count
+    return stages
+
+def benchmark_scaling(page_counts: List[int], params: Dict[str, Any], work_dir: Path) -> List[Dict[str, Any]]:
+    """Full extraction time and peak memory for flyers of growing page counts."""
+    curve = []
+    script_dir = make_project(work_dir / "scaling")
+    outdir = script_dir.parent / "public" / "Bench"
+    for pages in page_counts:
+        pdf_path = work_dir / f"scale_{pages}.pdf"
+        counts = build_flyer(pdf_path, pages=pages, **params)
+
+        def extract_full() -> None:
+            shutil.rmtree(outdir, ignore_errors=True)
+            extractor.extract_images_with_captions(pdf_path, outdir, cache=None, store=None)
+
+        point = measure(extract_full, repeat=1)
+        point.update(counts)
+        point["seconds_per_page"] = point["seconds_min"] / pages
+        print(f"  {pages:>5} pages: {point['seconds_min']:.2f}s ({point['seconds_per_page'] * 1000:.1f} ms/page, "
+              f"peak {point['peak_kib'] / 1024:.1f} MiB)")
+        curve.append(point)
+    return curve
+
+# ----------------------------
+# Reporting
+# ----------------------------
+
+def print_stages(stages: Dict[str, Any]) -> None:
+    print(f"\n{'Stage':<32}{'items':>7}{'min s':>10}{'median s':>10}{'µs/item':>10}{'peak KiB':>10}")
+    print("-" * 79)
+    for name, m in stages.items():
+        per_item = m["seconds_min"] / max(1, m["items"]) * 1e6
+        print(f"{name:<32}{m['items']:>7}{m['seconds_min']:>10.4f}{m['seconds_median']:>10.4f}"
+              f"{per_item:>10.1f}{m.get('peak_kib', 0):>10}")
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print current vs baseline per stage (and per scaling point); returns the regressed names."""
+    if current["params"] != baseline.get("params"):
+        print("⚠️  Flyer parameters differ from the baseline - timings are not directly comparable")
+    regressions = []
+    rows = [(name, m, baseline.get("stages", {}).get(name)) for name, m in current["stages"].items()]
+    old_curve = {p["pages"]: p for p in baseline.get("scaling", [])}
+    rows += [(f"scaling/{p['pages']}p", p, old_curve.get(p["pages"])) for p in current.get("scaling", [])]
+
+    print(f"\n{'Stage':<32}{'baseline s':>12}{'current s':>12}{'ratio':>8}{'peak Δ KiB':>12}")
+    print("-" * 76)
+    for name, new, old in rows:
+        if not old:
+            print(f"{name:<32}{'-':>12}{new['seconds_min']:>12.4f}")
+            continue
+        ratio = new["seconds_min"] / old["seconds_min"] if old["seconds_min"] else float("inf")
+        peak_delta = new.get("peak_kib", 0) - old.get("peak_kib", 0)
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠️  slower"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  ✓ faster"
+        print(f"{name:<32}{old['seconds_min']:>12.4f}{new['seconds_min']:>12.4f}{ratio:>8.2f}{peak_delta:>+12}{flag}")
+    return regressions
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extract_pdf_images_with_captions.py on synthetic flyers.")
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the stage benchmark flyer")
+    parser.add_argument("--images", type=int, default=8, help="Images per page")
+    parser.add_argument("--layout", choices=CAPTION_LAYOUTS, default="mixed", help="Caption placement relative to the images")
+    parser.add_argument("--dup_ratio", type=float, default=0.2, help="Fraction of images that repeat an earlier image")
+    parser.add_argument("--image_px", type=int, default=300, help="Image width in pixels")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the flyer contents")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (fastest counts)")
+    parser.add_argument("--scale", type=str, default="", help="Comma separated page counts for a scaling curve, e.g. 10,50,100,300")
+    parser.add_argument("--out", type=str, default=None, help="Write results to this JSON file")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Report stages more than this fraction slower as regressions")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated PDFs and output (prints the folder)")
+    args = parser.parse_args()
+
+    import fitz  # PyMuPDF
+
+    flyer = {"images_per_page": args.images, "layout": args.layout, "dup_ratio": args.dup_ratio,
+             "image_px": args.image_px, "seed": args.seed}
+    work_dir = Path(tempfile.mkdtemp(prefix="extract-bench-"))
+    try:
+        pdf_path = work_dir / "flyer.pdf"
+        counts = build_flyer(pdf_path, pages=args.pages, **flyer)
+        print(f"📄 Synthetic flyer: {counts['pages']} pages, {counts['images']} images "
+              f"({counts['unique_images']} unique), {counts['captions']} captions, layout={args.layout}")
+
+        print(f"⏱  Timing stages ({args.repeat} runs each)...")
+        stages = benchmark_stages(pdf_path, work_dir, args.repeat)
+        print_stages(stages)
+
+        scaling = []
+        if args.scale:
+            print("\n📈 Scaling curve (full extraction)...")
+            scaling = benchmark_scaling([int(v) for v in args.scale.split(",") if v.strip()], flyer, work_dir)
+    finally:
+        if args.keep:
+            print(f"\n📂 Kept work files in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": {"pages": args.pages, **flyer},
+        "flyer": counts,
+        "stages": stages,
+        "scaling": scaling,
+    }
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📊 Results: {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✓ No stage more than {args.threshold:.0%} slower than the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Compile every college config, productconfigs.csv and the image manifests
+into one minified, pre-indexed catalogue bundle.
+
+This script:
+1. Reads src/config/colleges/*.json, productconfigs.csv and each college's
+   public/<College>/manifest.csv
+2. Builds one JSON document with per-college and per-category lookup tables and
+   every image path resolved to its final URL (/<College>/<category>/<file>)
+3. Writes it minified to public/catalogue.min.json, plus .gz and .br
+   precompressed copies
+4. Skips the rebuild when no input changed, and reuses the compiled entry of
+   every college whose config and manifest are unchanged
+
+Dependencies:
+    Standard library only. The .br copy needs the brotli package
+    (pip install brotli); without it only the .gz copy is written.
+
+Usage:
+    python scripts/build_catalogue_bundle.py
+    python scripts/build_catalogue_bundle.py --force
+    python scripts/build_catalogue_bundle.py --out build/catalogue.min.json
+
+Key Options:
+    --out: bundle path (default: public/catalogue.min.json)
+    --force: rebuild even if no input changed
+    --no-compress: don't write the .gz/.br copies
+
+Bundle layout:
+    inputs      {relative input path: sha256 prefix} - what the bundle was built from
+    garments    {product: [garment codes]} from productconfigs.csv
+    colleges    {key: college}, key = lower-cased config name (as in src/config/index.ts).
+                A college is its config (name, logo, categories) plus folder, config,
+                categoryIndex {path: index}, imageIndex {path/file: [category index, image index]}
+                and, per category, urls (parallel to images) and details
+                {file: {caption, hash, page}} from the manifest
+    categories  {path: [college keys]} - which colleges offer a category
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import extract_pdf_images_with_captions as extractor  # noqa: E402
+
+BUNDLE_VERSION = 2  # bump when the compiled layout changes
+DEFAULT_BUNDLE = Path("public") / "catalogue.min.json"
+
+# ----------------------------
+# Inputs
+# ----------------------------
+
+def file_digest(path: Path) -> str:
+    """Short sha256 of a file's contents ('' if it doesn't exist)."""
+    if not path.is_file():
+        return ""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def college_inputs(project_root: Path, college: Dict[str, str]) -> Dict[str, Path]:
+    """The files one college's bundle entry is compiled from, by project-relative path."""
+    paths = [
+        Path("src") / "config" / "colleges" / f"{college['config']}.json",
+        Path("public") / college["folder"] / "manifest.csv",
+    ]
+    return {path.as_posix(): project_root / path for path in paths}
+
+def load_garments(csv_path: Path) -> Dict[str, List[str]]:
+    """productconfigs.csv: product -> garment codes (comma separated in the CSV)."""
+    if not csv_path.is_file():
+        return {}
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    return {
+        row["product"]: [code.strip() for code in (row.get("garment code") or "").split(",") if code.strip()]
+        for row in rows if row.get("product")
+    }
+
+# ----------------------------
+# Compilation
+# ----------------------------
+
+def compile_college(project_root: Path, college: Dict[str, str]) -> Dict[str, Any]:
+    """One college's bundle entry: its config plus resolved URLs and lookup tables."""
+    config_path = project_root / "src" / "config" / "colleges" / f"{college['config']}.json"
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    manifest = {
+        row["output_path"]: row
+        for row in extractor.load_previous_manifest(project_root / "public" / college["folder"])
+    }
+    entry: Dict[str, Any] = {**config, "folder": college["folder"], "config": college["config"]}
+    entry["categories"] = []
+    category_index: Dict[str, int] = {}
+    image_index: Dict[str, List[int]] = {}
+    for cat_idx, category in enumerate(config.get("categories", [])):
+        category = dict(category)
+        path = category["path"]
+        images = category.get("images", [])
+        category["urls"] = [f"/{college['folder']}/{path}/{img}" for img in images]
+        details = {}
+        for img_idx, img in enumerate(images):
+            # Keyed by category path too: the same file name can appear in several categories
+            image_index.setdefault(f"{path}/{img}", [cat_idx, img_idx])
+            row = manifest.get(f"{path}/{img}")
+            if row:
+                details[img] = {"caption": row["caption"], "hash": row["image_hash"], "page": int(row["page"])}
+        if details:
+            category["details"] = details
+        category_index.setdefault(path, cat_idx)
+        entry["categories"].append(category)
+    entry["categoryIndex"] = category_index
+    entry["imageIndex"] = image_index
+    return entry
+
+def current_inputs(project_root: Path) -> Dict[str, str]:
+    """Digest of every input, keyed like a bundle's inputs map."""
+    inputs = {"productconfigs.csv": file_digest(project_root / "productconfigs.csv")}
+    for college in extractor.discover_colleges(project_root):
+        inputs.update({rel: file_digest(path) for rel, path in college_inputs(project_root, college).items()})
+    return inputs
+
+def build_bundle(project_root: Path, inputs: Dict[str, str], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Compile the bundle from inputs (see current_inputs). Colleges whose inputs
+    hash the same as in previous (an earlier bundle) keep their compiled entry
+    instead of being rebuilt.
+    """
+    previous = previous if previous and previous.get("version") == BUNDLE_VERSION else {}
+    previous_inputs = previous.get("inputs", {})
+    colleges: Dict[str, Any] = {}
+    rebuilt = 0
+    for college in extractor.discover_colleges(project_root):
+        key = college["config"].lower()
+        reuse = previous.get("colleges", {}).get(key)
+        changed = any(previous_inputs.get(rel) != inputs[rel] for rel in college_inputs(project_root, college))
+        if reuse is None or reuse.get("folder") != college["folder"] or changed:
+            reuse = compile_college(project_root, college)
+            rebuilt += 1
+        colleges[key] = reuse
+
+    categories: Dict[str, List[str]] = {}
+    for key, entry in colleges.items():
+        for category in entry["categories"]:
+            if category.get("images"):
+                categories.setdefault(category["path"], []).append(key)
+
+    print(f"🔧 Compiled {rebuilt} of {len(colleges)} colleges (the rest were unchanged)")
+    return {
+        "version": BUNDLE_VERSION,
+        "inputs": inputs,
+        "garments": load_garments(project_root / "productconfigs.csv"),
+        "colleges": colleges,
+        "categories": dict(sorted(categories.items())),
+    }
+
+# ----------------------------
+# Output
+# ----------------------------
+
+def load_bundle(path: Path) -> Optional[Dict[str, Any]]:
+    """An existing bundle, or None if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def write_bundle(bundle: Dict[str, Any], path: Path, compress: bool = True) -> List[Path]:
+    """Write the minified bundle and its .gz/.br copies; returns the written paths."""
+    data = json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    written = [path]
+    write_atomic(path, data)
+    gz_path = path.with_name(path.name + ".gz")
+    br_path = path.with_name(path.name + ".br")
+    if not compress:
+        gz_path.unlink(missing_ok=True)
+        br_path.unlink(missing_ok=True)
+        return written
+    # mtime=0 keeps the .gz byte-identical for identical bundles
+    write_atomic(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+    written.append(gz_path)
+    try:
+        import brotli
+    except ImportError:
+        print("⚠️  brotli is not installed (pip install brotli) - skipping the .br copy")
+        br_path.unlink(missing_ok=True)
+        return written
+    write_atomic(br_path, brotli.compress(data, quality=11))
+    written.append(br_path)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile college configs, productconfigs.csv and manifests into one catalogue bundle.")
+    parser.add_argument("--out", type=str, default=None, help="Bundle path (default: public/catalogue.min.json)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if no input changed")
+    parser.add_argument("--no-compress", dest="no_compress", action="store_true", help="Don't write the .gz/.br copies")
+    args = parser.parse_args()
+
+    project_root = Path(__file__).resolve().parent.parent
+    out = Path(args.out).expanduser() if args.out else project_root / DEFAULT_BUNDLE
+    previous = load_bundle(out)
+    inputs = current_inputs(project_root)
+
+    compressed = [out.with_name(out.name + ".gz")] if not args.no_compress else []
+    if (not args.force and previous and previous.get("version") == BUNDLE_VERSION
+            and previous.get("inputs") == inputs and all(p.exists() for p in compressed)):
+        print(f"✓ {out} is up to date")
+        return
+
+    bundle = build_bundle(project_root, inputs, None if args.force else previous)
+    for path in write_bundle(bundle, out, compress=not args.no_compress):
+        print(f"📦 {path} ({path.stat().st_size / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main()
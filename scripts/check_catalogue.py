@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Check that every college's config and manifest.csv match the images in public/.
+
+This script:
+1. Scans the whole public/ tree once with os.scandir (size and mtime of every file)
+2. Hashes the images whose size/mtime changed since the last check (in parallel);
+   unchanged files take their hash from .cache/check/hashes.json
+3. For every college compares the config's images / tieDyeImages / hoodOnlyImages /
+   crewOnlyImages lists and the manifest rows against the files on disk
+4. Reports, per college:
+     missing    - listed in the config or manifest, but no such file
+     renamed   - a missing entry whose image now lives at another, unlisted path
+                 (same manifest hash, or same file name in another category)
+     corrupted - the file's bytes no longer match the manifest's image_hash
+     orphaned  - an image file nothing lists
+     unlisted  - a tieDye/hoodOnly/crewOnly entry that isn't in the category's images
+   Manifests with Windows backslash output_path values are read as forward slashes.
+5. Exits with status 1 if anything was found
+
+Nothing under public/ or src/ is modified.
+
+Dependencies:
+    Standard library only
+
+Usage:
+    python scripts/check_catalogue.py
+    python scripts/check_catalogue.py --college MichiganState --json report.json
+
+Key Options:
+    --college: check only this college (the scan still covers public/)
+    --workers: hashing threads (default: all cores)
+    --no-cache: hash every image again
+    --json: also write the report as JSON
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple, Dict, Any, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import extract_pdf_images_with_captions as extractor  # noqa: E402
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg"}
+# Config lists that name image files of a category
+IMAGE_LISTS = ("images", "tieDyeImages", "hoodOnlyImages", "crewOnlyImages")
+# Folders inside a college folder that hold generated files rather than catalogue images
+SKIPPED_FOLDERS = {"optimized", "sprites"}
+PROBLEM_KINDS = ("missing", "renamed", "corrupted", "orphaned", "unlisted")
+
+# ----------------------------
+# Scan and hash
+# ----------------------------
+
+def scan_tree(root: Path) -> Dict[str, Tuple[int, int]]:
+    """
+    One os.scandir pass over root: {posix path relative to root: (size, mtime_ns)}
+    for every image file. Hidden entries (staging folders, checkpoints) are skipped;
+    symlinks are followed, so store-linked images report their target's size.
+    """
+    files: Dict[str, Tuple[int, int]] = {}
+    stack = [(root, "")]
+    while stack:
+        folder, prefix = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            rel = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((Path(entry.path), rel + "/"))
+            elif os.path.splitext(entry.name)[1].lower() in IMAGE_SUFFIXES:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # dangling symlink - reported as missing
+                files[rel] = (st.st_size, st.st_mtime_ns)
+    return files
+
+def hash_file(path: Path) -> str:
+    with open(path, "rb") as f:
+        return extractor.get_image_hash(f.read())
+
+class HashCache:
+    """
+    Image hashes by relative path, valid while the file's size and mtime are
+    unchanged. Stored as JSON ({path: [size, mtime_ns, hash]}) and only
+    rewritten when something changed.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.entries: Dict[str, List[Any]] = {}
+        self.changed = False
+        if path and path.is_file():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def hashes(self, root: Path, files: Dict[str, Tuple[int, int]], workers: int) -> Tuple[Dict[str, str], int]:
+        """Hash of every file in files, hashing stale ones on workers threads; returns (hashes, rehashed count)."""
+        result: Dict[str, str] = {}
+        stale = []
+        for rel, (size, mtime_ns) in files.items():
+            cached = self.entries.get(rel)
+            if cached and cached[0] == size and cached[1] == mtime_ns:
+                result[rel] = cached[2]
+            else:
+                stale.append(rel)
+        if stale:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for rel, digest in zip(stale, pool.map(lambda r: hash_file(root / r), stale)):
+                    result[rel] = digest
+                    self.entries[rel] = [*files[rel], digest]
+            self.changed = True
+        for rel in [rel for rel in self.entries if rel not in files]:
+            del self.entries[rel]
+            self.changed = True
+        return result, len(stale)
+
+    def save(self) -> None:
+        if not (self.path and self.changed):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+# ----------------------------
+# Checks
+# ----------------------------
+
+def check_college(
+    project_root: Path,
+    college: Dict[str, str],
+    files: Dict[str, Tuple[int, int]],
+    hashes: Dict[str, str],
+) -> Dict[str, Any]:
+    """Compare one college's config and manifest against the scanned files (paths relative to public/)."""
+    folder = college["folder"]
+    prefix = folder + "/"
+    on_disk = {
+        rel[len(prefix):]: hashes[rel] for rel in files
+        if rel.startswith(prefix) and rel[len(prefix):].split("/", 1)[0] not in SKIPPED_FOLDERS
+    }
+
+    # Every listed path, with where it is listed
+    listed: Dict[str, List[str]] = {}
+    report: Dict[str, Any] = {kind: [] for kind in PROBLEM_KINDS}
+    with open(project_root / "src" / "config" / "colleges" / f"{college['config']}.json", "r", encoding="utf-8") as f:
+        config = json.load(f)
+    for category in config.get("categories", []):
+        images = set(category.get("images", []))
+        for list_name in IMAGE_LISTS:
+            for img in category.get(list_name, []):
+                listed.setdefault(f"{category['path']}/{img}", []).append("config")
+                if list_name != "images" and img not in images:
+                    report["unlisted"].append(f"{category['path']}/{img} ({list_name})")
+
+    manifest_csv = project_root / "public" / folder / "manifest.csv"
+    report["backslash_paths"] = 0
+    if manifest_csv.exists():
+        with open(manifest_csv, "r", encoding="utf-8", newline="") as f:
+            report["backslash_paths"] = sum(1 for row in csv.DictReader(f) if "\\" in (row.get("output_path") or ""))
+    rows = extractor.load_previous_manifest(project_root / "public" / folder)
+    expected_hash: Dict[str, str] = {}
+    for row in rows:
+        listed.setdefault(row["output_path"], []).append("manifest")
+        expected_hash[row["output_path"]] = row.get("image_hash", "")
+
+    orphans = {rel: digest for rel, digest in on_disk.items() if rel not in listed}
+    orphans_by_hash: Dict[str, List[str]] = {}
+    orphans_by_name: Dict[str, List[str]] = {}
+    for rel, digest in orphans.items():
+        orphans_by_hash.setdefault(digest, []).append(rel)
+        orphans_by_name.setdefault(rel.rsplit("/", 1)[-1], []).append(rel)
+
+    for rel, sources in sorted(listed.items()):
+        sources = sorted(set(sources))
+        if rel in on_disk:
+            if expected_hash.get(rel) and on_disk[rel] != expected_hash[rel]:
+                report["corrupted"].append(f"{rel} (manifest {expected_hash[rel][:8]}, disk {on_disk[rel][:8]})")
+            continue
+        moved_to = [r for r in orphans_by_hash.get(expected_hash.get(rel, ""), []) if r in orphans]
+        moved_to = moved_to or [r for r in orphans_by_name.get(rel.rsplit("/", 1)[-1], []) if r in orphans]
+        if moved_to:
+            orphans.pop(moved_to[0])
+            report["renamed"].append(f"{rel} → {moved_to[0]} ({', '.join(sources)})")
+        else:
+            report["missing"].append(f"{rel} ({', '.join(sources)})")
+    report["orphaned"] = sorted(orphans)
+    report["checked"] = len(listed)
+    return report
+
+def print_report(reports: Dict[str, Dict[str, Any]]) -> int:
+    """Print every college's findings; returns the number of problems."""
+    total = 0
+    for folder, report in reports.items():
+        problems = sum(len(report[kind]) for kind in PROBLEM_KINDS)
+        total += problems
+        status = "✓" if problems == 0 else "✗"
+        note = ", manifest uses backslash paths" if report["backslash_paths"] else ""
+        print(f"\n{status} {folder}: {report['checked']} listed images, {problems} problems{note}")
+        for kind in PROBLEM_KINDS:
+            for item in report[kind]:
+                print(f"   {kind:<10}{item}")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Check college configs and manifests against the images in public/.")
+    parser.add_argument("--college", type=str, default=None, help="Only check this college (folder, config or display name)")
+    parser.add_argument("--workers", type=int, default=0, help="Hashing threads (default: all cores)")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Ignore and don't update the hash cache")
+    parser.add_argument("--json", type=str, default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    project_root = Path(__file__).resolve().parent.parent
+    public_dir = project_root / "public"
+    colleges = extractor.discover_colleges(project_root)
+    if args.college:
+        college = extractor.find_college(colleges, args.college)
+        if college is None:
+            parser.error(f"unknown college {args.college!r} (known: {', '.join(c['folder'] for c in colleges)})")
+        colleges = [college]
+
+    start = time.perf_counter()
+    files = scan_tree(public_dir)
+    cache = HashCache(None if args.no_cache else project_root / ".cache" / "check" / "hashes.json")
+    hashes, rehashed = cache.hashes(public_dir, files, args.workers or (os.cpu_count() or 1))
+    cache.save()
+    reports = {college["folder"]: check_college(project_root, college, files, hashes) for college in colleges}
+    elapsed = time.perf_counter() - start
+
+    problems = print_report(reports)
+    print(f"\n🔎 Scanned {len(files)} images ({rehashed} hashed, {len(files) - rehashed} from cache) in {elapsed:.2f}s - "
+          f"{problems} problems across {len(reports)} colleges")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
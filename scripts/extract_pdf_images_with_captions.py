@@ -3,7 +3,8 @@
 Extract images from a PDF, categorize them, and update college configs.
 
 This script:
-1. Prompts user to select a college (Arizona State, Michigan State, West Virginia University, University of Pittsburgh, Alabama University, or Oregon University)
+1. Prompts user to select a college (or takes --college / batch --job pairs); colleges are
+   discovered from src/config/colleges/*.json and the matching public/ folders
 2. Extracts images from PDF and names them using captions
 3. Categorizes images into subfolders (beanie, tshirt/men, etc.)
 4. Cleans existing images in the target college's public folder
@@ -13,29 +14,56 @@ This script:
 8. Adds backpack category for items with "backpac" or "backpack" keywords
 
 Dependencies:
-    pip install PyMuPDF pandas
+    pip install PyMuPDF pandas numpy
 
 Usage:
     python scripts/extract_pdf_images_with_captions.py input.pdf
     
     # Script will prompt:
     # Select college:
-    #   1. Arizona State
-    #   2. Michigan State
-    #   3. West Virginia University
-    #   4. University of Pittsburgh
-    #   5. Alabama University
-    #   6. Oregon University
-    # Enter your choice (1, 2, 3, 4, 5, or 6): 1
+    #   1. Alabama University
+    #   2. Arizona State
+    #   3. Michigan State
+    #   4. Oregon University
+    #   5. University of Pittsburgh
+    #   6. West Virginia University
+    # Enter your choice (1, 2, 3, 4, 5, or 6): 2
     
-    # Then extracts to public/ArizonaState/ and updates arizonastate.json
+    # Then extracts to public/ArizonaState/ and updates arizonaState.json
+
+    # Non-interactive, one college / many colleges at once:
+    python scripts/extract_pdf_images_with_captions.py input.pdf --college ArizonaState
+    python scripts/extract_pdf_images_with_captions.py --job ArizonaState=asu.pdf --job MichiganState=msu.pdf
+    python scripts/extract_pdf_images_with_captions.py --jobs season.json --parallel 3
 
 Key Options:
     --format: png or jpg (default: png)
     --max_gap: max vertical gap below image to search for caption (default 110)
     --min_overlap_ratio: min horizontal overlap (fraction of image width) (default 0.30)
     --debug: print debug info for first page
-    --zip: create a .zip of the output directory
+    --zip: also write a .zip of the extracted images and manifest
+    --workers: parse pages and hash their images on N worker processes (default 1, 0 = all cores)
+    --incremental: keep unchanged files, only write/rename/delete what changed
+    --dry-run: print the incremental plan without touching any files
+    --near_dup_distance / --collapse_near_dups: flag or skip perceptual near-duplicates
+    --link_mode: hardlink (default), symlink or copy images from the shared
+                 .image_store/, or off to write plain files (symlinks only work in
+                 this checkout - don't commit or deploy them)
+    --no-cache: don't use the on-disk page-parse cache (.cache/page_parse)
+    --optimize: build WebP (and with --avif, AVIF) full/thumb/detail variants
+    --sprites / --sprite_width: per-category thumbnail sprite sheets in public/<College>/sprites/
+    --college: pick the college without the prompt
+    --job COLLEGE=PDF / --jobs FILE: batch mode, jobs run concurrently (--parallel N)
+    --profile / --chrome_trace: per-stage timing as JSON lines / Chrome trace
+    --quiet: no per-image output
+    --catalogue / --no-catalogue: SQLite catalogue kept in sync with the manifests
+    --catalogue_import / --catalogue_export DIR / --lookup TERM: catalogue maintenance and queries
+    --write_threads / --write_buffer_mb: background image writers and their queue budget
+    --resume: continue an interrupted run from its last checkpointed page
+    --recategorize: re-apply category rules to all existing manifests (no PDF);
+                    asks before moving files unless --yes
+    --sweep: report caption-matching results over a grid of --sweep_gaps /
+             --sweep_overlaps values and exit without writing anything
 
 Note:
     The script handles M-codes with varying digit lengths (8-9 digits).
@@ -45,59 +73,104 @@ Note:
     Magnet items are categorized under signage.
 """
 
+from __future__ import annotations
+
 import argparse
+import csv
 import re
 import json
 import os
 import hashlib
+import io
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager, nullcontext, redirect_stdout
 from pathlib import Path
-import fitz  # PyMuPDF
-import pandas as pd
 import zipfile
-from typing import List, Tuple, Dict, Any, Optional, Set
+from collections import Counter, deque
+from functools import lru_cache
+from typing import List, Tuple, Dict, Any, Optional, Set, Iterator, Iterable, Union, Callable, Deque, TYPE_CHECKING
+
+# PyMuPDF, NumPy and pandas are imported inside the functions that need them so
+# that --help and the college prompt come up instantly.
+if TYPE_CHECKING:
+    import fitz  # PyMuPDF
+    import numpy as np
+    import pandas as pd
 
 # ----------------------------
 # Utilities
 # ----------------------------
 
-def prompt_college_selection() -> Tuple[str, str]:
+# Product codes that start a caption line - flexible to handle 8-9 digit M-codes
+# Examples: "M102595496", "M90637743", "M89672118"
+PRODUCT_CODE_PATTERN = re.compile(r'^M\d{6,}')
+
+def discover_colleges(project_root: Path) -> List[Dict[str, str]]:
+    """
+    College registry: every src/config/colleges/*.json, paired with the public/
+    folder of the same name compared case-insensitively (arizonaState.json ↔
+    public/ArizonaState). A college without a folder yet gets its config name
+    with the first letter capitalised. Returns [{'name', 'folder', 'config'}]
+    sorted by display name; 'config' is the config file name without .json.
+    """
+    public_dir = project_root / "public"
+    folders = {p.name.lower(): p.name for p in public_dir.iterdir() if p.is_dir()} if public_dir.is_dir() else {}
+    colleges = []
+    for config_path in sorted((project_root / "src" / "config" / "colleges").glob("*.json")):
+        folder = folders.get(config_path.stem.lower()) or config_path.stem[:1].upper() + config_path.stem[1:]
+        with open(config_path, "r", encoding="utf-8") as f:
+            name = json.load(f).get("name") or folder
+        colleges.append({"name": name, "folder": folder, "config": config_path.stem})
+    colleges.sort(key=lambda college: college["name"].lower())
+    return colleges
+
+def find_college(colleges: List[Dict[str, str]], query: str) -> Optional[Dict[str, str]]:
+    """Look a college up by folder, config name or display name, ignoring case, spaces and punctuation."""
+    def norm(value: str) -> str:
+        return re.sub(r"[^a-z0-9]", "", value.lower())
+
+    wanted = norm(query)
+    for college in colleges:
+        if wanted in (norm(college["folder"]), norm(college["config"]), norm(college["name"])):
+            return college
+    return None
+
+def prompt_college_selection(colleges: List[Dict[str, str]]) -> Dict[str, str]:
     """
-    Prompt user to select a college.
-    Returns (college_folder_name, config_file_name)
-    e.g., ('ArizonaState', 'arizonastate')
+    Prompt user to select a college from the registry.
+    Returns the chosen registry entry, e.g.
+    {'name': 'Arizona State', 'folder': 'ArizonaState', 'config': 'arizonaState'}
     """
     print("\n" + "="*50)
     print("PDF IMAGE EXTRACTOR - College Selection")
     print("="*50)
     print("\nSelect target college:")
-    print("  1. Arizona State")
-    print("  2. Michigan State")
-    print("  3. West Virginia University")
-    print("  4. University of Pittsburgh")
-    print("  5. Alabama University")
-    print("  6. Oregon University")
+    for n, college in enumerate(colleges, start=1):
+        print(f"  {n}. {college['name']}")
     print()
-    
+
+    choices = [str(n) for n in range(1, len(colleges) + 1)]
+    choice_list = ", ".join(choices[:-1]) + f", or {choices[-1]}" if len(choices) > 1 else choices[0]
     while True:
-        choice = input("Enter your choice (1, 2, 3, 4, 5, or 6): ").strip()
-        if choice == "1":
-            return ("ArizonaState", "arizonastate")
-        elif choice == "2":
-            return ("MichiganState", "michiganstate")
-        elif choice == "3":
-            return ("WestVirginiaUniversity", "westvirginiauniversity")
-        elif choice == "4":
-            return ("PittsburghUniversity", "pittsburghuniversity")
-        elif choice == "5":
-            return ("AlabamaUniversity", "alabamauniversity")
-        elif choice == "6":
-            return ("OregonUniversity", "oregonUniversity")
+        choice = input(f"Enter your choice ({choice_list}): ").strip()
+        if choice in choices:
+            return colleges[int(choice) - 1]
         else:
-            print("Invalid choice. Please enter 1, 2, 3, 4, 5, or 6.")
+            print(f"Invalid choice. Please enter {choice_list}.")
 
-def clean_existing_images(college_dir: Path) -> int:
+def clean_existing_images(college_dir: Path, keep: Optional[Set[str]] = None) -> int:
     """
-    Delete all existing images in the college directory (clean slate).
+    Delete all existing images in the college directory (clean slate),
+    except those whose path relative to college_dir is in keep. The
+    optimized/ and sprites/ folders are left to their own stages, which
+    reuse unchanged files and prune the rest.
     Keeps folder structure intact.
     Returns count of deleted files.
     """
@@ -105,16 +178,22 @@ def clean_existing_images(college_dir: Path) -> int:
         return 0
     
     deleted_count = 0
-    image_extensions = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg']
+    image_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg'}
+    keep = keep or set()
     
     # Walk through all subdirectories
     for root, dirs, files in os.walk(college_dir):
         root_path = Path(root)
-        for ext in image_extensions:
-            for img_file in root_path.glob(ext):
-                if img_file.is_file():
-                    img_file.unlink()
-                    deleted_count += 1
+        if root_path == college_dir:
+            dirs[:] = [d for d in dirs if d not in ("optimized", SPRITE_DIRNAME)]
+        for name in files:
+            img_file = root_path / name
+            if img_file.suffix.lower() not in image_extensions:
+                continue
+            if img_file.relative_to(college_dir).as_posix() in keep:
+                continue
+            img_file.unlink()
+            deleted_count += 1
     
     return deleted_count
 
@@ -122,7 +201,8 @@ def update_college_config(
     college_config_name: str,
     category_image_map: Dict[str, List[str]],
     script_dir: Path,
-    hood_only_images: Optional[Set[str]] = None
+    hood_only_images: Optional[Set[str]] = None,
+    image_meta: Optional[Dict[str, Dict[str, Any]]] = None,
 ) -> None:
     """
     Update the college's JSON config with extracted images.
@@ -132,6 +212,9 @@ def update_college_config(
         category_image_map: {'beanie': ['file1.png', ...], 'tshirt/men': [...]}
         script_dir: Path to the scripts directory (to navigate to src/)
         hood_only_images: Set of image filenames that should only have hoodie option (no crew sweatshirt)
+        image_meta: Optional per-image metadata {filename: {...}} (e.g. optimized variants),
+            written as an imageMeta map next to each category's images list.
+            None keeps existing entries for images that are still listed.
     """
     # Navigate from scripts/ to src/config/colleges/
     project_root = script_dir.parent
@@ -210,6 +293,15 @@ def update_college_config(
         if category['path'] not in processed_paths:
             category['images'] = []
     
+    # Per-image metadata lives next to the images list, keyed by filename
+    for category in config['categories']:
+        source = image_meta if image_meta is not None else category.get('imageMeta', {})
+        meta = {img: source[img] for img in sorted(category.get('images', [])) if img in source}
+        if meta:
+            category['imageMeta'] = meta
+        elif 'imageMeta' in category:
+            del category['imageMeta']
+    
     # Write updated config back
     with open(config_path, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2, ensure_ascii=False)
@@ -219,6 +311,42 @@ def update_college_config(
     total_images = sum(len(imgs) for imgs in category_image_map.values())
     print(f"   - Total images: {total_images}")
 
+def build_category_image_map(df: pd.DataFrame) -> Tuple[Dict[str, List[str]], Set[str]]:
+    """
+    Build ({category: [filenames]}, hood_only_images) from manifest rows.
+
+    An item is hood-only when its has_hood column is true or its caption
+    mentions "hood" (older manifests have no has_hood column).
+    """
+    import pandas as pd
+
+    if df.empty:
+        return {}, set()
+    category_image_map = df.groupby("category_subfolder", sort=False)["filename"].agg(list).to_dict()
+
+    is_hood = pd.Series(False, index=df.index)
+    if "has_hood" in df.columns:
+        is_hood |= df["has_hood"].astype(str).str.lower().isin(["true", "1"])
+    if "caption" in df.columns:
+        is_hood |= df["caption"].astype(str).str.lower().str.contains("hood", regex=False)
+    return category_image_map, set(df.loc[is_hood, "filename"])
+
+def image_meta_from_manifest(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Collect per-image config metadata ({filename: {...}}) from manifest columns:
+    width, height, blurhash and color for placeholders, and optimized variants.
+    """
+    meta: Dict[str, Dict[str, Any]] = {}
+    if {"width", "height", "blurhash", "color"} <= set(df.columns):
+        for filename, width, height, blurhash, color in zip(df["filename"], df["width"], df["height"], df["blurhash"], df["color"]):
+            if isinstance(blurhash, str) and blurhash:
+                meta[filename] = {"width": int(width), "height": int(height), "blurhash": blurhash, "color": color}
+    if "variants" in df.columns:
+        for filename, variants in zip(df["filename"], df["variants"]):
+            if isinstance(variants, str) and variants:
+                meta.setdefault(filename, {})["variants"] = json.loads(variants)
+    return meta
+
 def slugify(s: str, max_len: int = 160) -> str:
     """Make a safe filename: collapse spaces, remove specials, replace spaces with underscores."""
     s = re.sub(r"\s+", " ", (s or "")).strip()
@@ -235,170 +363,706 @@ def horiz_overlap(a: Tuple[float, float, float, float],
     bx0, by0, bx1, by1 = b
     return max(0, min(ax1, bx1) - max(ax0, bx0))
 
-def unique_path(base_dir: Path, base_name: str, ext: str) -> Path:
-    p = base_dir / f"{base_name}{ext}"
+def allocate_output_path(taken: Set[str], category: str, base_name: str, ext: str) -> str:
+    """
+    Pick a free relative output path ('category/name.ext', then 'name (2).ext', ...).
+    Names are allocated in memory against the paths already used in this run,
+    so existing files on disk (e.g. from an incremental run) don't cause clashes.
+    """
+    rel = f"{category}/{base_name}{ext}"
     i = 2
-    while p.exists():
-        p = base_dir / f"{base_name} ({i}){ext}"
+    while rel in taken:
+        rel = f"{category}/{base_name} ({i}){ext}"
         i += 1
-    return p
+    taken.add(rel)
+    return rel
+
+def move_file(src: Path, dst: Path) -> None:
+    """
+    os.replace() that keeps relative symlinks (image store links) valid when the
+    file moves to a folder at a different depth.
+    """
+    if not src.is_symlink():
+        os.replace(src, dst)
+        return
+    target = os.path.join(os.path.dirname(src), os.readlink(src))
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    os.symlink(os.path.relpath(target, dst.parent), tmp)
+    os.replace(tmp, dst)
+    src.unlink()
+
+class CategoryRules:
+    """
+    Caption categorization rules compiled from category_rules.json.
+
+    Every rule becomes one alternative of a single combined regex, wrapped in a
+    lookahead so it can match at every position of the caption. At each position
+    the regex reports the first (highest priority) rule matching there, so the
+    lowest rule index over all positions is exactly the first rule that matches
+    anywhere - one pass over the caption, same result as trying rules in order.
+
+    Results are memoized per lowercased caption and every call is counted per
+    rule in `hits`. Captions whose M-code is in `overrides` (hand-curated items)
+    get that category without consulting the rules; they count as "override".
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], default: Dict[str, Any], overrides: Optional[Dict[str, Optional[str]]] = None):
+        self.rules = rules
+        self.default = default
+        self.overrides = overrides or {}
+        alternatives = []
+        for i, rule in enumerate(rules):
+            if rule.get("pattern"):
+                body = rule["pattern"]
+            else:
+                body = "|".join(re.escape(k.lower()) for k in rule["keywords"])
+            alternatives.append(f"(?P<r{i}>{body})")
+        self._regex = re.compile("(?=" + "|".join(alternatives) + ")", re.DOTALL)
+        self.hits: Counter = Counter()
+        self._match = lru_cache(maxsize=65536)(self._first_match)
+
+    @classmethod
+    def load(cls, path: Path) -> "CategoryRules":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["rules"], data["default"], data.get("overrides"))
+
+    def _first_match(self, caption_lower: str) -> Optional[Dict[str, Any]]:
+        best = len(self.rules)
+        for m in self._regex.finditer(caption_lower):
+            idx = int(m.lastgroup[1:])
+            if idx < best:
+                best = idx
+                if best == 0:
+                    break
+        return self.rules[best] if best < len(self.rules) else self.default
+
+    def categorize(self, caption: str) -> Optional[str]:
+        code = PRODUCT_CODE_PATTERN.match(caption)
+        if code and code.group() in self.overrides:
+            self.hits["override"] += 1
+            return self.overrides[code.group()]
+        rule = self._match(caption.lower())
+        self.hits[rule["id"]] += 1
+        return rule["category"]
+
+    def categorize_many(self, captions: List[str]) -> List[Optional[str]]:
+        return [self.categorize(caption) for caption in captions]
+
+CATEGORY_RULES_PATH = Path(__file__).resolve().parent.parent / "category_rules.json"
+_category_rules: Optional[CategoryRules] = None
+
+def get_category_rules() -> CategoryRules:
+    """Load and compile category_rules.json on first use."""
+    global _category_rules
+    if _category_rules is None:
+        _category_rules = CategoryRules.load(CATEGORY_RULES_PATH)
+    return _category_rules
 
 def categorize_image(caption: str) -> Optional[str]:
     """
     Categorize an image based on its caption/title using case-insensitive matching.
-    Returns the subfolder path (e.g., 'beanie/', 'tshirt/women/', etc.)
+    Returns the subfolder path (e.g., 'beanie', 'tshirt/women', etc.)
     Returns None for items that should be ignored (e.g., banner items).
-    
-    Rules applied in order (first match wins):
-    1. banner → None (ignored)
-    2. Youth/Infant/Onsie → youth&infant/
-    3. M100436060, M100438383, M100438745, M100439889 → tshirt/women/ (special cases)
-    4. M100485992_SHE2CH_Custom_Spartan_on_Green → hat/ (special case)
-    5. 6606 or no mesh → hat/
-    6. "or" with "logo" (with colors/numbers) → hat/
-    7. Backpack/Backpac → backpack/
-    8. Beanie → beanie/
-    9. Bottle → bottle/
-    10. Magnet → signage/
-    11. header → signage/
-    12. card → signage/
-    13. hat → hat/
-    14. flannels → flannels/
-    15. plush → plush/
-    16. fleece → jacket/
-    17. jacket → jacket/
-    18. side_print → shorts/
-    19. side stripe → shorts/
-    20. shorts → shorts/
-    21. socks → socks/
-    22. sticker → sticker/
-    23. jogger → pants/
-    24. pant → pants/
-    25. pants → pants/
-    26. Hood → tshirt/men/ (hoodie only)
-    27. jr (as word) → tshirt/women/
-    28. default → tshirt/men/
-    """
-    caption_lower = caption.lower()
-    
-    # Ignore banner items (must check first)
-    if "banner" in caption_lower:
-        return None
-    
-    # Check for youth/infant/onsie items
-    if "youth" in caption_lower or "infant" in caption_lower or "onsie" in caption_lower:
-        return "youth&infant"
-    
-    # Check for 6606 or no mesh → hat
-    if "6606" in caption_lower or "no mesh" in caption_lower:
-        return "hat"
-    
-    # Check for "or" pattern with "logo" (e.g., "Logo White or Gray", "Custom Logo 6235 or 6606") → hat
-    # Pattern: must contain both "logo" and "or" pattern (word "or" followed by another word)
-    if "logo" in caption_lower and re.search(r'\s+or\s+', caption_lower):
-        return "hat"
-    
-    # Check each rule in order (more specific rules first)
-    if "backpac" in caption_lower or "backpack" in caption_lower:
-        return "backpack"
-    if "beanie" in caption_lower:
-        return "beanie"
-    if "bottle" in caption_lower:
-        return "bottle"
-    if "magnet" in caption_lower:
-        return "signage"
-    if "header" in caption_lower:
-        return "signage"
-    if "card" in caption_lower:
-        return "signage"
-    if "hat" in caption_lower:
-        return "hat"
-    if "flannels" in caption_lower:
-        return "flannels"
-    if "plush" in caption_lower:
-        return "plush"
-    if "fleece" in caption_lower:
-        return "jacket"
-    if "jacket" in caption_lower:
-        return "jacket"
-    if "side_print" in caption_lower or "side print" in caption_lower:
-        return "shorts"
-    if "side stripe" in caption_lower or "side_stripe" in caption_lower:
-        return "shorts"
-    if "shorts" in caption_lower:
-        return "shorts"
-    if "socks" in caption_lower:
-        return "socks"
-    if "sticker" in caption_lower:
-        return "sticker"
-    if "jogger" in caption_lower:
-        return "pants"
-    if "pant" in caption_lower:
-        return "pants"
-    if "pants" in caption_lower:
-        return "pants"
-    
-    # Check for "Hood" → tshirt/men (hoodie only option)
-    if "hood" in caption_lower:
-        return "tshirt/men"
-    
-    # Check for "jr" as a word (with word boundaries)
-    if re.search(r'\bjr\b', caption_lower):
-        return "tshirt/women"
-    
-    # Default fallback
-    return "tshirt/men"
+
+    The rules live in category_rules.json at the project root and are applied
+    in file order (first match wins), falling back to 'tshirt/men'.
+    """
+    return get_category_rules().categorize(caption)
+
+def categorize_captions(captions: List[str]) -> List[Optional[str]]:
+    """Categorize a batch of captions (e.g. a whole catalogue) in one call."""
+    return get_category_rules().categorize_many(captions)
 
 # ----------------------------
 # Page parsing
 # ----------------------------
 
-def lines_from_page(page: fitz.Page) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+def get_image_hash(image_bytes: bytes) -> str:
+    """Generate a hash of image bytes for deduplication."""
+    return hashlib.md5(image_bytes).hexdigest()
+
+def split_caption_runs(line: Dict[str, Any]) -> List[Tuple[str, Tuple[float, float, float, float]]]:
     """
-    Return list of (text, bbox) for each text line on the page using 'dict' format.
-    bbox = (x0, y0, x1, y1)
+    Split a 'dict' text line into (text, bbox) runs, starting a new run at every
+    span that begins with a product code.
 
-    Lines are returned sorted top-to-bottom by their y0 coordinate.
+    Without image blocks in the text page, MuPDF no longer has anything separating
+    two captions that sit side by side on the same baseline and joins them into
+    one line. Splitting at product codes restores one line per caption, while a
+    caption drawn as several spans (e.g. a bold M-code) stays together.
     """
-    # Use 'dict' format instead of 'rawdict' - it has better text extraction
-    text_dict = page.get_text("dict")
+    spans = line.get("spans", [])
+    runs: List[List[Dict[str, Any]]] = [[]]
+    for span in spans:
+        if PRODUCT_CODE_PATTERN.match(span.get("text", "").lstrip()) and any(
+            sp.get("text", "").strip() for sp in runs[-1]
+        ):
+            runs.append([])
+        runs[-1].append(span)
+
+    if len(runs) == 1:
+        text = "".join(s.get("text", "") for s in spans)
+        return [(text, tuple(line.get("bbox", (0, 0, 0, 0))))]  # type: ignore
+
+    result = []
+    for run in runs:
+        text = "".join(s.get("text", "") for s in run)
+        boxes = [s.get("bbox", (0, 0, 0, 0)) for s in run if s.get("text", "").strip()] or [(0, 0, 0, 0)]
+        bbox = (
+            min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes),
+        )
+        result.append((text, bbox))
+    return result
+
+def analyze_page(page: fitz.Page) -> Tuple[List[Tuple[str, Tuple[float, float, float, float]]], List[Dict[str, Any]]]:
+    """
+    Walk the page once and return (lines, image_placements).
+
+    Text lines come from a single get_text("dict") call with image blocks turned
+    off, so no image bytes are decoded while parsing. Image placements come from
+    PyMuPDF's image listing and only carry the xref and bbox; bytes are fetched
+    later with load_image() for the images that are actually kept.
+    """
+    import fitz  # PyMuPDF
+
+    text_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES)
     lines: List[Tuple[str, Tuple[float, float, float, float]]] = []
-    
+
     for b in text_dict.get("blocks", []):
         if b.get("type") == 0:  # text block
             for l in b.get("lines", []):
-                text = "".join(s.get("text", "") for s in l.get("spans", []))
-                text = (text or "").strip()
-                if text:
-                    bbox = tuple(l.get("bbox", (0, 0, 0, 0)))
-                    lines.append((text, bbox))  # type: ignore
-    
+                for text, bbox in split_caption_runs(l):
+                    text = (text or "").strip()
+                    if text:
+                        lines.append((text, bbox))  # type: ignore
+
     # sort lines top-to-bottom for easier neighbor searching / merging
     lines.sort(key=lambda t: t[1][1])
-    return lines
 
-def get_image_hash(image_bytes: bytes) -> str:
-    """Generate a hash of image bytes for deduplication."""
-    return hashlib.md5(image_bytes).hexdigest()
+    imgs: List[Dict[str, Any]] = []
+    for info in page.get_image_info(xrefs=True):
+        imgs.append({
+            "xref": info.get("xref", 0),  # 0 = inline image (no xref)
+            "bbox": tuple(info.get("bbox", (0, 0, 0, 0))),
+        })
+    return lines, imgs
+
+def lines_from_page(page: fitz.Page) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+    """
+    Return list of (text, bbox) for each text line on the page using 'dict' format.
+    bbox = (x0, y0, x1, y1)
+
+    Lines are returned sorted top-to-bottom by their y0 coordinate.
+    """
+    return analyze_page(page)[0]
 
 def images_from_page(page: fitz.Page) -> List[Dict[str, Any]]:
     """
-    Return list of dicts for images detected via rawdict:
-    { 'bytes': bytes, 'bbox': (x0,y0,x1,y1), 'ext': 'jpeg'/'png'/..., 'hash': str }
-    """
-    raw = page.get_text("rawdict")
-    imgs = []
-    for b in raw.get("blocks", []):
-        if b.get("type") == 1 and b.get("image") is not None:
-            img_bytes = b.get("image")
-            imgs.append({
-                "bytes": img_bytes,
-                "bbox": tuple(b.get("bbox", (0, 0, 0, 0))),  # type: ignore
-                "ext": b.get("ext", "png"),
-                "hash": get_image_hash(img_bytes),
-                "size": len(img_bytes)
-            })
-    return imgs
+    Return list of image placements on the page, in drawing order:
+    { 'xref': int, 'bbox': (x0,y0,x1,y1) }
+    """
+    return analyze_page(page)[1]
+
+def load_image(doc: fitz.Document, pno: int, placement: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the bytes of a single image placement:
+    { 'bytes': bytes, 'ext': 'jpeg'/'png'/..., 'hash': str, 'size': int }
+
+    Images with an xref are read straight from the PDF object. Inline images
+    (xref 0) have no object of their own, so they are read from a 'dict' pass
+    clipped to the placement's bbox.
+    """
+    import fitz  # PyMuPDF
+
+    img_bytes = None
+    ext = "png"
+    if placement["xref"]:
+        extracted = doc.extract_image(placement["xref"])
+        if extracted:
+            img_bytes = extracted.get("image")
+            ext = extracted.get("ext", "png")
+    else:
+        clip = fitz.Rect(placement["bbox"])
+        clipped = doc[pno].get_text("dict", flags=fitz.TEXT_PRESERVE_IMAGES, clip=clip)
+        blocks = [b for b in clipped.get("blocks", []) if b.get("type") == 1 and b.get("image") is not None]
+        if blocks:
+            # Overlapping images can share the clip; take the one covering it best
+            block = max(blocks, key=lambda b: abs(fitz.Rect(b["bbox"]) & clip))
+            img_bytes = block.get("image")
+            ext = block.get("ext", "png")
+
+    if not img_bytes:
+        return None
+    return {
+        "bytes": img_bytes,
+        "ext": ext,
+        "hash": get_image_hash(img_bytes),
+        "size": len(img_bytes)
+    }
+
+class PageCache:
+    """
+    On-disk cache of parsed pages (text lines and image placements, plus image
+    hashes once they are known).
+
+    Entries are keyed by a hash of everything the parse depends on: the page's
+    content streams, its form XObjects, the raw streams of its images and its
+    fonts. Re-running on the same or a lightly revised flyer therefore skips
+    PyMuPDF parsing for every unchanged page. The least recently used entries are
+    evicted once the cache grows beyond max_bytes.
+    """
+
+    VERSION = 1  # bump when analyze_page() output changes
+    STALE_TMP_SECONDS = 3600
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def page_key(self, page: fitz.Page) -> str:
+        doc = page.parent
+        h = hashlib.md5(f"v{self.VERSION}|{tuple(page.rect)}|{page.rotation}|".encode())
+        h.update(page.read_contents())
+        for xobj in page.get_xobjects():
+            h.update(f"|form{xobj[0]}:".encode())
+            h.update(doc.xref_stream_raw(xobj[0]) or b"")
+        for img in page.get_images(full=True):
+            h.update(f"|img{img[0]}:".encode())
+            h.update(hashlib.md5(doc.xref_stream_raw(img[0]) or b"").digest())
+        for font in page.get_fonts(full=True):
+            h.update(f"|font{font[0]}:{font[3]}".encode())
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError):
+            # Missing, half-written or just evicted by another process
+            return None
+        entry["lines"] = [(text, tuple(bbox)) for text, bbox in entry["lines"]]
+        for img in entry["images"]:
+            img["bbox"] = tuple(img["bbox"])
+        return entry
+
+    def put(self, key: str, parsed: Dict[str, Any]) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = {k: v for k, v in parsed.items() if k != "cache_key"}
+        path = self._entry_path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits max_bytes.
+        Other processes may share the cache: their temp files are left alone
+        (unless older than STALE_TMP_SECONDS, from a crashed writer), and
+        entries that vanish or can't be removed meanwhile are skipped.
+        """
+        entries = []
+        try:
+            scan = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+        now = time.time()
+        for e in scan:
+            try:
+                st = e.stat()
+                if e.name.endswith(".tmp") and now - st.st_mtime > self.STALE_TMP_SECONDS:
+                    os.unlink(e.path)
+            except OSError:
+                continue
+            if e.name.endswith(".json"):
+                entries.append((st.st_mtime, st.st_size, Path(e.path)))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+        return removed
+
+def parse_page(page: fitz.Page, cache: Optional[PageCache] = None) -> Dict[str, Any]:
+    """
+    Parse everything the extraction loop needs from a single page:
+    { 'height': float, 'lines': [...], 'images': [...], 'cache_key': str or None }
+    """
+    key = cache.page_key(page) if cache else None
+    if key:
+        cached = cache.get(key)
+        if cached is not None:
+            cached["cache_key"] = key
+            return cached
+
+    lines, images = analyze_page(page)
+    parsed = {"height": page.rect.height, "lines": lines, "images": images, "cache_key": key}
+    if key:
+        cache.put(key, parsed)
+    return parsed
+
+def hash_placements(doc: fitz.Document, pno: int, parsed: Dict[str, Any], known: Dict[int, Dict[str, Any]]) -> bool:
+    """
+    Fill in hash, size and ext of the page's image objects (xref > 0), the way
+    the extraction loop learns them for the page cache. known maps xrefs
+    already done to their fields. Returns True if anything was added.
+    """
+    learned = False
+    for placement in parsed["images"]:
+        xref = placement["xref"]
+        if not xref or placement.get("hash"):
+            continue
+        if xref not in known:
+            img = load_image(doc, pno, placement)
+            if img is None:
+                continue
+            known[xref] = {"hash": img["hash"], "size": img["size"], "ext": img["ext"]}
+        placement.update(known[xref])
+        learned = True
+    return learned
+
+def parse_page_range(
+    pdf_path: str, start: int, stop: int, cache: Optional[PageCache] = None, hash_images: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Worker entry point: open the PDF independently and parse pages [start, stop),
+    hashing their image objects too with hash_images (see hash_placements).
+    Must stay at module level so it can be pickled by ProcessPoolExecutor.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    known: Dict[int, Dict[str, Any]] = {}
+    try:
+        pages = []
+        for pno in range(start, stop):
+            parsed = parse_page(doc[pno], cache)
+            if hash_images and hash_placements(doc, pno, parsed, known) and parsed["cache_key"]:
+                cache.put(parsed["cache_key"], parsed)
+            pages.append(parsed)
+        return pages
+    finally:
+        doc.close()
+
+def placements_to_decode(
+    pages: List[Tuple[int, Dict[str, Any]]], captions: Dict[str, Any], skip_hashes: Set[str],
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    The (page, placement) pairs whose visuals the extraction loop will need,
+    found with its own filters in page order: repeated xrefs and hashes
+    (including skip_hashes), and banners (captions are assign_captions()
+    keyword arguments) are left out, and so are placements without a hash
+    or with visuals already.
+    """
+    seen_xrefs: Set[int] = set()
+    seen_hashes = set(skip_hashes)
+    wanted = []
+    for pno, parsed in pages:
+        images = parsed["images"]
+        page_captions = assign_captions([placement["bbox"] for placement in images], parsed["lines"], **captions)
+        for placement, caption in zip(images, page_captions):
+            xref = placement["xref"]
+            if xref and xref in seen_xrefs:
+                continue
+            seen_xrefs.add(xref)
+            img_hash = placement.get("hash")
+            if not img_hash or img_hash in seen_hashes:
+                continue
+            seen_hashes.add(img_hash)
+            if caption and categorize_image(caption) is None:
+                continue
+            if not placement.get("visuals"):
+                wanted.append((pno, placement))
+    return wanted
+
+def decode_visuals(pdf_path: str, wanted: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Worker entry point: image_visuals() of each (page, placement) pair."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        visuals = []
+        for pno, placement in wanted:
+            img = load_image(doc, pno, placement)
+            visuals.append(image_visuals(img["bytes"]) if img else dict(NO_VISUALS))
+        return visuals
+    finally:
+        doc.close()
+
+def iter_parsed_pages(
+    pdf_path: Path,
+    workers: int = 1,
+    cache: Optional[PageCache] = None,
+    start: int = 0,
+    captions: Optional[Dict[str, Any]] = None,
+    skip_hashes: Set[str] = frozenset(),
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (page_number, parsed_page) in page order, from page start on.
+
+    With workers > 1 the document is split into page ranges that are parsed on a
+    process pool (each worker opens the PDF itself). Results are merged back in
+    page order, so everything downstream (dedupe, naming, manifest order) sees
+    exactly the same sequence as a serial run.
+
+    With captions (assign_captions() keyword arguments) the pool also does the
+    per-image work: the workers hash every image object, then the images the
+    extraction loop will keep (see placements_to_decode; skip_hashes are
+    images it already has visuals for) are decoded for their visuals. Pages
+    are yielded once all of that is done.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path.as_posix())
+    page_count = len(doc)
+
+    if workers <= 1 or page_count - start < 2:
+        try:
+            for pno in range(start, page_count):
+                yield pno, parse_page(doc[pno], cache)
+        finally:
+            doc.close()
+        return
+    doc.close()
+
+    workers = min(workers, page_count - start)
+    # A few ranges per worker keeps the pool balanced when some pages are heavier
+    chunk = max(1, -(-(page_count - start) // (workers * 4)))
+    starts = list(range(start, page_count, chunk))
+    stops = [min(first + chunk, page_count) for first in starts]
+    n = len(starts)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(parse_page_range, [pdf_path.as_posix()] * n, starts, stops, [cache] * n,
+                           [captions is not None] * n)
+        if captions is None:
+            for first, parsed_pages in zip(starts, results):
+                for offset, parsed in enumerate(parsed_pages):
+                    yield first + offset, parsed
+            return
+
+        pages = [(first + offset, parsed) for first, parsed_pages in zip(starts, results)
+                 for offset, parsed in enumerate(parsed_pages)]
+        wanted = placements_to_decode(pages, captions, skip_hashes)
+        size = max(1, -(-len(wanted) // (workers * 4)))
+        batches = [wanted[i:i + size] for i in range(0, len(wanted), size)]
+        decoded = pool.map(decode_visuals, [pdf_path.as_posix()] * len(batches), batches)
+        for batch, visuals in zip(batches, decoded):
+            for (_, placement), placement_visuals in zip(batch, visuals):
+                placement["visuals"] = placement_visuals
+    yield from pages
+
+def caption_geometry(
+    img_bboxes: List[Tuple[float, float, float, float]],
+    cand_bboxes: List[Tuple[float, float, float, float]],
+) -> Dict[str, Any]:
+    """
+    Parameter-independent image x caption-line matrices used by caption_tiers()
+    (images along rows, candidate lines along columns).
+    """
+    import numpy as np
+
+    imgs = np.asarray(img_bboxes, dtype=float).reshape(-1, 4)
+    cands = np.asarray(cand_bboxes, dtype=float).reshape(-1, 4)
+    x0, y0, x1, y1 = (imgs[:, i:i + 1] for i in range(4))
+    lx0, ly0, lx1, ly1 = (cands[None, :, i] for i in range(4))
+
+    img_w = np.maximum(1.0, x1 - x0)
+    center_dist = np.abs((lx0 + lx1) / 2.0 - (x0 + x1) / 2.0)
+    return {
+        "img_w": img_w,
+        "center_dist": center_dist,
+        "overlap": np.maximum(0.0, np.minimum(x1, lx1) - np.maximum(x0, lx0)),
+        "is_below": ly0 >= y1,
+        "is_above": y0 >= ly1,
+        "below_dist": ly0 - y1,
+        "above_dist": y0 - ly1,
+        "extended_dist": np.minimum(np.abs(ly0 - y1), np.abs(y0 - ly1)),
+    }
+
+def caption_tiers(geometry: Dict[str, Any], max_vertical_gap: Any, min_overlap_ratio: float = 0.30) -> Tuple[Any, Any]:
+    """
+    Return (tier, score) matrices for the given gap. tier is 0 (below), 1 (above),
+    2 (extended) or 3 (no match); smaller scores are better. A line is aligned
+    with an image when it overlaps min_overlap_ratio of the image's width or
+    its center is within one image width.
+
+    max_vertical_gap may also be a 1-D array of gaps, in which case both matrices
+    get a leading axis with one slice per gap (used by the parameter sweep).
+    """
+    import numpy as np
+
+    gap = np.asarray(max_vertical_gap, dtype=float)
+    if gap.ndim:
+        gap = gap[:, None, None]
+    g = geometry
+
+    aligned = (g["overlap"] >= min_overlap_ratio * g["img_w"]) | (g["center_dist"] <= g["img_w"])
+    below = g["is_below"] & (g["below_dist"] <= gap) & aligned
+    above = g["is_above"] & (g["above_dist"] <= np.minimum(50.0, gap * 0.5)) & aligned
+    extended = (g["extended_dist"] <= gap * 2) & (g["center_dist"] <= g["img_w"] * 1.5)
+
+    tier = np.select([below, above, extended], [0, 1, 2], default=3)
+    vertical = np.select([below, above], [g["below_dist"], g["above_dist"]], default=g["extended_dist"])
+    # Smaller is better. Prioritize vertical proximity and horizontal alignment.
+    score = np.abs(vertical) + 0.3 * (g["center_dist"] / g["img_w"])
+    return tier, score
+
+def linear_assignment(cost: Any) -> List[int]:
+    """
+    Minimum-cost assignment of rows to distinct columns (rows <= columns).
+    Uses SciPy when it is installed, otherwise the Hungarian method in NumPy.
+    Returns the chosen column per row.
+    """
+    import numpy as np
+
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        linear_sum_assignment = None
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)[1].tolist()
+
+    # Shortest augmenting paths with row/column potentials; 1-based, column 0 is the
+    # virtual start of each path
+    n_rows, n_cols = cost.shape
+    u = np.zeros(n_rows + 1)
+    v = np.zeros(n_cols + 1)
+    row_of = np.zeros(n_cols + 1, dtype=int)
+    way = np.zeros(n_cols + 1, dtype=int)
+    for i in range(1, n_rows + 1):
+        row_of[0] = i
+        j0 = 0
+        minv = np.full(n_cols + 1, np.inf)
+        used = np.zeros(n_cols + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = row_of[j0]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = ~used[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            j1 = int(np.where(used[1:], np.inf, minv[1:]).argmin()) + 1
+            delta = minv[j1]
+            u[row_of[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            j0 = j1
+            if row_of[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            row_of[j0] = row_of[j1]
+            j0 = j1
+
+    chosen = [-1] * n_rows
+    for j in range(1, n_cols + 1):
+        if row_of[j]:
+            chosen[row_of[j] - 1] = j - 1
+    return chosen
+
+def assign_matching(tier: Any, score: Any) -> List[int]:
+    """
+    Global assignment, one line per image: as many images as possible get a line,
+    then the fewest fall back to a wider window, then the total score is lowest.
+    Returns the chosen line index per image (-1 for none).
+    """
+    import numpy as np
+
+    n_imgs, n_lines = tier.shape
+    valid = tier < 3
+    if not valid.any():
+        return [-1] * n_imgs
+
+    # Each step outweighs everything below it summed over all pairs, so the
+    # minimum cost is lexicographic in (pairs matched, tiers, score)
+    pairs = min(n_imgs, n_lines)
+    scores = np.where(valid, score, 0.0)
+    scores -= scores[valid].min()
+    tier_step = (scores[valid].max() + 1.0) * pairs
+    no_match = 3 * tier_step * pairs
+    cost = np.where(valid, tier * tier_step + scores, no_match)
+
+    if n_imgs <= n_lines:
+        chosen = linear_assignment(cost)
+    else:
+        chosen = [-1] * n_imgs
+        for j, i in enumerate(linear_assignment(cost.T)):
+            chosen[i] = j
+    return [j if j >= 0 and valid[i, j] else -1 for i, j in enumerate(chosen)]
+
+def assign_captions(
+    img_bboxes: List[Tuple[float, float, float, float]],
+    lines: List[Tuple[str, Tuple[float, float, float, float]]],
+    max_vertical_gap: float = 110,
+    min_overlap_ratio: float = 0.30,
+    debug: bool = False,
+) -> List[Optional[str]]:
+    """
+    Assign captions to all images on a page at once.
+
+    Candidate lines are the ones that start with a product code (filtered once per
+    page). For every image/line pair a score matrix is built with NumPy, and each
+    pair gets the first search window it falls in:
+      tier 0 - below the image, within max_vertical_gap, horizontally aligned
+               (overlapping min_overlap_ratio of its width, or centered within it)
+      tier 1 - above the image, within min(50, max_vertical_gap / 2), aligned
+      tier 2 - within 2 * max_vertical_gap vertically, center within 1.5 * width
+    Captions are then assigned in one pass over the whole page: every caption is
+    used by at most one image, as many images as possible get one, and among
+    those assignments the closest windows and lowest scores win.
+
+    Returns one caption (or None) per image, in the order of img_bboxes.
+    """
+    captions: List[Optional[str]] = [None] * len(img_bboxes)
+    candidates = [(text, bbox) for text, bbox in lines if PRODUCT_CODE_PATTERN.match(text)]
+
+    if debug:
+        print("\nCandidate caption lines on page:")
+        for text, (lx0, ly0, lx1, ly1) in candidates:
+            print(f"  MATCH: '{text[:60]}...' @ ({lx0:.1f}, {ly0:.1f}, {lx1:.1f}, {ly1:.1f})")
+
+    if not img_bboxes or not candidates:
+        if debug:
+            for bbox in img_bboxes:
+                print(f"\n=== Image bbox: ({bbox[0]:.1f}, {bbox[1]:.1f}, {bbox[2]:.1f}, {bbox[3]:.1f}) ===")
+                print("  NO MATCH FOUND")
+        return captions
+
+    geometry = caption_geometry(img_bboxes, [bbox for _, bbox in candidates])
+    tier, score = caption_tiers(geometry, max_vertical_gap, min_overlap_ratio)
+    chosen = assign_matching(tier, score)
+
+    tier_names = ("BELOW", "ABOVE", "EXTENDED")
+    for i, j in enumerate(chosen):
+        if j >= 0:
+            captions[i] = candidates[j][0].strip()
+        if debug:
+            bx0, by0, bx1, by1 = img_bboxes[i]
+            print(f"\n=== Image bbox: ({bx0:.1f}, {by0:.1f}, {bx1:.1f}, {by1:.1f}) ===")
+            if j >= 0:
+                print(f"  {tier_names[tier[i, j]]} match: '{candidates[j][0][:50]}' score={score[i, j]:.2f}")
+                print(f"  SELECTED: '{candidates[j][0][:60]}'")
+            else:
+                print("  NO MATCH FOUND")
+
+    return captions
 
 def find_caption_for_image(
     img_bbox: Tuple[float, float, float, float],
@@ -409,322 +1073,2599 @@ def find_caption_for_image(
     debug: bool = False,
 ) -> Optional[str]:
     """
-    Find a caption for an image by looking for text lines that:
+    Find a caption for a single image by looking for text lines that:
     1. Start with M followed by digits (product codes like M102595496 or M90637743)
     2. Are positioned below or near the image
     3. Have reasonable horizontal alignment with the image
     
+    Single-image form of assign_captions(); the extraction loop matches whole
+    pages at once so that no caption is claimed twice.
     Falls back to generic pageN_imageM naming if no match found.
     """
-    x0, y0, x1, y1 = img_bbox
-    img_w = max(1.0, x1 - x0)
-    img_center_x = (x0 + x1) / 2.0
-    
-    # Pattern to match product codes - flexible to handle 8-9 digit M-codes
-    # Examples: "M102595496", "M90637743", "M89672118"
-    product_pattern = re.compile(r'^M\d{6,}')
-    
-    if debug:
-        print(f"\n=== Image bbox: ({x0:.1f}, {y0:.1f}, {x1:.1f}, {y1:.1f}) ===")
-        print(f"Image width: {img_w:.1f}, center_x: {img_center_x:.1f}")
-        print("\nAll lines on page:")
-        for text, (lx0, ly0, lx1, ly1) in lines:
-            if product_pattern.match(text):
-                print(f"  MATCH: '{text[:60]}...' @ ({lx0:.1f}, {ly0:.1f}, {lx1:.1f}, {ly1:.1f})")
-
-    def candidate_score(lx0: float, ly0: float, lx1: float, ly1: float, vertical_dist: float) -> float:
-        """Smaller is better. Prioritize vertical proximity and horizontal alignment."""
-        line_center = (lx0 + lx1) / 2.0
-        center_penalty = abs(line_center - img_center_x) / max(img_w, 1.0)
-        return abs(vertical_dist) + 0.3 * center_penalty
-
-    best: Optional[Tuple[str, Tuple[float, float, float, float]]] = None
-    best_score = float("inf")
-
-    # Search below the image first (primary location)
-    for text, (lx0, ly0, lx1, ly1) in lines:
-        if not product_pattern.match(text):
-            continue
-            
-        # Check if line is below image
-        if ly0 >= y1 and (ly0 - y1) <= max_vertical_gap:
-            overlap = horiz_overlap(img_bbox, (lx0, ly0, lx1, ly1))
-            line_center = (lx0 + lx1) / 2.0
-            center_distance_px = abs(line_center - img_center_x)
-            
-            # More lenient matching - just needs some overlap or reasonable centering
-            if overlap >= 0.05 * img_w or center_distance_px <= img_w:
-                score = candidate_score(lx0, ly0, lx1, ly1, ly0 - y1)
-                if score < best_score:
-                    best = (text, (lx0, ly0, lx1, ly1))
-                    best_score = score
-                    if debug:
-                        print(f"  BELOW candidate: '{text[:50]}' score={score:.2f}")
-
-    # Fallback: search above the image (sometimes captions are at top)
-    if not best:
-        above_gap = min(50.0, max_vertical_gap * 0.5)
-        for text, (lx0, ly0, lx1, ly1) in lines:
-            if not product_pattern.match(text):
-                continue
-                
-            if y0 >= ly1 and (y0 - ly1) <= above_gap:
-                overlap = horiz_overlap(img_bbox, (lx0, ly0, lx1, ly1))
-                line_center = (lx0 + lx1) / 2.0
-                center_distance_px = abs(line_center - img_center_x)
-                
-                if overlap >= 0.05 * img_w or center_distance_px <= img_w:
-                    score = candidate_score(lx0, ly0, lx1, ly1, y0 - ly1)
-                    if score < best_score:
-                        best = (text, (lx0, ly0, lx1, ly1))
-                        best_score = score
-                        if debug:
-                            print(f"  ABOVE candidate: '{text[:50]}' score={score:.2f}")
-
-    # Even more lenient fallback: any product code on the page near the image vertically
-    if not best:
-        extended_gap = max_vertical_gap * 2
-        for text, (lx0, ly0, lx1, ly1) in lines:
-            if not product_pattern.match(text):
-                continue
-            
-            # Check if within extended vertical range
-            vertical_dist = min(abs(ly0 - y1), abs(y0 - ly1))
-            if vertical_dist <= extended_gap:
-                line_center = (lx0 + lx1) / 2.0
-                center_distance_px = abs(line_center - img_center_x)
-                
-                if center_distance_px <= img_w * 1.5:
-                    score = candidate_score(lx0, ly0, lx1, ly1, vertical_dist)
-                    if score < best_score:
-                        best = (text, (lx0, ly0, lx1, ly1))
-                        best_score = score
-                        if debug:
-                            print(f"  EXTENDED candidate: '{text[:50]}' score={score:.2f}")
-
-    if not best:
-        if debug:
-            print("  NO MATCH FOUND")
-        return None
-
-    if debug:
-        print(f"  SELECTED: '{best[0][:60]}'")
-    return best[0].strip()
+    return assign_captions(
+        [img_bbox], lines,
+        max_vertical_gap=max_vertical_gap,
+        min_overlap_ratio=min_overlap_ratio,
+        debug=debug,
+    )[0]
 
 # ----------------------------
-# Main extraction routine
+# Near-duplicate detection
 # ----------------------------
 
-def extract_images_with_captions(
-    pdf_path: Path,
-    outdir: Path,
-    img_format: str = "png",
-    also_zip: bool = False,
-    max_vertical_gap: float = 110.0,
-    min_overlap_ratio: float = 0.30,
-    debug: bool = False,
-) -> Path:
-    outdir.mkdir(parents=True, exist_ok=True)
-    doc = fitz.open(pdf_path.as_posix())
+def perceptual_hash(image_bytes: Union[bytes, fitz.Pixmap]) -> str:
+    """
+    64-bit difference hash (dHash) of an encoded image (or a decoded Pixmap,
+    which is left unchanged), as 16 hex digits.
 
-    manifest_rows = []
-    saved_count = 0
-    skipped_duplicates = 0
-    skipped_banners = 0
-    failed_captions = 0
-    
-    # Track seen images by hash to avoid duplicates
-    seen_hashes: Set[str] = set()
-
-    for pno in range(len(doc)):
-        page = doc[pno]
-        page_rect = page.rect
-        lines = lines_from_page(page)
-        page_text = page.get_text("text")
-        images = images_from_page(page)
-        
-        print(f"Page {pno + 1}: Found {len(images)} images")
+    The image is reduced to a 9x8 grayscale grid by block averaging and each
+    bit records whether a cell is brighter than its left neighbour, so
+    re-encoded or slightly rescaled copies of a mockup hash (almost) the same.
+    """
+    import fitz  # PyMuPDF
+    import numpy as np
 
-        for idx, img in enumerate(images, start=1):
-            # Skip duplicate images based on hash
-            img_hash = img["hash"]
-            if img_hash in seen_hashes:
-                skipped_duplicates += 1
-                if debug:
-                    print(f"  Skipping duplicate image (hash: {img_hash[:8]}...)")
-                continue
-            
-            seen_hashes.add(img_hash)
-            
-            caption = find_caption_for_image(
-                img["bbox"], lines, page_rect.height,
-                max_vertical_gap=max_vertical_gap,
-                min_overlap_ratio=min_overlap_ratio,
-                debug=debug and pno == 0  # Only debug first page
-            )
-            
-            if not caption:
-                caption = f"page{pno+1}_image{idx}"
-                failed_captions += 1
-                print(f"  ⚠️  No caption found for image {idx} on page {pno+1}, using: {caption}")
+    pix = fitz.Pixmap(image_bytes)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    shrink_pixmap(pix, 36, 32)
 
-            # Categorize the image based on caption
-            category = categorize_image(caption)
-            
-            # Skip banner items (category is None)
-            if category is None:
-                skipped_banners += 1
-                print(f"  ⊗ Skipped banner item: {caption[:60]}")
-                continue
-            
-            # Create category subfolder
-            category_dir = outdir / category
-            category_dir.mkdir(parents=True, exist_ok=True)
-            
-            base = slugify(caption)
+    h, w = pix.height, pix.width
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(h, pix.stride)[:, :w].astype(np.float64)
+    if h < 8:
+        gray = np.repeat(gray, -(-8 // h), axis=0)
+    if w < 9:
+        gray = np.repeat(gray, -(-9 // w), axis=1)
+    h, w = gray.shape
 
-            # Choose suffix based on requested format; we always dump the raw bytes from PDF
-            req = img_format.lower()
-            if req == "jpg":
-                suffix = ".jpg"
-            else:
-                suffix = ".png"
+    rows = np.arange(8) * h // 8
+    cols = np.arange(9) * w // 9
+    grid = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    grid /= np.outer(np.diff(np.append(rows, h)), np.diff(np.append(cols, w)))
+    bits = grid[:, 1:] > grid[:, :-1]
+    return np.packbits(bits.ravel()).tobytes().hex()
 
-            out_path = unique_path(category_dir, base, suffix)
-            with open(out_path, "wb") as f:
-                f.write(img["bytes"])
-            saved_count += 1
-            
-            print(f"  ✓ Saved: {out_path.name} → {category}/")
+def shrink_pixmap(pix: fitz.Pixmap, min_width: int, min_height: int) -> None:
+    """Halve pix in place (in C) while it stays at least min_width x min_height."""
+    factor = 0
+    while (pix.width >> (factor + 1)) >= min_width and (pix.height >> (factor + 1)) >= min_height:
+        factor += 1
+    if factor:
+        pix.shrink(factor)
 
-            # Check if this item has "Hood" in caption (for hoodie-only restriction)
-            has_hood = "hood" in caption.lower()
-            
-            manifest_rows.append({
-                "page": pno + 1,
-                "image_index_on_page": idx,
-                "filename": out_path.name,
-                "caption": caption,
-                "category_subfolder": category,
-                "output_path": str(out_path.relative_to(outdir)),
-                "image_hash": img_hash,
-                "image_size_bytes": img["size"],
-                "has_hood": has_hood
-            })
+class BKTree:
+    """
+    BK-tree over 64-bit perceptual hashes with Hamming distance.
 
-    # Write manifest
-    manifest_df = pd.DataFrame(manifest_rows)
-    manifest_csv = outdir / "manifest.csv"
-    manifest_df.to_csv(manifest_csv, index=False)
-
-    # Optional ZIP
-    if also_zip:
-        zip_path = outdir.with_suffix(".zip")
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in outdir.walk():
-                for file in files:
-                    file_path = root / file
-                    arcname = file_path.relative_to(outdir)
-                    zf.write(file_path, arcname=str(arcname))
-        print(f"Zipped output: {zip_path}")
-        return zip_path
+    A radius query only descends into children whose edge distance lies within
+    [d - radius, d + radius] of the node's distance d (triangle inequality),
+    so lookups touch a small part of the tree instead of every stored hash.
+    Each node holds all items that share one exact hash.
+    """
+
+    def __init__(self):
+        self.root: Optional[List[Any]] = None  # [hash, items, {distance: child}]
+        self.size = 0
+
+    def add(self, key: int, item: Any) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = [key, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = (node[0] ^ key).bit_count()
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [key, [item], {}]
+                return
+            node = child
+
+    def search(self, key: int, radius: int) -> List[Tuple[int, Any]]:
+        """All (distance, item) pairs within radius of key, nearest first."""
+        found: List[Tuple[int, Any]] = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = (node[0] ^ key).bit_count()
+            if d <= radius:
+                found.extend((d, item) for item in node[1])
+            stack.extend(child for dist, child in node[2].items() if d - radius <= dist <= d + radius)
+        found.sort(key=lambda hit: hit[0])
+        return found
+
+def load_near_duplicate_index(public_dir: Path, current_college: str) -> Tuple[BKTree, Dict[str, Dict[str, Any]]]:
+    """
+    Index the dhash of every image in the other colleges' manifests.
+
+    Returns the BK-tree (items are {'ref': 'College/output_path', 'college',
+    'caption'}) and an image_hash -> visuals map (see image_visuals) over all
+    manifests, including the current college's, so known images don't have
+    to be decoded again.
+    """
+    index = BKTree()
+    known: Dict[str, Dict[str, Any]] = {}
+    if not public_dir.is_dir():
+        return index, known
+    for entry in sorted(os.scandir(public_dir), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        for row in load_previous_manifest(Path(entry.path)):
+            visuals = visuals_from_row(row)
+            if visuals:
+                known[row["image_hash"]] = visuals
+            bits = dhash_bits(row.get("dhash"))
+            if bits is not None and entry.name != current_college:
+                index.add(bits, {
+                    "ref": f"{entry.name}/{row['output_path']}",
+                    "college": entry.name,
+                    "caption": row.get("caption", ""),
+                })
+    return index, known
+
+# ----------------------------
+# Image dimensions and placeholders
+# ----------------------------
+
+# Per-image fields computed from one decode of the image (see image_visuals)
+VISUAL_FIELDS = ("dhash", "width", "height", "blurhash", "color")
+NO_VISUALS = dict.fromkeys(VISUAL_FIELDS, "")
+BLURHASH_COMPONENTS = (4, 3)
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+def image_dimensions(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) read from a PNG, JPEG, GIF or WebP header without decoding
+    the image, or None for other formats.
+    """
+    b = image_bytes
+    if b[:8] == b"\x89PNG\r\n\x1a\n" and len(b) >= 24:
+        return int.from_bytes(b[16:20], "big"), int.from_bytes(b[20:24], "big")
+    if b[:6] in (b"GIF87a", b"GIF89a") and len(b) >= 10:
+        return int.from_bytes(b[6:8], "little"), int.from_bytes(b[8:10], "little")
+    if b[:4] == b"RIFF" and b[8:12] == b"WEBP" and len(b) >= 30:
+        chunk = b[12:16]
+        if chunk == b"VP8 ":
+            return int.from_bytes(b[26:28], "little") & 0x3FFF, int.from_bytes(b[28:30], "little") & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(b[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(b[24:27], "little") + 1, int.from_bytes(b[27:30], "little") + 1
+    if b[:2] == b"\xff\xd8":
+        # Walk the JPEG segments up to the first start-of-frame marker
+        i = 2
+        while i + 9 < len(b):
+            if b[i] != 0xFF:
+                i += 1
+                continue
+            marker = b[i + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+                i += 1 if marker == 0xFF else 2
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                return int.from_bytes(b[i + 7:i + 9], "big"), int.from_bytes(b[i + 5:i + 7], "big")
+            i += 2 + int.from_bytes(b[i + 2:i + 4], "big")
+    return None
+
+def encode_base83(value: int, length: int) -> str:
+    return "".join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+def blurhash_encode(rgb: np.ndarray, components: Tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+    """
+    BlurHash (https://blurha.sh) of an (h, w, 3) array of sRGB values in 0-255.
+    All basis functions are evaluated at once as two small cosine matrices.
+    """
+    import numpy as np
+
+    cx, cy = components
+    h, w = rgb.shape[:2]
+    srgb = rgb / 255.0
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    basis_y = np.cos(np.pi * np.outer(np.arange(cy), np.arange(h)) / h)
+    basis_x = np.cos(np.pi * np.outer(np.arange(cx), np.arange(w)) / w)
+    factors = np.einsum("jy,ix,yxc->jic", basis_y, basis_x, linear) / (w * h)
+    factors[1:] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+    dc, ac = factors[0], factors[1:]
+
+    def to_srgb(v: np.ndarray) -> np.ndarray:
+        v = np.clip(v, 0, 1)
+        return np.where(v <= 0.0031308, v * 12.92 * 255 + 0.5, (1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5).astype(int)
+
+    result = encode_base83((cx - 1) + (cy - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+    else:
+        quantised_max, max_value = 0, 1.0
+    result += encode_base83(quantised_max, 1)
+    r, g, b = to_srgb(dc)
+    result += encode_base83((int(r) << 16) + (int(g) << 8) + int(b), 4)
+    scaled = ac / max_value
+    quant = np.clip(np.floor(np.sign(scaled) * np.abs(scaled) ** 0.5 * 9 + 9.5), 0, 18).astype(int)
+    for qr, qg, qb in quant:
+        result += encode_base83(int(qr) * 19 * 19 + int(qg) * 19 + int(qb), 2)
+    return result
+
+def image_visuals(image_bytes: bytes) -> Dict[str, Any]:
+    """
+    Everything the frontend needs before loading an image, from a single
+    decode: width/height (from the header when possible), the dhash used for
+    near-duplicates, a BlurHash placeholder and the dominant colour as #rrggbb.
+
+    The placeholder and colour are computed with NumPy on a copy shrunk to
+    about 32px; transparent areas count as white, as on the storefront. If
+    MuPDF can't decode the image every field is left empty (see NO_VISUALS);
+    the image itself is still written as-is.
+    """
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    try:
+        pix = fitz.Pixmap(image_bytes)
+    except Exception:
+        return dict(NO_VISUALS)
+    width, height = image_dimensions(image_bytes) or (pix.width, pix.height)
+    dhash = perceptual_hash(pix)
+
+    small = fitz.Pixmap(fitz.csRGB, pix) if pix.n - pix.alpha != 3 else fitz.Pixmap(pix)
+    shrink_pixmap(small, 32, 32)
+    h, w, n = small.height, small.width, small.n
+    px = np.frombuffer(small.samples, dtype=np.uint8).reshape(h, small.stride)[:, :w * n].reshape(h, w, n).astype(np.float64)
+    rgb = px[..., :3]
+    opaque = np.ones((h, w), dtype=bool)
+    if small.alpha:
+        # Samples are premultiplied: compositing over white adds the uncovered part
+        alpha = px[..., 3:] / 255.0
+        rgb = rgb + 255.0 * (1.0 - alpha)
+        opaque = alpha[..., 0] >= 0.5
+    rgb = np.clip(rgb, 0, 255)
+
+    # Dominant colour: most common 4-bit-per-channel bin among opaque pixels, averaged
+    pixels = rgb[opaque] if opaque.any() else rgb.reshape(-1, 3)
+    bins = (pixels.astype(np.int64) >> 4) @ np.array([256, 16, 1])
+    top = np.bincount(bins).argmax()
+    color = "#" + "".join(f"{int(round(c)):02x}" for c in pixels[bins == top].mean(axis=0))
+
+    return {"dhash": dhash, "width": width, "height": height, "blurhash": blurhash_encode(rgb), "color": color}
+
+def dhash_bits(dhash: str) -> Optional[int]:
+    """
+    The dhash as an int for near-duplicate lookups, or None when there is none
+    to compare: empty (undecodable image) or all zeros (a flat image, which
+    would match every other flat image).
+    """
+    bits = int(dhash, 16) if dhash else 0
+    return bits or None
+
+def visuals_from_row(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The VISUAL_FIELDS of a manifest row, or None if any of them is missing."""
+    if not all(row.get(field) for field in VISUAL_FIELDS):
+        return None
+    visuals = {field: row[field] for field in VISUAL_FIELDS}
+    visuals["width"], visuals["height"] = int(visuals["width"]), int(visuals["height"])
+    return visuals
+
+# ----------------------------
+# Incremental output
+# ----------------------------
+
+MANIFEST_FIELDS = [
+    "page", "image_index_on_page", "filename", "caption", "category_subfolder",
+    "output_path", "image_hash", "image_size_bytes", "has_hood", "dhash",
+    "near_duplicate_of", "width", "height", "blurhash", "color",
+]
+
+class ManifestWriter:
+    """
+    Streams manifest rows to a temp file as images are saved and atomically
+    renames it to manifest.csv on commit(). If a run dies half way, the rows
+    written so far survive in the temp file and the previous manifest.csv is
+    left untouched. With resume_offset (an earlier offset) the temp file is
+    truncated there and appended to instead of being started over.
+    """
+
+    def __init__(self, outdir: Path, fields: List[str] = MANIFEST_FIELDS, resume_offset: Optional[int] = None):
+        self.path = outdir / "manifest.csv"
+        self.tmp_path = outdir / "manifest.csv.partial"
+        self.rows = 0
+        if resume_offset is None:
+            self._file = open(self.tmp_path, "w", encoding="utf-8", newline="")
+        else:
+            self._file = open(self.tmp_path, "r+", encoding="utf-8", newline="")
+            self._file.seek(resume_offset)
+            self._file.truncate()
+        self._writer = csv.DictWriter(self._file, fieldnames=fields, lineterminator=os.linesep)
+        if resume_offset is None:
+            self._writer.writeheader()
+        self.offset = self._file.tell()
+        if resume_offset is not None:
+            self.rows = len(self.written_rows())
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._writer.writerow(row)
+        self._file.flush()
+        self.rows += 1
+        self.offset = self._file.tell()
+
+    def written_rows(self) -> List[Dict[str, str]]:
+        """The rows written so far, read back from the temp file."""
+        with open(self.tmp_path, "rb") as f:
+            text = f.read(self.offset).decode("utf-8")
+        return list(csv.DictReader(io.StringIO(text, newline="")))
+
+    def commit(self) -> Path:
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+def load_previous_manifest(outdir: Path) -> List[Dict[str, str]]:
+    """Read the manifest of the previous run (empty list if there is none)."""
+    manifest_csv = outdir / "manifest.csv"
+    if not manifest_csv.exists():
+        return []
+    with open(manifest_csv, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        # Older manifests were written on Windows with backslash separators
+        row["output_path"] = (row.get("output_path") or "").replace("\\", "/")
+    return rows
+
+class Checkpoint:
+    """
+    Progress of an unfinished run, kept as <College>/.checkpoint.jsonl until
+    the run commits, so --resume can continue after the last finished page.
+
+    The first line identifies the run (the PDF's size and mtime plus the
+    options that change the output); a resume with a different PDF or options
+    starts over. Then one line is appended per finished page holding only what
+    that page added: seen xrefs and hashes, the ImageWriter plan entries, the
+    manifest.csv.partial offset and the running counters. Allocated names and
+    this run's near-duplicate entries are rebuilt from the manifest rows. A
+    line torn by a crash is dropped on load.
+    """
+
+    FILENAME = ".checkpoint.jsonl"
+    SETS = ("xrefs", "hashes")
+    PLAN = ("keep", "rename", "write")
+
+    def __init__(self, outdir: Path, run: Dict[str, Any]):
+        self.path = outdir / self.FILENAME
+        self.run = run
+        self._file = None
+        self._done: Dict[str, Any] = {}
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """The merged state of a matching checkpoint, or None."""
+        if not self.path.exists():
+            return None
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        state: Dict[str, Any] = {"page": -1, **{name: [] for name in self.SETS + self.PLAN}}
+        valid = 0
+        for line in raw.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if valid == 0:
+                if entry != self.run:
+                    return None
+            else:
+                for name in self.SETS + self.PLAN:
+                    state[name].extend(entry.pop(name, []))
+                state.update(entry)
+            valid += len(line)
+        if valid == 0:
+            return None
+        state["rename"] = [tuple(pair) for pair in state["rename"]]
+        state["size"] = valid
+        return state
+
+    def start(self, state: Optional[Dict[str, Any]] = None) -> None:
+        """Begin a new checkpoint, or continue the loaded state (dropping any torn tail)."""
+        if state is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(json.dumps(self.run) + "\n")
+            self._file.flush()
+            return
+        with open(self.path, "r+b") as f:
+            f.truncate(state["size"])
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._done = {name: set(state[name]) for name in self.SETS}
+        self._done.update({name: len(state[name]) for name in self.PLAN})
+
+    def entry(self, pno: int, collections: Dict[str, Any], **values: Any) -> Dict[str, Any]:
+        """
+        What changed since the last page: new set members, new plan entries,
+        current values. Entries are written with write(), in page order, once
+        the page's files are in place.
+        """
+        entry: Dict[str, Any] = {"page": pno, **values}
+        for name in self.SETS:
+            done = self._done.setdefault(name, set())
+            new = collections[name] - done
+            done |= new
+            entry[name] = sorted(new)
+        for name in self.PLAN:
+            items = collections["plan"][name]
+            entry[name] = items[self._done.get(name, 0):]
+            self._done[name] = len(items)
+        return entry
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        """Append one entry from entry()."""
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def discard(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+        self.path.unlink(missing_ok=True)
+
+class ZipSink:
+    """
+    Builds the --zip archive while images are being saved, straight from the
+    bytes already in memory (or from disk for files an incremental run keeps).
+
+    PNG/JPEG and other image formats are already compressed, so they are stored
+    as-is; only text members such as manifest.csv are deflated. The archive is
+    written to a temp file and renamed into place on close().
+    """
+
+    STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif"}
+
+    def __init__(self, zip_path: Path):
+        self.path = zip_path
+        self.tmp_path = zip_path.with_name(zip_path.name + ".partial")
+        self._zf = zipfile.ZipFile(self.tmp_path, "w")
+
+    def _compression(self, arcname: str) -> int:
+        if os.path.splitext(arcname)[1].lower() in self.STORED_SUFFIXES:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    def add_bytes(self, arcname: str, data: bytes) -> None:
+        self._zf.writestr(arcname, data, compress_type=self._compression(arcname))
+
+    def add_file(self, arcname: str, path: Path) -> None:
+        self._zf.write(path, arcname=arcname, compress_type=self._compression(arcname))
+
+    def close(self) -> Path:
+        self._zf.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+# Shared image store below the project root (see ImageStore)
+STORE_DIRNAME = ".image_store"
+
+# Lease files of the processes writing to a store, by store root (see ImageStore.register)
+_store_leases: Dict[str, Any] = {}
+_store_leases_lock = threading.Lock()
+
+def try_lock_file(f: Any) -> bool:
+    """Non-blocking exclusive lock on an open file; False if another process holds it."""
+    try:
+        f.seek(0)
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+class ImageStore:
+    """
+    Content-addressed store shared by all colleges.
+
+    Every unique image is kept once as <root>/<hash[:2]>/<hash>, and the
+    category files under public/<College>/ are links to it:
+      hardlink - (default) falls back to a copy where the filesystem can't link
+      symlink  - relative symlinks, falling back to a copy
+      copy     - plain copies; the store still saves reading bytes from the PDF
+    Files are always replaced via os.replace, never written in place, so a
+    hardlinked image can't change the store or another college's copy.
+
+    Every process that writes or links images holds a lease in <root>/.runs/
+    for the rest of its life; prune() leaves the store alone while another
+    process holds one.
+    """
+
+    LINK_MODES = ("hardlink", "symlink", "copy")
+    RUNS_DIRNAME = ".runs"
+    # An unlocked, empty lease this young may belong to a process that is just taking it
+    LEASE_GRACE_SECONDS = 60
+
+    def __init__(self, root: Path, link_mode: str = "hardlink"):
+        if link_mode not in self.LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link_mode}")
+        self.root = root
+        self.link_mode = link_mode
+        self.counts: Counter = Counter()  # kept by ImageWriter: stored, hardlink, symlink, copy
+        self.bytes_written = 0
+
+    def path_for(self, img_hash: str) -> Path:
+        return self.root / img_hash[:2] / img_hash
+
+    def has(self, img_hash: str) -> bool:
+        return self.path_for(img_hash).is_file()
+
+    def register(self) -> None:
+        """
+        Take this process's lease on the store (once): a file in .runs/ that
+        stays locked until the process exits. The lock is taken before
+        anything is written to the file, so a non-empty lease that can be
+        locked belongs to a process that is gone.
+        """
+        key = str(self.root)
+        with _store_leases_lock:
+            if key in _store_leases:
+                return
+            runs = self.root / self.RUNS_DIRNAME
+            runs.mkdir(parents=True, exist_ok=True)
+            f = open(runs / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.lease", "w+b")
+            try_lock_file(f)
+            f.write(b"1")
+            f.flush()
+            _store_leases[key] = f
+
+    def in_use_elsewhere(self) -> bool:
+        """True if another live process holds a lease; leases of exited processes are removed."""
+        runs = self.root / self.RUNS_DIRNAME
+        if not runs.is_dir():
+            return False
+        own = _store_leases.get(str(self.root))
+        for entry in os.scandir(runs):
+            if own is not None and os.path.abspath(entry.path) == os.path.abspath(own.name):
+                continue
+            try:
+                with open(entry.path, "rb") as f:
+                    if not try_lock_file(f):
+                        return True
+                    f.seek(0)
+                    taken = bool(f.read(1))
+                if not taken and time.time() - entry.stat().st_mtime < self.LEASE_GRACE_SECONDS:
+                    return True
+                os.unlink(entry.path)
+            except OSError:
+                return True
+        return False
+
+    def write(self, img_hash: str, data: bytes) -> None:
+        """Store an image's bytes (atomically; safe from several threads and processes)."""
+        self.register()
+        path = self.path_for(img_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def link(self, img_hash: str, dest: Path, final: Optional[Path] = None) -> str:
+        """
+        Make dest a link to the stored image and return the link mode used.
+        final is where dest will end up if it is staged elsewhere first, so
+        relative symlinks point the right way.
+        """
+        self.register()
+        src = self.path_for(img_hash)
+        if (self.link_mode != "copy" and dest.exists() and os.path.samefile(dest, src)
+                and dest.is_symlink() == (self.link_mode == "symlink")):
+            # Already linked (a rerun over its own output) - os.replace onto the same file would be a no-op
+            return self.link_mode
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        mode = self.link_mode
+        try:
+            if mode == "hardlink":
+                os.link(src, tmp)
+            elif mode == "symlink":
+                os.symlink(os.path.relpath(src, (final or dest).parent), tmp)
+        except OSError:
+            mode = "copy"
+        if mode == "copy":
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        # Renaming a hardlink onto another link of the same file leaves both names in place
+        tmp.unlink(missing_ok=True)
+        return mode
+
+    def prune(self, referenced: Set[str]) -> Optional[int]:
+        """
+        Delete stored images whose hash no manifest references; returns the
+        count, or None (nothing deleted) while another process is using the
+        store - its new images may not be in any manifest yet.
+        """
+        removed = 0
+        if not self.root.is_dir():
+            return 0
+        if self.in_use_elsewhere():
+            return None
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir() or bucket.name.startswith("."):
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name not in referenced:
+                    os.unlink(entry.path)
+                    removed += 1
+        return removed
+
+def manifest_hashes(public_dir: Path) -> Set[str]:
+    """image_hash of every image listed in any college's manifest.csv."""
+    hashes: Set[str] = set()
+    if public_dir.is_dir():
+        for entry in os.scandir(public_dir):
+            if entry.is_dir():
+                hashes.update(row.get("image_hash", "") for row in load_previous_manifest(Path(entry.path)))
+    return hashes
+
+def write_file(path: Path, data: bytes) -> None:
+    """
+    Write bytes to path, creating parent folders. The file is replaced, not
+    written in place, so an older hardlink at path never sees the new bytes.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class BackgroundWriter:
+    """
+    Runs file writes on a small thread pool so the main thread can go on
+    decoding and matching the next images.
+
+    submit() blocks while the bytes of queued jobs would exceed max_pending_bytes
+    (a single job larger than the budget still runs on its own), so memory stays
+    bounded however far parsing gets ahead. A failed write is raised on the next
+    submit(), results_through() or flush(); flush() waits for every queued job
+    and returns the results not returned yet. Results are returned in
+    submission order, so results_through(n) can tell when the first n jobs are
+    all done without waiting for the rest.
+    """
+
+    def __init__(self, threads: int = 4, max_pending_bytes: int = 64 * 1024 * 1024):
+        self.max_pending_bytes = max_pending_bytes
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="image-writer")
+        self._budget = threading.Condition()
+        self._pending_bytes = 0
+        self._futures: Deque[Tuple[Future, str]] = deque()
+        self._results: List[Any] = []
+        self._returned = 0
+        self.submitted = 0
+
+    def submit(self, nbytes: int, label: str, fn: Callable[..., Any], *args: Any) -> None:
+        """Queue fn(*args), which will write about nbytes; label names it in error messages."""
+        self._collect(block=False)
+        with self._budget:
+            while self._pending_bytes and self._pending_bytes + nbytes > self.max_pending_bytes:
+                self._budget.wait()
+            self._pending_bytes += nbytes
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda _, n=nbytes: self._release(n))
+        self._futures.append((future, label))
+        self.submitted += 1
+
+    def _release(self, nbytes: int) -> None:
+        with self._budget:
+            self._pending_bytes -= nbytes
+            self._budget.notify_all()
+
+    def _collect(self, block: bool) -> None:
+        """
+        Move the results of finished jobs that have no unfinished job before them
+        to self._results (every job with block=True); raise on failures.
+        """
+        if block:
+            wait([future for future, _ in self._futures])
+        errors = [(label, future.exception()) for future, label in self._futures
+                  if future.done() and future.exception() is not None]
+        if errors:
+            self._futures = deque(job for job in self._futures if not job[0].done())
+            details = "; ".join(f"{label}: {exc}" for label, exc in errors[:5])
+            raise OSError(f"{len(errors)} background image writes failed - {details}")
+        while self._futures and self._futures[0][0].done():
+            self._results.append(self._futures.popleft()[0].result())
+
+    def results_through(self, count: int) -> Optional[List[Any]]:
+        """
+        Once the first count submitted jobs have all finished, the results of
+        those not returned yet; None while some are still running. Doesn't wait.
+        """
+        self._collect(block=False)
+        if self._returned + len(self._results) < count:
+            return None
+        n = max(0, count - self._returned)
+        results, self._results = self._results[:n], self._results[n:]
+        self._returned += n
+        return results
+
+    def flush(self) -> List[Any]:
+        """Wait for every queued write and return their results; raise if any failed."""
+        self._collect(block=True)
+        results, self._results = self._results, []
+        self._returned += len(results)
+        return results
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+class ImageWriter:
+    """
+    Writes extracted images below outdir.
+
+    Without a previous manifest every image is written straight to its final path.
+    With one (incremental mode) each image is diffed against it by output_path and
+    image_hash:
+      keep   - same path, same hash: the file is left alone (bytes and mtime kept)
+      rename - same hash at another path: the old file is moved
+      write  - new content: bytes are staged and moved into place on commit()
+    Files listed in the previous manifest that are no longer produced are deleted
+    on commit(). With dry_run nothing on disk is touched; commit() only returns
+    the plan. With an ImageStore, written files are links into the store. With
+    a BackgroundWriter, bytes are read here but written on its threads;
+    commit() waits for them first. A plan from a Checkpoint continues an
+    interrupted run: its files are already in place (or staged) and are only
+    added to the zip again.
+    """
+
+    STAGING_DIR = ".incremental"
+
+    def __init__(
+        self,
+        outdir: Path,
+        previous_rows: Optional[List[Dict[str, str]]] = None,
+        dry_run: bool = False,
+        zip_sink: Optional[ZipSink] = None,
+        store: Optional[ImageStore] = None,
+        background: Optional[BackgroundWriter] = None,
+        plan: Optional[Dict[str, List[Any]]] = None,
+    ):
+        self.outdir = outdir
+        self.zip_sink = zip_sink
+        self.store = store
+        self.background = background
+        self.incremental = previous_rows is not None
+        self.dry_run = dry_run
+        self.previous: Dict[str, Dict[str, str]] = {}
+        self.previous_by_hash: Dict[str, List[str]] = {}
+        for row in previous_rows or []:
+            rel = row["output_path"]
+            if rel and (outdir / rel).is_file():
+                self.previous[rel] = row
+                self.previous_by_hash.setdefault(row.get("image_hash", ""), []).append(rel)
+        self.plan: Dict[str, List[Any]] = {"keep": [], "rename": [], "write": [], "delete": []}
+        self.bytes_written = 0
+        self._used_sources: Set[str] = set()
+        self._staging = outdir / self.STAGING_DIR
+        if plan is not None:
+            self._resume(plan)
+        elif self.incremental and not dry_run:
+            shutil.rmtree(self._staging, ignore_errors=True)
+
+    def _resume(self, plan: Dict[str, List[Any]]) -> None:
+        for name in ("keep", "rename", "write"):
+            self.plan[name] = list(plan[name])
+        self._used_sources.update(self.plan["keep"])
+        self._used_sources.update(source for source, _ in self.plan["rename"])
+        if self.zip_sink:
+            written = self._staging if self.incremental else self.outdir
+            for rel in self.plan["keep"]:
+                self.zip_sink.add_file(rel, self.outdir / rel)
+            for source, dst in self.plan["rename"]:
+                self.zip_sink.add_file(dst, self.outdir / source)
+            for rel in self.plan["write"]:
+                self.zip_sink.add_file(rel, written / rel)
+
+    def add(self, rel_path: str, img_hash: str, data: Union[bytes, Callable[[], bytes]]) -> str:
+        """
+        Record (and, unless deferred, write) one image. Returns the action taken.
+        data may be a callable so bytes are only read when they are written.
+        """
+        if not self.incremental:
+            self._write(rel_path, self.outdir / rel_path, img_hash, data)
+            self.plan["write"].append(rel_path)
+            return "write"
+
+        previous = self.previous.get(rel_path)
+        if (previous is not None and previous.get("image_hash") == img_hash
+                and str((self.outdir / rel_path).stat().st_size) == str(previous.get("image_size_bytes"))):
+            self._used_sources.add(rel_path)
+            self.plan["keep"].append(rel_path)
+            if self.zip_sink:
+                self.zip_sink.add_file(rel_path, self.outdir / rel_path)
+            return "keep"
+
+        for source in self.previous_by_hash.get(img_hash, []):
+            if source not in self._used_sources:
+                self._used_sources.add(source)
+                self.plan["rename"].append((source, rel_path))
+                if self.zip_sink:
+                    self.zip_sink.add_file(rel_path, self.outdir / source)
+                return "rename"
+
+        if not self.dry_run:
+            self._write(rel_path, self._staging / rel_path, img_hash, data)
+        self.plan["write"].append(rel_path)
+        return "write"
+
+    def _write(self, rel_path: str, path: Path, img_hash: str, data: Union[bytes, Callable[[], bytes]]) -> None:
+        """
+        Write (or link from the store) one image at path and add it to the zip.
+        Bytes are only read (here, on the calling thread) when the image isn't
+        stored yet or the zip needs them; the file work itself is handed to the
+        background writer when there is one.
+        """
+        if self.store and self.store.has(img_hash):
+            self._run(0, rel_path, self._link, img_hash, None, path, rel_path)
+            if self.zip_sink:
+                self.zip_sink.add_file(rel_path, self.store.path_for(img_hash))
+            return
+
+        data = data() if callable(data) else data
+        self.bytes_written += len(data)
+        if self.store:
+            stored = not self.store.has(img_hash)
+            if stored:
+                self.store.counts["stored"] += 1
+                self.store.bytes_written += len(data)
+            self._run(len(data), rel_path, self._link, img_hash, data if stored else None, path, rel_path)
+        else:
+            self._run(len(data), rel_path, write_file, path, data)
+        if self.zip_sink:
+            self.zip_sink.add_bytes(rel_path, data)
+
+    def _link(self, img_hash: str, data: Optional[bytes], path: Path, rel_path: str) -> str:
+        """Store data (if given) and link path to it; returns the link mode used."""
+        if data is not None:
+            self.store.write(img_hash, data)
+        return self.store.link(img_hash, path, final=self.outdir / rel_path)
+
+    def _run(self, nbytes: int, label: str, fn: Callable[..., Any], *args: Any) -> None:
+        if self.background:
+            self.background.submit(nbytes, label, fn, *args)
+        else:
+            self._record([fn(*args)])
+
+    def _record(self, results: List[Any]) -> None:
+        if self.store:
+            self.store.counts.update(mode for mode in results if mode)
+
+    @property
+    def queued(self) -> int:
+        """Writes handed to the background writer so far (for settled())."""
+        return self.background.submitted if self.background else 0
+
+    def settled(self, queued: int) -> bool:
+        """
+        True once the first queued background writes have finished; their
+        results are recorded then. Doesn't wait (raises if any failed).
+        """
+        if not self.background:
+            return True
+        results = self.background.results_through(queued)
+        if results is None:
+            return False
+        self._record(results)
+        return True
+
+    def flush(self) -> None:
+        """Wait for queued background writes (raises if any failed)."""
+        if self.background:
+            self._record(self.background.flush())
+
+    def commit(self) -> Dict[str, List[Any]]:
+        """Finish background writes, apply deferred renames, writes and deletes; returns the plan."""
+        self.flush()
+        if not self.incremental:
+            return self.plan
+
+        produced = set(self.plan["keep"]) | {dst for _, dst in self.plan["rename"]} | set(self.plan["write"])
+        self.plan["delete"] = sorted(
+            rel for rel in self.previous if rel not in self._used_sources and rel not in produced
+        )
+        if self.dry_run:
+            return self.plan
+
+        # Move rename sources aside first so swaps and reused names can't collide
+        moved = []
+        for n, (source, dst) in enumerate(self.plan["rename"]):
+            tmp = self._staging / f"rename-{n}"
+            tmp.parent.mkdir(parents=True, exist_ok=True)
+            move_file(self.outdir / source, tmp)
+            moved.append((tmp, dst))
+        for rel in self.plan["delete"]:
+            (self.outdir / rel).unlink(missing_ok=True)
+        for tmp, dst in moved:
+            (self.outdir / dst).parent.mkdir(parents=True, exist_ok=True)
+            move_file(tmp, self.outdir / dst)
+        # Staged links already point at the store relative to their final folder
+        for rel in self.plan["write"]:
+            out_path = self.outdir / rel
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._staging / rel, out_path)
+        shutil.rmtree(self._staging, ignore_errors=True)
+        return self.plan
+
+def print_plan(plan: Dict[str, List[Any]], quiet: bool = False) -> None:
+    """
+    Print an incremental plan (used for --dry-run and the run summary);
+    quiet=True prints only the counts, not a line per file.
+    """
+    print(f"\n📝 Plan: keep {len(plan['keep'])}, write {len(plan['write'])}, "
+          f"rename {len(plan['rename'])}, delete {len(plan['delete'])}")
+    if quiet:
+        return
+    for rel in plan["write"]:
+        print(f"  + write  {rel}")
+    for source, dst in plan["rename"]:
+        print(f"  ~ rename {source} → {dst}")
+    for rel in plan["delete"]:
+        print(f"  - delete {rel}")
+
+# ----------------------------
+# Catalogue database
+# ----------------------------
+
+# SQLite catalogue below the project root (see Catalogue)
+CATALOGUE_FILENAME = "catalogue.sqlite"
+
+class Catalogue:
+    """
+    SQLite catalogue of every college's extracted images.
+
+    Mirrors the per-college manifest.csv files in normalized tables -
+    colleges, images (one row per image_hash), captions (with the M-code),
+    categories and placements (one row per saved file) - indexed on M-code,
+    hash and category, so cross-college questions are single queries instead
+    of scans over every CSV. A college is always replaced as a whole in one
+    transaction; rows are inserted in batches of BATCH_SIZE. The manifests
+    stay the source for incremental runs and can be re-exported from here.
+    """
+
+    BATCH_SIZE = 500
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS colleges (
+            id INTEGER PRIMARY KEY,
+            folder TEXT NOT NULL UNIQUE,
+            config TEXT,
+            name TEXT,
+            updated_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS images (
+            hash TEXT PRIMARY KEY,
+            size_bytes INTEGER,
+            dhash TEXT,
+            width INTEGER,
+            height INTEGER,
+            blurhash TEXT,
+            color TEXT
+        );
+        CREATE TABLE IF NOT EXISTS captions (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL UNIQUE,
+            mcode TEXT,
+            has_hood INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS placements (
+            id INTEGER PRIMARY KEY,
+            college_id INTEGER NOT NULL REFERENCES colleges(id),
+            image_hash TEXT NOT NULL REFERENCES images(hash),
+            caption_id INTEGER REFERENCES captions(id),
+            category_id INTEGER REFERENCES categories(id),
+            page INTEGER,
+            image_index_on_page INTEGER,
+            filename TEXT NOT NULL,
+            output_path TEXT NOT NULL,
+            near_duplicate_of TEXT,
+            variants TEXT,
+            UNIQUE (college_id, output_path)
+        );
+        CREATE INDEX IF NOT EXISTS idx_captions_mcode ON captions(mcode);
+        CREATE INDEX IF NOT EXISTS idx_placements_hash ON placements(image_hash);
+        CREATE INDEX IF NOT EXISTS idx_placements_category ON placements(category_id);
+        CREATE INDEX IF NOT EXISTS idx_placements_caption ON placements(caption_id);
+    """
+    # Columns added to existing catalogues on open: table -> {column: type}
+    ADDED_COLUMNS = {"images": {"width": "INTEGER", "height": "INTEGER", "blurhash": "TEXT", "color": "TEXT"}}
+    VIEWS = """
+        DROP VIEW IF EXISTS manifest;
+        CREATE VIEW manifest AS
+            SELECT c.folder AS college, p.page, p.image_index_on_page, p.filename,
+                   cap.text AS caption, cat.path AS category_subfolder, p.output_path,
+                   p.image_hash, i.size_bytes AS image_size_bytes, cap.has_hood, i.dhash,
+                   p.near_duplicate_of, i.width, i.height, i.blurhash, i.color, p.variants, cap.mcode
+            FROM placements p
+            JOIN colleges c ON c.id = p.college_id
+            JOIN images i ON i.hash = p.image_hash
+            LEFT JOIN captions cap ON cap.id = p.caption_id
+            LEFT JOIN categories cat ON cat.id = p.category_id;
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(self.SCHEMA)
+        for table, columns in self.ADDED_COLUMNS.items():
+            existing = {r["name"] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column, sql_type in columns.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+        self.conn.executescript(self.VIEWS)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def replace_college(self, college: Dict[str, str], rows: List[Dict[str, str]]) -> int:
+        """Replace all placements of one college with manifest rows, in one transaction."""
+        def mcode(caption: str) -> Optional[str]:
+            m = PRODUCT_CODE_PATTERN.match(caption)
+            return m.group(0) if m else None
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO colleges (folder, config, name, updated_at) VALUES (?, ?, ?, datetime('now')) "
+                "ON CONFLICT(folder) DO UPDATE SET config = COALESCE(excluded.config, config), "
+                "name = COALESCE(excluded.name, name), updated_at = excluded.updated_at",
+                (college["folder"], college.get("config"), college.get("name")),
+            )
+            college_id = self.conn.execute("SELECT id FROM colleges WHERE folder = ?", (college["folder"],)).fetchone()[0]
+            self.conn.execute("DELETE FROM placements WHERE college_id = ?", (college_id,))
+
+            for start in range(0, len(rows), self.BATCH_SIZE):
+                batch = rows[start:start + self.BATCH_SIZE]
+                self.conn.executemany(
+                    "INSERT INTO images (hash, size_bytes, dhash, width, height, blurhash, color) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(hash) DO UPDATE SET size_bytes = excluded.size_bytes, "
+                    "dhash = COALESCE(excluded.dhash, dhash), width = COALESCE(excluded.width, width), "
+                    "height = COALESCE(excluded.height, height), blurhash = COALESCE(excluded.blurhash, blurhash), "
+                    "color = COALESCE(excluded.color, color)",
+                    [(r["image_hash"], int(r.get("image_size_bytes") or 0), r.get("dhash") or None,
+                      int(r["width"]) if r.get("width") else None, int(r["height"]) if r.get("height") else None,
+                      r.get("blurhash") or None, r.get("color") or None) for r in batch],
+                )
+                self.conn.executemany(
+                    "INSERT INTO captions (text, mcode, has_hood) VALUES (?, ?, ?) ON CONFLICT(text) DO NOTHING",
+                    [(r["caption"], mcode(r["caption"]), int("hood" in r["caption"].lower())) for r in batch],
+                )
+                self.conn.executemany(
+                    "INSERT INTO categories (path) VALUES (?) ON CONFLICT(path) DO NOTHING",
+                    [(r["category_subfolder"],) for r in batch],
+                )
+                self.conn.executemany(
+                    "INSERT INTO placements (college_id, image_hash, caption_id, category_id, page, "
+                    "image_index_on_page, filename, output_path, near_duplicate_of, variants) VALUES "
+                    "(?, ?, (SELECT id FROM captions WHERE text = ?), (SELECT id FROM categories WHERE path = ?), "
+                    "?, ?, ?, ?, ?, ?)",
+                    [(college_id, r["image_hash"], r["caption"], r["category_subfolder"],
+                      int(r["page"]), int(r["image_index_on_page"]), r["filename"],
+                      r["output_path"].replace("\\", "/"), r.get("near_duplicate_of") or None,
+                      r.get("variants") or None) for r in batch],
+                )
+
+            # Drop rows nothing points at any more
+            self.conn.execute("DELETE FROM images WHERE hash NOT IN (SELECT image_hash FROM placements)")
+            self.conn.execute("DELETE FROM captions WHERE id NOT IN (SELECT caption_id FROM placements WHERE caption_id IS NOT NULL)")
+        return len(rows)
+
+    def export_manifest(self, folder: str, path: Path) -> int:
+        """Write one college's placements as a manifest.csv (same columns as extraction)."""
+        rows = [dict(r) for r in self.conn.execute(
+            "SELECT * FROM manifest WHERE college = ? ORDER BY page, image_index_on_page", (folder,)
+        )]
+        fields = list(MANIFEST_FIELDS) + (["variants"] if any(r["variants"] for r in rows) else [])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore", lineterminator=os.linesep)
+            writer.writeheader()
+            for r in rows:
+                r["has_hood"] = bool(r["has_hood"])
+                r["output_path"] = str(Path(r["output_path"]))
+                writer.writerow({k: ("" if v is None else v) for k, v in r.items()})
+        return len(rows)
+
+    def colleges(self) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT folder FROM colleges ORDER BY folder")]
+
+    def lookup(self, term: str) -> List[Dict[str, Any]]:
+        """
+        Placements matching an M-code (M102595496), an image hash, a category
+        path (beanie, tshirt/men) or 'hood' for all hood-only items.
+        """
+        where, param = "cat.path = ?", term
+        if PRODUCT_CODE_PATTERN.match(term):
+            where = "cap.mcode = ?"
+        elif re.fullmatch(r"[0-9a-f]{32}", term.lower()):
+            where, param = "p.image_hash = ?", term.lower()
+        elif term.lower() == "hood":
+            where, param = "cap.has_hood = ?", 1
+        return [dict(r) for r in self.conn.execute(
+            "SELECT c.folder AS college, p.output_path, cap.text AS caption, cat.path AS category, p.image_hash "
+            "FROM placements p JOIN colleges c ON c.id = p.college_id "
+            "LEFT JOIN captions cap ON cap.id = p.caption_id LEFT JOIN categories cat ON cat.id = p.category_id "
+            f"WHERE {where} ORDER BY c.folder, p.output_path", (param,),
+        )]
+
+def sync_catalogue(catalogue: Optional[Catalogue], college: Dict[str, str], outdir: Path) -> None:
+    """Mirror outdir's manifest.csv into the catalogue (no-op without one)."""
+    if catalogue is not None:
+        count = catalogue.replace_college(college, load_previous_manifest(outdir))
+        print(f"🗃  Catalogue: {count} images for {college['folder']} → {catalogue.path.name}")
+
+# ----------------------------
+# Instrumentation
+# ----------------------------
+
+class Profiler:
+    """
+    Per-page and per-stage timing for --profile.
+
+    stage(name) measures wall-clock (perf_counter) and CPU (process_time) time
+    of a block; count(name, n) bumps a counter. Both are collected per page
+    and in total. end_page() writes one JSON line per page and close() writes a
+    summary line plus, optionally, a Chrome trace (chrome://tracing, Perfetto)
+    with one span per stage call. CPU time is this process only - pages
+    parsed on --workers processes show up as parse wall time.
+
+    A Profiler without output paths is disabled and costs next to nothing.
+    """
+
+    def __init__(self, trace_path: Optional[Path] = None, chrome_trace_path: Optional[Path] = None,
+                 scope: str = "extract", append: bool = False):
+        self.enabled = trace_path is not None or chrome_trace_path is not None
+        self.scope = scope
+        self.trace_path = trace_path
+        self.chrome_trace_path = chrome_trace_path
+        self.totals: Dict[str, List[float]] = {}  # stage -> [wall s, cpu s, calls]
+        self.counters: Counter = Counter()
+        self._page: Optional[int] = None
+        self._page_stages: Dict[str, List[float]] = {}
+        self._page_counters: Counter = Counter()
+        self._chrome: List[Dict[str, Any]] = []
+        self._t0 = self._page_t0 = time.perf_counter()
+        self._file = None
+        if trace_path is not None:
+            trace_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(trace_path, "a" if append else "w", encoding="utf-8")
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Write one JSON line to the trace."""
+        if self._file:
+            record = {"event": event, "scope": self.scope, "t": round(time.perf_counter() - self._t0, 6), **fields}
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def stage(self, name: str):
+        """Context manager timing one call of a stage."""
+        return self._stage(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+            for bucket in (self._page_stages, self.totals):
+                acc = bucket.setdefault(name, [0.0, 0.0, 0])
+                acc[0] += wall
+                acc[1] += cpu
+                acc[2] += 1
+            if self.chrome_trace_path:
+                self._chrome.append({
+                    "name": name, "cat": self.scope, "ph": "X", "pid": os.getpid(), "tid": 0,
+                    "ts": (wall0 - self._t0) * 1e6, "dur": wall * 1e6, "args": {"page": self._page},
+                })
+
+    def timed(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        """Iterate, timing each next() as one call of stage name."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self._page_counters[name] += n
+            self.counters[name] += n
+
+    def start_page(self, pno: int) -> None:
+        self._page = pno
+
+    def end_page(self) -> None:
+        """Emit the finished page; its wall time runs from the end of the previous page."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.emit(
+            "page", page=self._page + 1, wall_ms=round((now - self._page_t0) * 1000, 3),
+            stages=self._stage_report(self._page_stages), counters=dict(self._page_counters),
+        )
+        if self.chrome_trace_path:
+            self._chrome.append({
+                "name": f"page {self._page + 1}", "cat": self.scope, "ph": "X", "pid": os.getpid(), "tid": 0,
+                "ts": (self._page_t0 - self._t0) * 1e6, "dur": (now - self._page_t0) * 1e6,
+                "args": dict(self._page_counters),
+            })
+        self._page_stages = {}
+        self._page_counters = Counter()
+        self._page_t0 = now
+
+    @staticmethod
+    def _stage_report(stages: Dict[str, List[float]]) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3), "calls": int(calls)}
+            for name, (wall, cpu, calls) in stages.items()
+        }
+
+    def close(self, **fields: Any) -> None:
+        """Write the summary line and the Chrome trace, and print the stage totals."""
+        if not self.enabled:
+            return
+        wall = time.perf_counter() - self._t0
+        self.emit("summary", wall_ms=round(wall * 1000, 3), stages=self._stage_report(self.totals),
+                  counters=dict(self.counters), **fields)
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self.chrome_trace_path:
+            self.chrome_trace_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.chrome_trace_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": self._chrome, "displayTimeUnit": "ms"}, f)
+
+        print(f"\n⏱  Profile ({self.scope}, {wall:.2f}s wall):")
+        for name, (stage_wall, stage_cpu, calls) in sorted(self.totals.items(), key=lambda kv: -kv[1][0]):
+            print(f"   {name:<14}{stage_wall:>9.3f}s wall {stage_cpu:>9.3f}s cpu {int(calls):>7} calls")
+        if self.counters:
+            print("   " + ", ".join(f"{name}={n}" for name, n in sorted(self.counters.items())))
+        for path in (self.trace_path, self.chrome_trace_path):
+            if path:
+                print(f"   → {path}")
+
+# ----------------------------
+# Main extraction routine
+# ----------------------------
+
+def extract_images_with_captions(
+    pdf_path: Path,
+    outdir: Path,
+    img_format: str = "png",
+    also_zip: bool = False,
+    max_vertical_gap: float = 110.0,
+    min_overlap_ratio: float = 0.30,
+    debug: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+    dry_run: bool = False,
+    cache: Optional[PageCache] = None,
+    near_dup_distance: int = 4,
+    collapse_near_dups: bool = False,
+    store: Optional[ImageStore] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    profiler: Optional[Profiler] = None,
+    quiet: bool = False,
+    write_threads: int = 4,
+    write_buffer_bytes: int = 64 * 1024 * 1024,
+    resume: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Optional[Path]:
+    """
+    Extract, caption, categorize and save every image in the PDF below outdir.
+
+    With incremental=True the previous manifest.csv is diffed against the new
+    extraction and only changed files are written, renamed or deleted (see
+    ImageWriter). dry_run implies incremental, prints the plan and leaves
+    outdir untouched; it returns None. With a PageCache, unchanged pages are
+    not parsed again and known image hashes are reused.
+
+    Every image gets a perceptual hash (dhash). Images within near_dup_distance
+    bits of one already saved by this run or listed in another college's
+    manifest are flagged in the near_duplicate_of column; with
+    collapse_near_dups=True a near-duplicate with the same caption as an image
+    from this run is skipped instead of being saved as a "(2)" copy.
+
+    With an ImageStore each unique image is written once to the shared store
+    and linked into outdir. If a stats dict is given it is filled with the run's
+    counters (saved, duplicates, banners, generic_names, near_duplicates).
+    A Profiler times the parse, caption_match, categorize, hash, dedupe, write
+    and manifest stages per page. quiet=True drops the per-image prints.
+
+    Image files are written on write_threads background threads (0 = inline)
+    with at most write_buffer_bytes of image data queued; all writes finish
+    before the manifest is published.
+
+    The run is checkpointed page by page (see Checkpoint). A page's entry is
+    only written once its writes and those of every earlier page have
+    finished; parsing doesn't wait for that. resume=True continues from the last checkpointed page
+    of the same PDF and options instead of starting over. Without incremental,
+    images left from the previous extraction are only deleted once every new
+    image is in place.
+
+    progress, if given, is called after every page with {"page", "pages",
+    "saved"} (page numbers 1-based).
+    """
+    import fitz  # PyMuPDF
+
+    profiler = profiler or Profiler()
+    say = (lambda *args, **kwargs: None) if quiet else print
+
+    incremental = incremental or dry_run
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    checkpoint = None
+    resumed = None
+    if not dry_run:
+        pdf_stat = pdf_path.stat()
+        checkpoint = Checkpoint(outdir, {
+            "pdf": pdf_path.as_posix(), "size": pdf_stat.st_size, "mtime_ns": pdf_stat.st_mtime_ns,
+            "format": img_format, "max_vertical_gap": max_vertical_gap, "min_overlap_ratio": min_overlap_ratio,
+            "incremental": incremental, "near_dup_distance": near_dup_distance,
+            "collapse_near_dups": collapse_near_dups, "link_mode": store.link_mode if store else None,
+        })
+        if resume:
+            resumed = checkpoint.load()
+            if resumed is None or not (outdir / "manifest.csv.partial").exists():
+                resumed = None
+                print("↻ No checkpoint for this PDF and these options - starting from the first page")
+            else:
+                print(f"↻ Resuming after page {resumed['page'] + 1} ({resumed['saved']} images already saved)")
+
+    zip_sink = ZipSink(outdir.with_suffix(".zip")) if also_zip and not dry_run else None
+    background = BackgroundWriter(write_threads, write_buffer_bytes) if write_threads > 0 and not dry_run else None
+    writer = ImageWriter(
+        outdir, load_previous_manifest(outdir) if incremental else None,
+        dry_run=dry_run, zip_sink=zip_sink, store=store, background=background,
+        plan=resumed,
+    )
+    taken_paths: Set[str] = set()
+    # Checkpoint entries of finished pages whose writes may still be running:
+    # (writes queued by the end of the page, entry)
+    unsettled: Deque[Tuple[int, Dict[str, Any]]] = deque()
+
+    manifest = ManifestWriter(outdir, resume_offset=resumed["manifest_offset"] if resumed else None) if not dry_run else None
+    resumed = resumed or {}
+    saved_count = resumed.get("saved", 0)
+    skipped_duplicates = resumed.get("duplicates", 0)
+    skipped_banners = resumed.get("banners", 0)
+    failed_captions = resumed.get("generic_names", 0)
+    
+    # Track seen images by xref (same PDF object placed again) and by hash
+    # (identical bytes stored under different objects) to avoid duplicates
+    seen_xrefs: Set[int] = set(resumed.get("xrefs", []))
+    seen_hashes: Set[str] = set(resumed.get("hashes", []))
+
+    # Near-duplicates: other colleges are indexed up front, this run's images as they are saved
+    near_dups, known_visuals = load_near_duplicate_index(outdir.parent, outdir.name)
+    flagged_near_dups = resumed.get("near_duplicates", 0)
+
+    if resumed:
+        # Names and near-duplicate entries of the finished pages come back from their manifest rows
+        for row in manifest.written_rows():
+            rel_path = row["output_path"].replace("\\", "/")
+            taken_paths.add(rel_path)
+            bits = dhash_bits(row["dhash"])
+            if bits is not None:
+                near_dups.add(bits, {"ref": f"{outdir.name}/{rel_path}", "college": None, "caption": row["caption"]})
+        writer.bytes_written = resumed["bytes_written"]
+        if store:
+            store.counts.update(resumed["store_counts"])
+            store.bytes_written = resumed["store_bytes"]
+    if checkpoint:
+        checkpoint.start(resumed or None)
+
+    # Image bytes are fetched lazily from this handle, one image at a time
+    doc = fitz.open(pdf_path.as_posix())
+    page_count = doc.page_count
+
+    pages = iter_parsed_pages(
+        pdf_path, workers, cache, start=resumed.get("page", -1) + 1,
+        captions={"max_vertical_gap": max_vertical_gap, "min_overlap_ratio": min_overlap_ratio},
+        skip_hashes=set(known_visuals) | seen_hashes,
+    )
+    for pno, parsed in profiler.timed("parse", pages):
+        profiler.start_page(pno)
+        bytes_before = writer.bytes_written
+        lines = parsed["lines"]
+        images = parsed["images"]
+        
+        say(f"Page {pno + 1}: Found {len(images)} images")
+        profiler.count("images", len(images))
+
+        # Match captions for the whole page at once (one caption per image). Repeated
+        # placements take part too, so their captions aren't left for a neighbour
+        with profiler.stage("caption_match"):
+            captions = assign_captions(
+                [placement["bbox"] for placement in images], lines,
+                max_vertical_gap=max_vertical_gap,
+                min_overlap_ratio=min_overlap_ratio,
+                debug=debug and pno == 0  # Only debug first page
+            )
+
+        page_hashes_learned = False
+        for idx, (placement, caption) in enumerate(zip(images, captions), start=1):
+            # Skip repeated placements of an image object without reading it again
+            xref = placement["xref"]
+            if xref and xref in seen_xrefs:
+                skipped_duplicates += 1
+                profiler.count("duplicates")
+                if debug:
+                    print(f"  Skipping duplicate image (xref: {xref})")
+                continue
+            if xref:
+                seen_xrefs.add(xref)
+
+            if placement.get("hash"):
+                # Hash known from the page cache - bytes are only read if they must be written
+                img = {"hash": placement["hash"], "size": placement["size"], "ext": placement["ext"]}
+                if placement.get("visuals"):
+                    img["visuals"] = placement["visuals"]
+            else:
+                with profiler.stage("hash"):
+                    img = load_image(doc, pno, placement)
+                if img is None:
+                    say(f"  ⚠️  Could not read image {idx} on page {pno+1}")
+                    continue
+                if parsed.get("cache_key") and placement["xref"]:
+                    placement.update(hash=img["hash"], size=img["size"], ext=img["ext"])
+                    page_hashes_learned = True
+
+            # Skip duplicate images based on hash
+            img_hash = img["hash"]
+            if img_hash in seen_hashes:
+                skipped_duplicates += 1
+                profiler.count("duplicates")
+                if debug:
+                    print(f"  Skipping duplicate image (hash: {img_hash[:8]}...)")
+                continue
+            
+            seen_hashes.add(img_hash)
+
+            caption_found = bool(caption)
+            if not caption:
+                caption = f"page{pno+1}_image{idx}"
+
+            # Categorize the image based on caption
+            with profiler.stage("categorize"):
+                category = categorize_image(caption)
+            
+            # Skip banner items (category is None). Their hash is recorded above, so
+            # a later placement of the same image isn't saved either
+            if category is None:
+                skipped_banners += 1
+                profiler.count("banners")
+                say(f"  ⊗ Skipped banner item: {caption[:60]}")
+                continue
+
+            visuals = img.get("visuals") or known_visuals.get(img_hash)
+            if visuals is None:
+                with profiler.stage("hash"):
+                    if "bytes" not in img:
+                        img.update(load_image(doc, pno, placement) or {})
+                    visuals = image_visuals(img["bytes"]) if "bytes" in img else dict(NO_VISUALS)
+            if parsed.get("cache_key") and placement["xref"] and placement.get("visuals") != visuals:
+                placement["visuals"] = visuals
+                page_hashes_learned = True
+            bits = dhash_bits(visuals["dhash"])
+
+            near_duplicate_of = ""
+            if near_dup_distance >= 0 and bits is not None:
+                with profiler.stage("dedupe"):
+                    hits = near_dups.search(bits, near_dup_distance)
+                if collapse_near_dups:
+                    same = next((item for _, item in hits if item["college"] is None and item["caption"] == caption), None)
+                    if same is not None:
+                        skipped_duplicates += 1
+                        profiler.count("duplicates")
+                        say(f"  ≈ Skipping near-duplicate of {same['ref']}")
+                        continue
+                if hits:
+                    near_duplicate_of = hits[0][1]["ref"]
+                    flagged_near_dups += 1
+                    profiler.count("near_duplicates")
+
+            if not caption_found:
+                failed_captions += 1
+                profiler.count("caption_fallbacks")
+                say(f"  ⚠️  No caption found for image {idx} on page {pno+1}, using: {caption}")
+            
+            base = slugify(caption)
+
+            # Choose suffix based on requested format; we always dump the raw bytes from PDF
+            req = img_format.lower()
+            if req == "jpg":
+                suffix = ".jpg"
+            else:
+                suffix = ".png"
+
+            rel_path = allocate_output_path(taken_paths, category, base, suffix)
+            if "bytes" in img:
+                data = img["bytes"]
+            else:
+                data = lambda pno=pno, placement=placement: load_image(doc, pno, placement)["bytes"]
+            with profiler.stage("write"):
+                action = writer.add(rel_path, img_hash, data)
+            out_path = outdir / rel_path
+            saved_count += 1
+            profiler.count("saved")
+            
+            if action == "keep":
+                say(f"  = Unchanged: {out_path.name} → {category}/")
+            else:
+                say(f"  ✓ Saved: {out_path.name} → {category}/")
+            if near_duplicate_of:
+                say(f"    ≈ Near-duplicate of {near_duplicate_of}")
+            if bits is not None:
+                near_dups.add(bits, {"ref": f"{outdir.name}/{rel_path}", "college": None, "caption": caption})
+
+            # Check if this item has "Hood" in caption (for hoodie-only restriction)
+            has_hood = "hood" in caption.lower()
+            
+            if manifest:
+                with profiler.stage("manifest"):
+                    manifest.write({
+                        "page": pno + 1,
+                        "image_index_on_page": idx,
+                        "filename": out_path.name,
+                        "caption": caption,
+                        "category_subfolder": category,
+                        "output_path": str(out_path.relative_to(outdir)),
+                        "image_hash": img_hash,
+                        "image_size_bytes": img["size"],
+                        "has_hood": has_hood,
+                        "near_duplicate_of": near_duplicate_of,
+                        **visuals,
+                    })
+
+        if page_hashes_learned and cache:
+            cache.put(parsed["cache_key"], parsed)
+        if checkpoint:
+            with profiler.stage("checkpoint"):
+                unsettled.append((writer.queued, checkpoint.entry(
+                    pno, {"xrefs": seen_xrefs, "hashes": seen_hashes, "plan": writer.plan},
+                    manifest_offset=manifest.offset, saved=saved_count, duplicates=skipped_duplicates,
+                    banners=skipped_banners, generic_names=failed_captions, near_duplicates=flagged_near_dups,
+                    bytes_written=writer.bytes_written,
+                    store_counts={"stored": store.counts["stored"]} if store else {},
+                    store_bytes=store.bytes_written if store else 0,
+                )))
+                while unsettled and writer.settled(unsettled[0][0]):
+                    entry = unsettled.popleft()[1]
+                    if store:
+                        # Link modes are counted as writes finish, up to this page's last one
+                        entry["store_counts"].update((mode, n) for mode, n in store.counts.items() if mode != "stored")
+                    checkpoint.write(entry)
+        profiler.count("bytes_written", writer.bytes_written - bytes_before)
+        profiler.end_page()
+        if progress:
+            progress({"page": pno + 1, "pages": page_count, "saved": saved_count})
+
+    doc.close()
+    if cache:
+        cache.evict()
+
+    with profiler.stage("commit"):
+        plan = writer.commit()
+    if background:
+        background.close()
+    if incremental:
+        print_plan(plan, quiet=quiet)
+    if dry_run:
+        print("\n(dry run - nothing was written)")
+        return None
+
+    # Deferred clean slate: only now that every new image is in place
+    if not incremental:
+        removed = clean_existing_images(outdir, keep=taken_paths)
+        if removed:
+            print(f"\n🧹 Deleted {removed} images left from the previous extraction")
+
+    # Publish the streamed manifest
+    manifest_csv = manifest.commit()
+
+    # Finish the ZIP that was filled while saving images
+    zip_path = None
+    if zip_sink:
+        zip_sink.add_file("manifest.csv", manifest_csv)
+        zip_path = zip_sink.close()
+        print(f"Zipped output: {zip_path}")
+    checkpoint.discard()
 
     print(f"\n{'='*50}")
     print(f"✓ Saved {saved_count} unique images to {outdir}")
     print(f"⊗ Skipped {skipped_duplicates} duplicate images")
     print(f"⊗ Skipped {skipped_banners} banner items")
+    print(f"≈ {flagged_near_dups} near-duplicates flagged in the manifest")
+    if store:
+        linked = ", ".join(f"{mode}: {n}" for mode, n in store.counts.items() if mode != "stored")
+        print(f"🗄  Image store: {store.counts['stored']} new ({linked or 'nothing linked'})")
     print(f"⚠  {failed_captions} images with generic names (caption detection failed)")
+    if debug:
+        hits = get_category_rules().hits
+        print("🏷  Category rule hits: " + ", ".join(f"{rule_id}={n}" for rule_id, n in hits.most_common()))
     print(f"📊 Manifest: {manifest_csv}")
+    if stats is not None:
+        stats.update(
+            saved=saved_count, duplicates=skipped_duplicates, banners=skipped_banners,
+            generic_names=failed_captions, near_duplicates=flagged_near_dups,
+        )
+    return zip_path or manifest_csv
+
+# ----------------------------
+# Web image optimization
+# ----------------------------
+
+# Responsive variants: name -> max width in px (never upscaled)
+VARIANT_WIDTHS = {"thumb": 320, "detail": 1024}
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+# optimized/<VARIANT_INDEX>: image_hash -> {"avif": bool, "variants": {...}} of the last optimization
+VARIANT_INDEX = "variants.json"
+
+def optimize_image(college_dir: str, output_path: str, image_hash: str, avif: bool = False) -> Dict[str, Any]:
+    """
+    Worker entry point: transcode one extracted image into web variants.
+
+    Writes 'optimized/<hash>-<variant>.<fmt>' files under college_dir: a
+    full-size WebP plus a resized WebP per VARIANT_WIDTHS entry (and AVIF copies
+    when avif=True and they beat the WebP). Names are content-addressed, so
+    variants that already exist are reused instead of being encoded again.
+    When the WebP is not smaller than the source, the extracted file itself is
+    kept as the full-size variant.
+
+    Returns {variant: {'path', 'width', 'height', 'bytes'}} with paths relative
+    to college_dir.
+    """
+    from PIL import Image
+
+    root = Path(college_dir)
+    (root / "optimized").mkdir(exist_ok=True)
+    stem = image_hash[:16]
+    variants: Dict[str, Any] = {}
+
+    def encode(img: Any, name: str, fmt: str) -> Dict[str, Any]:
+        rel = f"optimized/{stem}-{name}.{fmt}"
+        out = root / rel
+        if not out.exists():
+            tmp = out.with_name(out.name + ".tmp")
+            if fmt == "webp":
+                img.save(tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+            else:
+                img.save(tmp, "AVIF", quality=AVIF_QUALITY)
+            os.replace(tmp, out)
+        return {"path": rel, "width": img.width, "height": img.height, "bytes": out.stat().st_size}
+
+    def add(img: Any, name: str, fallback: Optional[Dict[str, Any]] = None) -> None:
+        webp = encode(img, name, "webp")
+        if fallback is not None and webp["bytes"] >= fallback["bytes"]:
+            (root / webp["path"]).unlink()
+            webp = fallback
+        variants[name] = webp
+        if avif:
+            candidate = encode(img, name, "avif")
+            if candidate["bytes"] < webp["bytes"]:
+                variants[f"{name}_avif"] = candidate
+            else:
+                (root / candidate["path"]).unlink()
+
+    with Image.open(root / output_path) as source:
+        source.load()
+        img = source.convert("RGBA") if source.mode in ("P", "LA", "PA") else source
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB")
+
+        # Already-compact originals are served as-is
+        original = {"path": output_path, "width": img.width, "height": img.height,
+                    "bytes": os.path.getsize(root / output_path)}
+        add(img, "full", fallback=original)
+
+        for name, width in VARIANT_WIDTHS.items():
+            if img.width <= width:
+                continue  # never upscale; the full-size variant covers it
+            add(img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS), name)
+
+    return variants
+
+def optimize_images(outdir: Path, workers: int = 1, avif: bool = False) -> int:
+    """
+    Post-extraction stage: build web variants for every image in outdir's
+    manifest.csv on a process pool, record them in the manifest's 'variants'
+    column and prune variant files that no image uses any more.
+
+    Every image's outcome is kept in optimized/variants.json by hash,
+    including "serve the original" and rejected AVIF copies, which leave no
+    file behind. Images found there with all their files present are not
+    opened or encoded again. Returns the number of images optimized.
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("⚠️  Pillow is not installed (pip install Pillow) - skipping image optimization")
+        return 0
+
+    manifest_csv = outdir / "manifest.csv"
+    with open(manifest_csv, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fields = list(reader.fieldnames or [])
+        rows = list(reader)
+    if not rows:
+        return 0
+
+    index_path = outdir / "optimized" / VARIANT_INDEX
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index: Dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    def known(row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """The recorded variants of row's image, pointed at its current path; None if they must be built."""
+        entry = index.get(row["image_hash"])
+        if not entry or (avif and not entry["avif"]):
+            return None
+        variants = {}
+        for name, variant in entry["variants"].items():
+            if name.endswith("_avif") and not avif:
+                continue
+            if variant["path"].startswith("optimized/"):
+                if not (outdir / variant["path"]).is_file():
+                    return None
+            else:
+                # The extracted file itself; it may have been renamed since
+                variant = {**variant, "path": row["output_path"].replace("\\", "/")}
+            variants[name] = variant
+        return variants
+
+    results: List[Optional[Dict[str, Any]]] = [known(row) for row in rows]
+    todo = [i for i, variants in enumerate(results) if variants is None]
+    if todo:
+        (outdir / "optimized").mkdir(exist_ok=True)
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            built = pool.map(
+                optimize_image,
+                [str(outdir)] * len(todo),
+                [rows[i]["output_path"].replace("\\", "/") for i in todo],
+                [rows[i]["image_hash"] for i in todo],
+                [avif] * len(todo),
+            )
+            for i, variants in zip(todo, built):
+                results[i] = variants
+                index[rows[i]["image_hash"]] = {"avif": avif, "variants": variants}
+
+    source_bytes = sum(int(row.get("image_size_bytes") or 0) for row in rows)
+    detail_bytes = 0
+    used: Set[str] = set()
+    for row, variants in zip(rows, results):
+        row["variants"] = json.dumps(variants, separators=(",", ":"))
+        used.update(v["path"] for v in variants.values())
+        detail_bytes += variants.get("detail", variants["full"])["bytes"]
+
+    # Variants are content-addressed; drop the ones no current image uses
+    for entry in os.scandir(outdir / "optimized"):
+        if entry.is_file() and entry.name != VARIANT_INDEX and f"optimized/{entry.name}" not in used:
+            os.unlink(entry.path)
+    current = {row["image_hash"] for row in rows}
+    index = {img_hash: entry for img_hash, entry in index.items() if img_hash in current}
+    tmp = index_path.with_name(VARIANT_INDEX + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp, index_path)
+
+    if "variants" not in fields:
+        fields.append("variants")
+    tmp = manifest_csv.with_name("manifest.csv.partial")
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, lineterminator=os.linesep)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, manifest_csv)
+
+    print(f"🖼  Optimized {len(rows)} images ({len(todo)} encoded, the rest unchanged): "
+          f"{source_bytes / 1024:.0f} KB extracted → {detail_bytes / 1024:.0f} KB at detail size")
+    return len(rows)
+
+# ----------------------------
+# Sprite sheets
+# ----------------------------
+
+# Thumbnails of a category are packed into columns of sheets below public/<College>/sprites/
+SPRITE_DIRNAME = "sprites"
+SPRITE_COLUMNS = 6
+SPRITE_MAX_HEIGHT = 4096
+WEBP_MAX_SIDE = 16383  # larger WebP images can't be encoded
+
+def sprite_slug(category: str) -> str:
+    """File name stem for a category's sprite files ('tshirt/men' -> 'tshirt-men')."""
+    return re.sub(r"[^A-Za-z0-9]+", "-", category).strip("-") or "category"
+
+def sprite_key(files: List[Tuple[str, str]], width: int) -> str:
+    """Identifies a category's image set (names and hashes) and the packing parameters."""
+    payload = json.dumps([width, SPRITE_COLUMNS, SPRITE_MAX_HEIGHT, sorted(files)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def build_sprite_sheets(college_dir: str, category: str, files: List[Tuple[str, str]], width: int, key: str) -> Dict[str, Any]:
+    """
+    Worker entry point: pack the category's images, scaled to width px, into
+    WebP sprite sheets and return their coordinate map.
+
+    Thumbnails go into SPRITE_COLUMNS columns (fewer if the sheet would be
+    wider than WebP allows), each into the currently shortest one; a new sheet
+    starts once a column would grow past SPRITE_MAX_HEIGHT. Thumbnails taller
+    than that are scaled down to fit, so they can be narrower than width.
+    Sheet names include the key, so a changed set never reuses a cached URL.
+    Returns {'key', 'category', 'thumbWidth', 'sheets': [{'file', 'width',
+    'height'}], 'images': {file: {'sheet', 'x', 'y', 'w', 'h'}}} with sheet
+    paths relative to college_dir.
+    """
+    from PIL import Image
+
+    root = Path(college_dir)
+    thumbs = []
+    for name, _ in files:
+        with Image.open(root / category / name) as source:
+            img = source.convert("RGBA")
+        thumb_width, height = width, max(1, round(img.height * width / img.width))
+        if height > SPRITE_MAX_HEIGHT:
+            thumb_width, height = max(1, round(img.width * SPRITE_MAX_HEIGHT / img.height)), SPRITE_MAX_HEIGHT
+        thumbs.append((name, img.resize((thumb_width, height), Image.LANCZOS)))
+
+    columns = max(1, min(SPRITE_COLUMNS, len(thumbs), WEBP_MAX_SIDE // width))
+    heights = [0] * columns
+    placements = []
+    sheet_heights = []
+    for name, thumb in thumbs:
+        col = heights.index(min(heights))
+        if heights[col] and heights[col] + thumb.height > SPRITE_MAX_HEIGHT:
+            sheet_heights.append(max(heights))
+            heights = [0] * columns
+            col = 0
+        placements.append((name, thumb, len(sheet_heights), col * width, heights[col]))
+        heights[col] += thumb.height
+    sheet_heights.append(max(heights))
+
+    sprite_map: Dict[str, Any] = {"key": key, "category": category, "thumbWidth": width, "sheets": [], "images": {}}
+    canvases = [Image.new("RGBA", (columns * width, max(1, h)), (0, 0, 0, 0)) for h in sheet_heights]
+    for name, thumb, sheet, x, y in placements:
+        canvases[sheet].paste(thumb, (x, y))
+        sprite_map["images"][name] = {"sheet": sheet, "x": x, "y": y, "w": thumb.width, "h": thumb.height}
+
+    (root / SPRITE_DIRNAME).mkdir(exist_ok=True)
+    for n, canvas in enumerate(canvases):
+        rel = f"{SPRITE_DIRNAME}/{sprite_slug(category)}-{key[:8]}-{n}.webp"
+        tmp = root / f"{rel}.tmp"
+        canvas.save(tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(tmp, root / rel)
+        sprite_map["sheets"].append({"file": rel, "width": canvas.width, "height": canvas.height})
+    return sprite_map
+
+def build_sprites(
+    outdir: Path,
+    category_image_map: Dict[str, List[str]],
+    image_hashes: Dict[str, str],
+    width: int = 160,
+    workers: int = 1,
+) -> int:
+    """
+    Post-extraction stage: keep one set of sprite sheets plus a
+    sprites/<category>.json map per category of category_image_map (as built
+    for update_college_config). A category is only packed again when its
+    images (names and image_hashes by output_path) or the thumbnail width
+    changed, or its sheets are gone. Sprite files of categories that no longer
+    exist are removed. A category whose sheets can't be built is reported and
+    keeps its previous sheets, if any; the other categories are unaffected.
+    Returns the number of categories rebuilt.
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("⚠️  Pillow is not installed (pip install Pillow) - skipping sprite sheets")
+        return 0
+
+    sprite_dir = outdir / SPRITE_DIRNAME
+    maps: Dict[str, Dict[str, Any]] = {}
+    previous: Dict[str, Dict[str, Any]] = {}
+    jobs = []
+    for category, names in sorted(category_image_map.items()):
+        if category == "banner" or not names:
+            continue
+        files = sorted((name, image_hashes.get(f"{category}/{name}", "")) for name in names)
+        key = sprite_key(files, width)
+        map_path = sprite_dir / f"{sprite_slug(category)}.json"
+        if map_path.exists():
+            with open(map_path, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+            if all((outdir / sheet["file"]).exists() for sheet in existing["sheets"]):
+                if existing.get("key") == key:
+                    maps[category] = existing
+                    continue
+                previous[category] = existing
+        jobs.append((category, files, key))
+
+    failed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+            futures = [pool.submit(build_sprite_sheets, str(outdir), category, files, width, key)
+                       for category, files, key in jobs]
+            for (category, _, _), future in zip(jobs, futures):
+                try:
+                    sprite_map = future.result()
+                except Exception as exc:
+                    failed += 1
+                    print(f"⚠️  Sprite sheets for {category} failed ({type(exc).__name__}: {exc}) - "
+                          f"{'keeping the previous sheets' if category in previous else 'skipped'}")
+                    if category in previous:
+                        maps[category] = previous[category]
+                    continue
+                map_path = sprite_dir / f"{sprite_slug(category)}.json"
+                tmp = map_path.with_name(map_path.name + ".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(sprite_map, f, separators=(",", ":"))
+                os.replace(tmp, map_path)
+                maps[category] = sprite_map
+
+    # Sheets of earlier image sets and of categories that are gone
+    used = {f"{sprite_slug(category)}.json" for category in maps}
+    used.update(Path(sheet["file"]).name for sprite_map in maps.values() for sheet in sprite_map["sheets"])
+    if sprite_dir.is_dir():
+        for entry in os.scandir(sprite_dir):
+            if entry.is_file() and entry.name not in used:
+                os.unlink(entry.path)
+
+    sheets = sum(len(sprite_map["sheets"]) for sprite_map in maps.values())
+    print(f"🧩 Sprite sheets: {len(maps)} categories in {sheets} sheets ({len(jobs) - failed} rebuilt"
+          f"{f', {failed} failed' if failed else ''})")
+    return len(jobs) - failed
+
+# ----------------------------
+# Caption parameter sweep
+# ----------------------------
+
+def parse_float_list(value: str) -> List[float]:
+    """Parse a comma separated list of numbers ('60,90,110')."""
+    return [float(v) for v in value.split(",") if v.strip()]
+
+def sweep_caption_parameters(
+    pdf_path: Path,
+    gaps: List[float],
+    overlap_ratios: List[float],
+    workers: int = 1,
+    cache: Optional[PageCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Parse the PDF once and evaluate caption matching for every
+    (max_vertical_gap, min_overlap_ratio) combination.
+
+    The parameter-independent geometry is built once per page and the tiers for
+    all gaps are computed in one broadcast NumPy pass. For each setting this
+    reports:
+      fallbacks          - images left without a caption (pageN_imageM names)
+      displaced          - images whose own best line went to another image in the
+                           assignment (contested captions; what used to produce
+                           '(2)' names)
+      unmatched_captions - product-code lines that no image got
+
+    As in a real run, every placement takes part in the matching, and repeated
+    placements of an xref are then left out of the counts. No image bytes are
+    read, so byte-identical duplicates under different xrefs are still counted.
+    """
+    import numpy as np
+
+    gap_arr = np.asarray(gaps, dtype=float)
+    stats = np.zeros((len(overlap_ratios), len(gaps), 3), dtype=int)  # fallbacks, displaced, unmatched
+    total_images = 0
+    seen_xrefs: Set[int] = set()
+
+    for pno, parsed in iter_parsed_pages(pdf_path, workers, cache):
+        bboxes = [placement["bbox"] for placement in parsed["images"]]
+        counted = []
+        for placement in parsed["images"]:
+            xref = placement["xref"]
+            counted.append(not (xref and xref in seen_xrefs))
+            if xref:
+                seen_xrefs.add(xref)
+        cand_bboxes = [bbox for text, bbox in parsed["lines"] if PRODUCT_CODE_PATTERN.match(text)]
+        total_images += sum(counted)
+
+        if not bboxes or not cand_bboxes:
+            stats[..., 0] += sum(counted)
+            stats[..., 2] += len(cand_bboxes)
+            continue
+
+        geometry = caption_geometry(bboxes, cand_bboxes)
+        for r, ratio in enumerate(overlap_ratios):
+            tiers, scores = caption_tiers(geometry, gap_arr, ratio)  # (gaps, images, lines)
+
+            # Each image's independent best line (lowest tier, then lowest score)
+            best_tier = tiers.min(axis=2, keepdims=True)
+            best_line = np.where(tiers == best_tier, scores, np.inf).argmin(axis=2)
+            has_match = best_tier[..., 0] < 3
+
+            for k in range(len(gaps)):
+                chosen = assign_matching(tiers[k], scores[k])
+                taken = {j: i for i, j in enumerate(chosen) if j >= 0}
+                stats[r, k, 0] += sum(1 for j, keep in zip(chosen, counted) if keep and j < 0)
+                stats[r, k, 1] += sum(
+                    1 for i, keep in enumerate(counted)
+                    if keep and has_match[k, i] and taken.get(best_line[k, i], i) != i
+                )
+                stats[r, k, 2] += len(cand_bboxes) - len(taken)
+
+    results = []
+    for k, gap in enumerate(gaps):
+        for r, ratio in enumerate(overlap_ratios):
+            results.append({
+                "max_gap": gap,
+                "min_overlap_ratio": ratio,
+                "images": total_images,
+                "fallbacks": int(stats[r, k, 0]),
+                "displaced": int(stats[r, k, 1]),
+                "unmatched_captions": int(stats[r, k, 2]),
+            })
+    return results
+
+def print_sweep_report(results: List[Dict[str, Any]]) -> None:
+    """Print the sweep table and the best setting."""
+    print(f"\n{'max_gap':>8} {'overlap':>8} {'images':>7} {'fallback':>9} {'displaced':>10} {'unmatched':>10}")
+    for r in results:
+        print(f"{r['max_gap']:>8g} {r['min_overlap_ratio']:>8g} {r['images']:>7} "
+              f"{r['fallbacks']:>9} {r['displaced']:>10} {r['unmatched_captions']:>10}")
+
+    best = min(results, key=lambda r: (r["fallbacks"] + r["unmatched_captions"], r["displaced"]))
+    print(f"\n✓ Best setting: --max_gap {best['max_gap']:g} --min_overlap_ratio {best['min_overlap_ratio']:g} "
+          f"({best['fallbacks']} fallbacks, {best['unmatched_captions']} unmatched captions)")
+
+# ----------------------------
+# Recategorize from manifests
+# ----------------------------
+
+def confirm(question: str) -> bool:
+    """Ask a yes/no question on stdin; anything but y/yes (or no stdin) is no."""
+    try:
+        return input(f"{question} [y/N] ").strip().lower() in ("y", "yes")
+    except EOFError:
+        return False
+
+def recategorize(
+    script_dir: Path,
+    dry_run: bool = False,
+    catalogue: Optional[Catalogue] = None,
+    assume_yes: bool = False,
+) -> Dict[str, int]:
+    """
+    Re-apply the category rules to every college's existing manifest.csv
+    without touching the PDF.
+
+    All manifests are loaded into one DataFrame. Categories and hood-only flags
+    are recomputed column-wise, files whose category changed are moved to their
+    new folder (banner items are deleted), manifests are rewritten and every
+    college config is updated in one pass. Returns counts of changes.
+
+    The moves are printed first; unless assume_yes, nothing is written until
+    the user confirms them. Hand-curated items are pinned by the rules'
+    overrides, so they are never moved.
+    """
+    import pandas as pd
+
+    project_root = script_dir.parent
+    frames = []
+    for college in discover_colleges(project_root):
+        manifest_csv = project_root / "public" / college["folder"] / "manifest.csv"
+        if manifest_csv.exists():
+            frame = pd.read_csv(manifest_csv, dtype={"image_hash": str, "width": "Int64", "height": "Int64"})
+            frames.append(frame.assign(college=college["folder"], config_name=college["config"]))
+    if not frames:
+        print("No manifests found under public/")
+        return {"moved": 0, "removed": 0, "colleges": 0}
+
+    df = pd.concat(frames, ignore_index=True)
+    df["output_path"] = df["output_path"].astype(str).str.replace("\\", "/", regex=False)
+    df["caption"] = df["caption"].fillna("").astype(str)
+
+    # Categorize each distinct caption once, then map back column-wise
+    unique_captions = df["caption"].unique().tolist()
+    new_categories = dict(zip(unique_captions, categorize_captions(unique_captions)))
+    df["new_category"] = df["caption"].map(new_categories)
+    df["has_hood"] = df["caption"].str.lower().str.contains("hood", regex=False)
+
+    removed = df["new_category"].isna()
+    moved = ~removed & (df["new_category"] != df["category_subfolder"])
+
+    print(f"🏷  {len(df)} images in {df['college'].nunique()} colleges: "
+          f"{int(moved.sum())} change category, {int(removed.sum())} now skipped")
+
+    # Plan the moves of files whose category changed (names allocated per college in memory)
+    renamed_refs: Dict[str, str] = {}
+    file_ops: List[Tuple[Path, Optional[Path]]] = []
+    for college, rows in df[moved | removed].groupby("college"):
+        outdir = project_root / "public" / college
+        taken = set(df.loc[(df["college"] == college) & ~moved & ~removed, "output_path"])
+        for idx, row in rows.iterrows():
+            src = outdir / row["output_path"]
+            if removed[idx]:
+                print(f"  - {college}/{row['output_path']} (skipped category)")
+                file_ops.append((src, None))
+                renamed_refs[f"{college}/{row['output_path']}"] = ""
+                continue
+            stem, ext = os.path.splitext(row["filename"])
+            dst_rel = allocate_output_path(taken, row["new_category"], stem, ext)
+            print(f"  ~ {college}/{row['output_path']} → {dst_rel}")
+            df.at[idx, "output_path"] = dst_rel
+            df.at[idx, "filename"] = dst_rel.rsplit("/", 1)[-1]
+            renamed_refs[f"{college}/{row['output_path']}"] = f"{college}/{dst_rel}"
+            if isinstance(row.get("variants"), str):
+                # Passthrough variants point at the extracted file itself
+                variants = json.loads(row["variants"])
+                for variant in variants.values():
+                    if variant["path"] == row["output_path"]:
+                        variant["path"] = dst_rel
+                df.at[idx, "variants"] = json.dumps(variants, separators=(",", ":"))
+            file_ops.append((src, outdir / dst_rel))
+
+    if "near_duplicate_of" in df.columns:
+        df["near_duplicate_of"] = df["near_duplicate_of"].fillna("").map(lambda ref: renamed_refs.get(ref, ref))
+
+    if dry_run:
+        print("\n(dry run - nothing was written)")
+    elif file_ops and not assume_yes and not confirm(f"\nMove {int(moved.sum())} and delete {int(removed.sum())} images?"):
+        print("Nothing was changed")
+        return {"moved": 0, "removed": 0, "colleges": int(df["college"].nunique())}
+    else:
+        for src, dst in file_ops:
+            if dst is None:
+                src.unlink(missing_ok=True)
+            elif src.exists():
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                move_file(src, dst)
+        df = df[~removed].copy()
+        df["category_subfolder"] = df["new_category"]
+        manifest_columns = [c for c in df.columns if c not in ("college", "config_name", "new_category")]
+        for (college, config_name), rows in df.groupby(["college", "config_name"], sort=False):
+            outdir = project_root / "public" / college
+            rows = rows.assign(output_path=rows["output_path"].map(lambda rel: str(Path(rel))))
+            rows[manifest_columns].to_csv(outdir / "manifest.csv", index=False)
+            print(f"\n⚙️  {college}")
+            sync_catalogue(catalogue, {"folder": college, "config": config_name}, outdir)
+            category_image_map, hood_only_images = build_category_image_map(rows)
+            update_college_config(
+                config_name, category_image_map, script_dir, hood_only_images,
+                image_meta=image_meta_from_manifest(rows),
+            )
+        store_root = project_root / STORE_DIRNAME
+        if store_root.is_dir():
+            prune_store(ImageStore(store_root), project_root)
+
+    return {"moved": int(moved.sum()), "removed": int(removed.sum()), "colleges": int(df["college"].nunique())}
+
+# ----------------------------
+# College runs and batch jobs
+# ----------------------------
+
+def prepare_college_folder(outdir: Path, incremental: bool) -> None:
+    """
+    Announce how the college folder's existing images are handled. A fresh
+    extraction deletes them only once it has committed (see
+    extract_images_with_captions), so an interrupted run can be resumed.
+    """
+    if incremental:
+        print("\n🔁 Incremental mode: existing images are kept and diffed against manifest.csv")
+        return
+    print("\n🧹 Existing images will be replaced once the extraction completes")
+
+def publish_college(
+    college: Dict[str, str],
+    outdir: Path,
+    script_dir: Path,
+    optimize: bool = False,
+    avif: bool = False,
+    workers: int = 1,
+    profiler: Optional[Profiler] = None,
+    catalogue: Optional[Catalogue] = None,
+    sprites: bool = False,
+    sprite_width: int = 160,
+) -> Optional[Path]:
+    """
+    Post-extraction steps for one college: optional web optimization, the
+    catalogue sync, the config update from outdir's manifest.csv and optional
+    sprite sheets. Returns the manifest path, or None if the extraction left
+    no manifest.
+    """
+    import pandas as pd
+
+    profiler = profiler or Profiler()
+
+    print("\n📋 Building category image map...")
+    manifest_csv = outdir / "manifest.csv"
+    if not manifest_csv.exists():
+        print("\n⚠️  Warning: Manifest file not created")
+        return None
+
+    if optimize:
+        print("\n🖼  Optimizing images for the web...")
+        with profiler.stage("optimize"):
+            optimize_images(outdir, workers=workers, avif=avif)
+
+    with profiler.stage("catalogue"):
+        sync_catalogue(catalogue, college, outdir)
+
+    with profiler.stage("config"):
+        df = pd.read_csv(manifest_csv)
+        category_image_map, hood_only_images = build_category_image_map(df)
+
+        print("\n⚙️  Updating JSON configuration...")
+        update_college_config(
+            college["config"], category_image_map, script_dir, hood_only_images,
+            image_meta=image_meta_from_manifest(df),
+        )
+
+    if sprites:
+        print("\n🧩 Building sprite sheets...")
+        with profiler.stage("sprites"):
+            image_hashes = dict(zip(df["output_path"].astype(str).str.replace("\\", "/", regex=False), df["image_hash"]))
+            build_sprites(outdir, category_image_map, image_hashes, width=sprite_width, workers=workers)
     return manifest_csv
 
+def make_profiler(project_root: Path, folder: str, profile: Dict[str, bool], scope: str = "extract",
+                  append: bool = False) -> Profiler:
+    """Profiler writing to .cache/profile/<College>.jsonl (and .trace.json) as requested by --profile/--chrome_trace."""
+    profile_dir = project_root / ".cache" / "profile"
+    return Profiler(
+        profile_dir / f"{folder}.jsonl" if profile.get("trace") else None,
+        profile_dir / f"{folder}.trace.json" if profile.get("chrome") and scope == "extract" else None,
+        scope=scope, append=append,
+    )
+
+def parse_job(value: str) -> Dict[str, str]:
+    """argparse type for --job COLLEGE=PDF."""
+    college, sep, pdf = value.partition("=")
+    if not sep or not college.strip() or not pdf.strip():
+        raise argparse.ArgumentTypeError(f"expected COLLEGE=PDF, got {value!r}")
+    return {"college": college.strip(), "pdf": pdf.strip()}
+
+def load_jobs(jobs_file: Path) -> List[Dict[str, str]]:
+    """
+    Read a jobs file: a JSON list of {"college": ..., "pdf": ...} objects.
+    Relative PDF paths are resolved against the jobs file's folder.
+    """
+    with open(jobs_file, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    jobs = []
+    for entry in entries:
+        pdf = Path(entry["pdf"]).expanduser()
+        if not pdf.is_absolute():
+            pdf = jobs_file.parent / pdf
+        jobs.append({"college": entry["college"], "pdf": str(pdf)})
+    return jobs
+
+def run_extraction_job(job: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker entry point for batch mode: clean the college folder and extract one
+    PDF into it, with all output going to the job's log file. Config updates
+    are left to the main process so they never run concurrently.
+    """
+    college = job["college"]
+    outdir = Path(options["project_root"]) / "public" / college["folder"]
+    log_path = Path(job["log"])
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    result: Dict[str, Any] = {"college": college["folder"], "pdf": job["pdf"], "log": str(log_path), "error": None}
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log, redirect_stdout(log):
+        try:
+            print(f"📄 Processing PDF: {job['pdf']}")
+            prepare_college_folder(outdir, options["extract"]["incremental"])
+            stats: Dict[str, Any] = {}
+            profiler = make_profiler(Path(options["project_root"]), college["folder"], options["profile"])
+            extract_images_with_captions(pdf_path=Path(job["pdf"]), outdir=outdir, stats=stats,
+                                         profiler=profiler, **options["extract"])
+            profiler.close(college=college["folder"], pdf=job["pdf"])
+            result.update(stats)
+        except Exception as exc:
+            traceback.print_exc(file=log)
+            result["error"] = f"{type(exc).__name__}: {exc}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def run_batch(
+    jobs: List[Dict[str, Any]],
+    options: Dict[str, Any],
+    script_dir: Path,
+    parallel: int,
+    optimize: bool = False,
+    avif: bool = False,
+    catalogue: Optional[Catalogue] = None,
+    sprites: bool = False,
+    sprite_width: int = 160,
+) -> List[Dict[str, Any]]:
+    """
+    Run many (college, PDF) jobs on a bounded process pool. Each finished job's
+    config and catalogue entries are updated right away in this process, one at
+    a time. Returns the job results in completion order.
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=parallel) as pool:
+        futures = {pool.submit(run_extraction_job, job, options): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            result = future.result()
+            if result["error"] is None and not options["extract"]["dry_run"]:
+                # Serialized: only the main process writes configs
+                with open(job["log"], "a", encoding="utf-8") as log, redirect_stdout(log):
+                    try:
+                        profiler = make_profiler(Path(options["project_root"]), job["college"]["folder"],
+                                                 options["profile"], scope="publish", append=True)
+                        publish_college(job["college"], Path(options["project_root"]) / "public" / job["college"]["folder"],
+                                        script_dir, optimize=optimize, avif=avif, profiler=profiler,
+                                        catalogue=catalogue, sprites=sprites, sprite_width=sprite_width)
+                        profiler.close(college=job["college"]["folder"])
+                    except Exception as exc:
+                        traceback.print_exc(file=log)
+                        result["error"] = f"{type(exc).__name__}: {exc}"
+            status = "✗ " + result["error"] if result["error"] else "✓"
+            print(f"  {status} {result['college']} ({result['seconds']:.1f}s) - log: {result['log']}")
+            results.append(result)
+    return results
+
+def print_batch_summary(results: List[Dict[str, Any]]) -> None:
+    """One combined table for a batch run."""
+    print("\n" + "="*50)
+    print("✨ BATCH COMPLETE")
+    print("="*50)
+    header = f"{'College':<26}{'saved':>7}{'dups':>7}{'banner':>8}{'generic':>9}{'near':>6}{'time':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: r["college"]):
+        if r["error"]:
+            print(f"{r['college']:<26}  FAILED: {r['error']}")
+            continue
+        print(f"{r['college']:<26}{r.get('saved', 0):>7}{r.get('duplicates', 0):>7}{r.get('banners', 0):>8}"
+              f"{r.get('generic_names', 0):>9}{r.get('near_duplicates', 0):>6}{r['seconds']:>7.1f}s")
+    failed = sum(1 for r in results if r["error"])
+    print(f"\n{len(results) - failed} succeeded, {failed} failed")
+
 # ----------------------------
 # CLI
 # ----------------------------
 
 def main():
-    # Step 1: Prompt for college selection FIRST
-    college_folder, college_config = prompt_college_selection()
-    
-    print(f"\n✓ Selected: {college_folder}")
-    
-    # Step 2: Parse command line arguments
+    # Step 1: Parse command line arguments
     parser = argparse.ArgumentParser(description="Extract images from a PDF and name them using the caption beneath each image.")
-    parser.add_argument("pdf", type=str, help="Path to the input PDF.")
+    parser.add_argument("pdf", type=str, nargs="?", help="Path to the input PDF.")
     parser.add_argument("--format", type=str, default="png", choices=["png", "jpg"], help="Image filename suffix to use")
     parser.add_argument("--zip", action="store_true", help="Also create a .zip of the output directory")
     parser.add_argument("--max_gap", type=float, default=110.0, help="Max vertical gap (px) to search below an image for its caption")
     parser.add_argument("--min_overlap_ratio", type=float, default=0.30, help="Min horizontal overlap ratio between image and caption line")
     parser.add_argument("--debug", action="store_true", help="Print debug info for first page")
+    parser.add_argument("--workers", type=int, default=1, help="Parse pages and hash their images on N worker processes (0 = all cores)")
+    parser.add_argument("--incremental", action="store_true", help="Diff against the previous manifest and only write/rename/delete what changed")
+    parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Print the incremental plan without touching any files")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Don't read or write the page-parse cache")
+    parser.add_argument("--cache_dir", type=str, default=None, help="Page-parse cache directory (default: .cache/page_parse in the project root)")
+    parser.add_argument("--cache_max_mb", type=float, default=256.0, help="Evict least recently used cache entries beyond this size")
+    parser.add_argument("--near_dup_distance", type=int, default=4, help="Flag images whose perceptual hash is within this many bits of another image (negative = off)")
+    parser.add_argument("--collapse_near_dups", action="store_true", help="Skip near-duplicates that have the same caption as an image already saved in this run")
+    parser.add_argument("--link_mode", choices=list(ImageStore.LINK_MODES) + ["off"], default="hardlink",
+                        help="Store each unique image once in .image_store/ and link it into the college folder (off = write plain files; "
+                             "symlink is for local use only - the links break outside this checkout)")
+    parser.add_argument("--sweep", action="store_true", help="Evaluate caption matching over a grid of --sweep_gaps/--sweep_overlaps and exit (no files are written)")
+    parser.add_argument("--sweep_gaps", type=parse_float_list, default=[50, 70, 90, 110, 130, 150, 180, 220], help="Comma separated max_gap values for --sweep")
+    parser.add_argument("--sweep_overlaps", type=parse_float_list, default=None, help="Comma separated min_overlap_ratio values for --sweep (default: --min_overlap_ratio)")
+    parser.add_argument("--optimize", action="store_true", help="Build WebP web variants (full, thumb, detail) for every extracted image (needs Pillow)")
+    parser.add_argument("--avif", action="store_true", help="With --optimize, also build AVIF variants")
+    parser.add_argument("--sprites", action="store_true", help="Pack each category's thumbnails into sprite sheets with a JSON coordinate map (needs Pillow)")
+    parser.add_argument("--sprite_width", type=int, default=160, help="Thumbnail width in px for --sprites")
+    parser.add_argument("--college", type=str, default=None, help="Target college (folder, config or display name) instead of the interactive prompt")
+    parser.add_argument("--job", type=parse_job, action="append", metavar="COLLEGE=PDF", help="Batch mode: extract PDF for COLLEGE (repeatable)")
+    parser.add_argument("--jobs", type=str, default=None, help='Batch mode: JSON file with [{"college": ..., "pdf": ...}, ...]')
+    parser.add_argument("--parallel", type=int, default=0, help="Batch mode: number of jobs run at once (default: all cores)")
+    parser.add_argument("--profile", action="store_true", help="Record per-page/per-stage wall and CPU time and counters to .cache/profile/<College>.jsonl")
+    parser.add_argument("--chrome_trace", action="store_true", help="Also write .cache/profile/<College>.trace.json for chrome://tracing / Perfetto")
+    parser.add_argument("--quiet", action="store_true", help="Don't print a line per image or per planned write/rename/delete (page lines and the summary remain)")
+    parser.add_argument("--write_threads", type=int, default=4, help="Write image files on N background threads while parsing continues (0 = write inline)")
+    parser.add_argument("--write_buffer_mb", type=float, default=64.0, help="Max image data queued for the background writers")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run of the same PDF and options from its last checkpointed page")
+    parser.add_argument("--recategorize", action="store_true", help="Re-apply category rules to every college's existing manifest.csv (no PDF needed) and update all configs")
+    parser.add_argument("--yes", action="store_true", help="With --recategorize, apply the moves without asking for confirmation")
+    parser.add_argument("--catalogue", type=str, default=None, help="SQLite catalogue path (default: catalogue.sqlite in the project root)")
+    parser.add_argument("--no-catalogue", dest="no_catalogue", action="store_true", help="Don't update the SQLite catalogue")
+    parser.add_argument("--catalogue_import", action="store_true", help="Load every college's manifest.csv into the catalogue and exit")
+    parser.add_argument("--catalogue_export", type=str, default=None, metavar="DIR", help="Write DIR/<College>/manifest.csv for every college in the catalogue and exit")
+    parser.add_argument("--lookup", type=str, default=None, metavar="TERM", help="List images by M-code, image hash, category path or 'hood' from the catalogue and exit")
     args = parser.parse_args()
+    incremental = args.incremental or args.dry_run
+
+    script_dir = Path(__file__).parent
+    project_root = script_dir.parent
+    catalogue = None
+    if not (args.no_catalogue or args.dry_run or args.sweep):
+        catalogue = Catalogue(Path(args.catalogue).expanduser() if args.catalogue else project_root / CATALOGUE_FILENAME)
+
+    if args.catalogue_import or args.catalogue_export or args.lookup:
+        if catalogue is None:
+            parser.error("--catalogue_import/--catalogue_export/--lookup need the catalogue")
+        if args.catalogue_import:
+            for college in discover_colleges(project_root):
+                if (project_root / "public" / college["folder"] / "manifest.csv").exists():
+                    sync_catalogue(catalogue, college, project_root / "public" / college["folder"])
+        if args.catalogue_export:
+            export_dir = Path(args.catalogue_export).expanduser()
+            for folder in catalogue.colleges():
+                count = catalogue.export_manifest(folder, export_dir / folder / "manifest.csv")
+                print(f"📊 {export_dir / folder / 'manifest.csv'} ({count} images)")
+        if args.lookup:
+            matches = catalogue.lookup(args.lookup)
+            for m in matches:
+                print(f"{m['college']:<26}{m['category'] or '':<16}{m['output_path']}")
+            print(f"\n{len(matches)} images across {len({m['college'] for m in matches})} colleges")
+        catalogue.close()
+        return
 
+    if args.recategorize:
+        print("\n🏷  Recategorizing existing manifests...")
+        recategorize(script_dir, dry_run=args.dry_run, catalogue=catalogue, assume_yes=args.yes)
+        if catalogue:
+            catalogue.close()
+        print()
+        return
+    workers = args.workers or (os.cpu_count() or 1)
+
+    cache = None
+    if not args.no_cache:
+        cache_dir = Path(args.cache_dir).expanduser() if args.cache_dir else project_root / ".cache" / "page_parse"
+        cache = PageCache(cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    store = ImageStore(project_root / STORE_DIRNAME, args.link_mode) if args.link_mode != "off" else None
+    if args.link_mode == "symlink" and not args.dry_run:
+        print("⚠️  --link_mode symlink: public/ will link into the git-ignored .image_store/ - "
+              "don't commit or deploy it (use hardlink or copy)")
+    extract_options = {
+        "img_format": args.format,
+        "also_zip": args.zip,
+        "max_vertical_gap": args.max_gap,
+        "min_overlap_ratio": args.min_overlap_ratio,
+        "debug": args.debug,
+        "incremental": incremental,
+        "dry_run": args.dry_run,
+        "cache": cache,
+        "near_dup_distance": args.near_dup_distance,
+        "collapse_near_dups": args.collapse_near_dups,
+        "store": store,
+        "quiet": args.quiet,
+        "write_threads": args.write_threads,
+        "write_buffer_bytes": int(args.write_buffer_mb * 1024 * 1024),
+        "resume": args.resume,
+    }
+    profile = {"trace": args.profile, "chrome": args.chrome_trace}
+    colleges = discover_colleges(project_root)
+
+    if args.job or args.jobs:
+        # Batch mode: many (college, PDF) pairs, no prompt
+        requested = list(args.job or []) + (load_jobs(Path(args.jobs).expanduser()) if args.jobs else [])
+        jobs = []
+        for job in requested:
+            college = find_college(colleges, job["college"])
+            if college is None:
+                parser.error(f"unknown college {job['college']!r} (known: {', '.join(c['folder'] for c in colleges)})")
+            if any(other["college"] is college for other in jobs):
+                parser.error(f"{college['folder']} is listed more than once")
+            pdf = Path(job["pdf"]).expanduser().resolve()
+            if not pdf.is_file():
+                parser.error(f"PDF not found: {pdf}")
+            log = project_root / ".cache" / "jobs" / f"{college['folder']}.log"
+            jobs.append({"college": college, "pdf": str(pdf), "log": str(log)})
+        parallel = max(1, min(len(jobs), args.parallel or (os.cpu_count() or 1)))
+        print(f"\n📚 Running {len(jobs)} extraction jobs on {parallel} processes...")
+        results = run_batch(
+            jobs, {"project_root": str(project_root), "extract": {**extract_options, "workers": 1}, "profile": profile},
+            script_dir, parallel, optimize=args.optimize, avif=args.avif, catalogue=catalogue,
+            sprites=args.sprites, sprite_width=args.sprite_width,
+        )
+        if catalogue:
+            catalogue.close()
+        if not args.dry_run:
+            prune_store(store, project_root)
+        print_batch_summary(results)
+        print()
+        sys.exit(1 if any(r["error"] for r in results) else 0)
+
+    if not args.pdf:
+        parser.error("the following arguments are required: pdf (or --job/--jobs)")
     pdf_path = Path(args.pdf).expanduser().resolve()
+
+    if args.sweep:
+        print(f"\n📄 Sweeping caption parameters for: {pdf_path}")
+        results = sweep_caption_parameters(
+            pdf_path, args.sweep_gaps, args.sweep_overlaps or [args.min_overlap_ratio],
+            workers=workers, cache=cache,
+        )
+        print_sweep_report(results)
+        if cache:
+            cache.evict()
+        print()
+        return
+
+    # Step 2: Select the college (--college skips the prompt)
+    if args.college:
+        college = find_college(colleges, args.college)
+        if college is None:
+            parser.error(f"unknown college {args.college!r} (known: {', '.join(c['folder'] for c in colleges)})")
+    else:
+        college = prompt_college_selection(colleges)
+    
+    print(f"\n✓ Selected: {college['folder']}")
     
     # Step 3: Set output directory to public/{CollegeName}/
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
-    outdir = project_root / "public" / college_folder
+    outdir = project_root / "public" / college["folder"]
     
     print(f"\n📂 Output directory: {outdir}")
     
-    # Step 4: Clean existing images (clean slate)
-    print("\n🧹 Cleaning existing images...")
-    deleted_count = clean_existing_images(outdir)
-    if deleted_count > 0:
-        print(f"   Deleted {deleted_count} existing images")
-    else:
-        print("   No existing images found")
+    # Step 4: Clean slate (deferred until the run commits) - incremental runs diff instead
+    prepare_college_folder(outdir, incremental)
     
     # Step 5: Extract images with captions
     print(f"\n📄 Processing PDF: {pdf_path}")
     print("="*50)
-    manifest_path = extract_images_with_captions(
-        pdf_path=pdf_path,
-        outdir=outdir,
-        img_format=args.format,
-        also_zip=args.zip,
-        max_vertical_gap=args.max_gap,
-        min_overlap_ratio=args.min_overlap_ratio,
-        debug=args.debug,
-    )
+    profiler = make_profiler(project_root, college["folder"], profile)
+    extract_images_with_captions(pdf_path=pdf_path, outdir=outdir, workers=workers, profiler=profiler, **extract_options)
+    if args.dry_run:
+        profiler.close(college=college["folder"], pdf=str(pdf_path))
+        print()
+        return
     
-    # Step 6: Build category_image_map from manifest
-    print("\n📋 Building category image map...")
-    manifest_csv = outdir / "manifest.csv"
-    if manifest_csv.exists():
-        df = pd.read_csv(manifest_csv)
-        category_image_map: Dict[str, List[str]] = {}
-        hood_only_images: Set[str] = set()
-        
-        for _, row in df.iterrows():
-            category = row['category_subfolder']
-            filename = row['filename']
-            
-            if category not in category_image_map:
-                category_image_map[category] = []
-            category_image_map[category].append(filename)
-            
-            # Track hood-only items (check has_hood column if it exists, otherwise check caption)
-            if 'has_hood' in df.columns and row.get('has_hood', False):
-                hood_only_images.add(filename)
-            elif 'caption' in df.columns and 'hood' in str(row.get('caption', '')).lower():
-                hood_only_images.add(filename)
-        
-        # Step 7: Update JSON config
-        print("\n⚙️  Updating JSON configuration...")
-        update_college_config(college_config, category_image_map, script_dir, hood_only_images)
-        
+    # Steps 6-7: Build category_image_map from manifest and update JSON config
+    manifest_csv = publish_college(college, outdir, script_dir, optimize=args.optimize, avif=args.avif,
+                                   workers=workers, profiler=profiler, catalogue=catalogue,
+                                   sprites=args.sprites, sprite_width=args.sprite_width)
+    if catalogue:
+        catalogue.close()
+    profiler.close(college=college["folder"], pdf=str(pdf_path))
+    prune_store(store, project_root)
+    if manifest_csv:
         # Step 8: Success message
         print("\n" + "="*50)
         print("✨ EXTRACTION COMPLETE!")
         print("="*50)
         print(f"📁 Images saved to: {outdir}")
-        print(f"⚙️  Config updated: src/config/colleges/{college_config}.json")
+        print(f"⚙️  Config updated: src/config/colleges/{college['config']}.json")
         print(f"📊 Manifest: {manifest_csv}")
-    else:
-        print("\n⚠️  Warning: Manifest file not created")
     
     print()
 
+def prune_store(store: Optional[ImageStore], project_root: Path) -> None:
+    """
+    Drop store entries no manifest references once all writers are done -
+    called once per CLI run, after every batch job has finished. Skipped while
+    another process (a concurrent run or the extraction service) uses the store.
+    """
+    if store:
+        pruned = store.prune(manifest_hashes(project_root / "public"))
+        if pruned is None:
+            print(f"\n🗄  Not pruning {store.root}: another extraction is using it")
+        elif pruned:
+            print(f"\n🗄  Pruned {pruned} unreferenced images from {store.root}")
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Local HTTP service that queues PDF extractions onto a pool of warm worker processes.
+
+This script:
+1. Starts N worker processes up front that import PyMuPDF, NumPy and pandas and
+   load the category rules once, so a job pays none of that start-up time
+2. Accepts PDF uploads for a named college (POST /jobs?college=...) and queues them
+3. Runs queued jobs on the pool: extract_images_with_captions, then the optional web
+   variants and sprite sheets and update_college_config (see publish_college)
+4. Runs jobs for different colleges at the same time and jobs for the same college
+   one after another, in the order they were submitted, so a college's folder and
+   config are only ever written by one job; catalogue updates go through one thread
+5. Reports each job's status, page progress, log and resulting manifest
+
+Jobs live in memory only. Uploaded PDFs are kept under .cache/service/uploads/
+until their job finishes; logs and manifest snapshots stay in .cache/service/.
+
+Dependencies:
+    Standard library, plus what extract_pdf_images_with_captions.py needs
+
+Usage:
+    python scripts/extraction_service.py --port 8765 --workers 4
+
+    curl --data-binary @flyer.pdf "http://127.0.0.1:8765/jobs?college=ArizonaState&optimize=1"
+    curl http://127.0.0.1:8765/jobs/<id>
+    curl http://127.0.0.1:8765/jobs/<id>/manifest
+
+Endpoints:
+    GET    /health                 worker count and jobs per status
+    GET    /colleges               the known colleges
+    GET    /jobs                   every job, newest first
+    POST   /jobs?college=NAME      queue the PDF in the request body (raw, not a form upload);
+                                   options: incremental, optimize, avif, sprites, zip (1/0),
+                                   format (png/jpg), filename (shown in the job)
+    GET    /jobs/<id>              one job: status, progress {stage, page, pages, saved}, stats, error
+    DELETE /jobs/<id>              cancel a job that hasn't started yet
+    GET    /jobs/<id>/manifest     the manifest.csv the job produced (?format=json for rows)
+    GET    /jobs/<id>/log          the job's output
+
+Key Options:
+    --host / --port: where to listen (default: 127.0.0.1:8765)
+    --workers: worker processes, i.e. jobs run at once (default: all cores)
+    --max_upload_mb: largest PDF accepted (default: 200)
+    --link_mode / --no-cache / --catalogue / --no-catalogue: as for the extractor
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from http import HTTPStatus
+from pathlib import Path
+from typing import List, Tuple, Dict, Any, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import extract_pdf_images_with_captions as extractor  # noqa: E402
+
+SERVICE_DIRNAME = Path(".cache") / "service"
+JOB_OPTIONS = ("incremental", "optimize", "avif", "sprites", "zip")
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+UPLOAD_CHUNK = 1024 * 1024
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+# ----------------------------
+# Worker processes
+# ----------------------------
+
+_progress_queue = None
+
+def warm_worker(progress_queue: Any) -> None:
+    """
+    Pool initializer: keep the progress queue, leave Ctrl+C to the service (which
+    lets running jobs finish) and pay the import and category-rule cost once.
+    """
+    global _progress_queue
+    _progress_queue = progress_queue
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import fitz  # noqa: F401
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    extractor.get_category_rules()
+    progress_queue.put((None, {"pid": os.getpid()}))
+
+def report_progress(job_id: str, **info: Any) -> None:
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, info))
+
+def run_service_job(job: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker entry point: extract one uploaded PDF into its college folder and
+    publish it (variants, config, sprite sheets), with all output going to the
+    job's log. The service holds the college's lock for the whole call; the
+    catalogue is left to the service.
+    """
+    project_root = Path(options["project_root"])
+    college = job["college"]
+    outdir = project_root / "public" / college["folder"]
+    job_options = job["options"]
+    result: Dict[str, Any] = {"stats": {}, "error": None}
+    with open(job["log"], "w", encoding="utf-8") as log, redirect_stdout(log):
+        try:
+            print(f"📄 Processing PDF: {job['filename']} ({job['id']})")
+            report_progress(job["id"], stage="extract")
+            extractor.prepare_college_folder(outdir, job_options["incremental"])
+            stats: Dict[str, Any] = {}
+            extractor.extract_images_with_captions(
+                pdf_path=Path(job["pdf"]), outdir=outdir, stats=stats,
+                progress=lambda info: report_progress(job["id"], stage="extract", **info),
+                **{**options["extract"], "incremental": job_options["incremental"],
+                   "img_format": job_options["format"], "also_zip": job_options["zip"]},
+            )
+            result["stats"] = stats
+            report_progress(job["id"], stage="publish")
+            manifest_csv = extractor.publish_college(
+                college, outdir, project_root / "scripts", optimize=job_options["optimize"],
+                avif=job_options["avif"], sprites=job_options["sprites"],
+            )
+            if manifest_csv:
+                # Snapshot: a later job for the college replaces public/<College>/manifest.csv
+                shutil.copyfile(manifest_csv, job["manifest"])
+        except Exception as exc:
+            traceback.print_exc(file=log)
+            result["error"] = f"{type(exc).__name__}: {exc}"
+    return result
+
+# ----------------------------
+# Job queue
+# ----------------------------
+
+class ExtractionService:
+    """
+    Jobs, the warm process pool and the locks that order them.
+
+    Every job is one asyncio task that waits for its college's lock, then for a
+    free worker slot, so jobs for different colleges share the pool while jobs
+    for one college run in submission order. Worker progress arrives on a
+    multiprocessing queue, drained by a reader thread into the event loop.
+    """
+
+    def __init__(self, project_root: Path, workers: int, extract_options: Dict[str, Any],
+                 catalogue_path: Optional[Path] = None):
+        self.project_root = project_root
+        self.workers = workers
+        self.options = {"project_root": str(project_root), "extract": {**extract_options, "workers": 1}}
+        self.catalogue_path = catalogue_path
+        self.service_dir = project_root / SERVICE_DIRNAME
+        (self.service_dir / "uploads").mkdir(parents=True, exist_ok=True)
+        self.colleges = extractor.discover_colleges(project_root)
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._college_locks: Dict[str, asyncio.Lock] = {}
+        self._slots = asyncio.Semaphore(workers)
+        # One thread owns the SQLite connection, so catalogue writes never overlap
+        self._catalogue_thread = ThreadPoolExecutor(max_workers=1)
+        self._catalogue: Optional[extractor.Catalogue] = None
+        # spawn: workers never inherit the event loop or the reader thread
+        context = multiprocessing.get_context("spawn")
+        self._progress = context.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                         initializer=warm_worker, initargs=(self._progress,))
+        self._reader: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        """Start every worker process and wait until all of them are warm."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        # Each submission starts another process; each process reports once warm_worker is done
+        for _ in range(self.workers):
+            self._pool.submit(os.getpid)
+        for _ in range(self.workers):
+            await loop.run_in_executor(None, self._progress.get)
+        print(f"🔥 {self.workers} workers warm in {time.perf_counter() - started:.1f}s")
+        self._reader = threading.Thread(target=self._read_progress, args=(loop,), daemon=True)
+        self._reader.start()
+
+    def _read_progress(self, loop: asyncio.AbstractEventLoop) -> None:
+        while True:
+            message = self._progress.get()
+            if message is None:
+                return
+            loop.call_soon_threadsafe(self._update_progress, *message)
+
+    def _update_progress(self, job_id: str, info: Dict[str, Any]) -> None:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job["progress"] = {**job["progress"], **info}
+
+    def new_upload(self) -> Tuple[str, Path]:
+        """A fresh job id and the path its PDF is uploaded to."""
+        job_id = uuid.uuid4().hex[:12]
+        return job_id, self.service_dir / "uploads" / f"{job_id}.pdf"
+
+    def submit(self, job_id: str, college: Dict[str, str], pdf: Path, filename: str,
+               options: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue an uploaded PDF; returns the job."""
+        job = {
+            "id": job_id,
+            "college": college,
+            "filename": filename,
+            "options": options,
+            "status": "queued",
+            "progress": {},
+            "stats": {},
+            "error": None,
+            "submitted": now(),
+            "started": None,
+            "finished": None,
+            "pdf": str(pdf),
+            "log": str(self.service_dir / f"{job_id}.log"),
+            "manifest": str(self.service_dir / f"{job_id}.manifest.csv"),
+        }
+        self.jobs[job_id] = job
+        self._tasks[job_id] = asyncio.create_task(self._run(job))
+        return job
+
+    def cancel(self, job: Dict[str, Any]) -> bool:
+        """Cancel a job that hasn't started; False if it is already running or finished."""
+        if job["status"] != "queued":
+            return False
+        job.update(status="cancelled", finished=now())
+        # A task cancelled before its first step never runs _run's cleanup
+        self._tasks.pop(job["id"]).cancel()
+        Path(job["pdf"]).unlink(missing_ok=True)
+        print(f"⊗ {job['id']} {job['college']['folder']}: cancelled")
+        return True
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        lock = self._college_locks.setdefault(job["college"]["folder"], asyncio.Lock())
+        try:
+            async with lock, self._slots:
+                job.update(status="running", started=now())
+                print(f"▶ {job['id']} {job['college']['folder']}: {job['filename']}")
+                result = await loop.run_in_executor(self._pool, run_service_job, job, self.options)
+                if result["error"] is None and self.catalogue_path:
+                    job["progress"] = {**job["progress"], "stage": "catalogue"}
+                    await loop.run_in_executor(self._catalogue_thread, self._sync_catalogue, job["college"])
+        except Exception as exc:
+            result = {"stats": {}, "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            Path(job["pdf"]).unlink(missing_ok=True)
+            self._tasks.pop(job["id"], None)
+        job.update(status="failed" if result["error"] else "done", stats=result["stats"],
+                   error=result["error"], finished=now())
+        status = "✗ " + result["error"] if result["error"] else "✓"
+        print(f"  {status} {job['id']} {job['college']['folder']} - log: {job['log']}")
+
+    def _sync_catalogue(self, college: Dict[str, str]) -> None:
+        if self._catalogue is None:
+            self._catalogue = extractor.Catalogue(self.catalogue_path)
+        with open(self.service_dir / "catalogue.log", "a", encoding="utf-8") as log, redirect_stdout(log):
+            extractor.sync_catalogue(self._catalogue, college, self.project_root / "public" / college["folder"])
+
+    def _close_catalogue(self) -> None:
+        if self._catalogue is not None:
+            self._catalogue.close()
+
+    async def close(self) -> None:
+        """Cancel queued jobs, let running ones finish, then stop the workers."""
+        for job in self.jobs.values():
+            self.cancel(job)
+        running = sum(1 for job in self.jobs.values() if job["status"] == "running")
+        if running:
+            print(f"⏳ Waiting for {running} running jobs...")
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._catalogue_thread, self._close_catalogue)
+        self._catalogue_thread.shutdown()
+        self._pool.shutdown(wait=True)
+        self._progress.put(None)
+        if self._reader:
+            self._reader.join()
+
+    def describe(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """A job as the API shows it."""
+        info = {key: job[key] for key in ("id", "status", "filename", "options", "progress", "stats", "error",
+                                          "submitted", "started", "finished")}
+        info["college"] = job["college"]["folder"]
+        if job["status"] == "done" and Path(job["manifest"]).is_file():
+            info["manifest"] = f"/jobs/{job['id']}/manifest"
+        info["log"] = f"/jobs/{job['id']}/log"
+        return info
+
+    def health(self) -> Dict[str, Any]:
+        counts = {status: 0 for status in JOB_STATUSES}
+        for job in self.jobs.values():
+            counts[job["status"]] += 1
+        return {"workers": self.workers, "jobs": counts}
+
+# ----------------------------
+# HTTP
+# ----------------------------
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+def parse_flag(query: Dict[str, str], name: str) -> bool:
+    value = query.get(name, "0").strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off", ""):
+        return False
+    raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be 1 or 0, got {value!r}")
+
+def job_options(query: Dict[str, str]) -> Dict[str, Any]:
+    """The per-job extraction options from a POST /jobs query string."""
+    options: Dict[str, Any] = {name: parse_flag(query, name) for name in JOB_OPTIONS}
+    options["format"] = query.get("format", "png")
+    if options["format"] not in ("png", "jpg"):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"format must be png or jpg, got {options['format']!r}")
+    return options
+
+class HttpHandler:
+    """
+    Minimal HTTP/1.1 front end: one request per connection, JSON responses
+    (CSV and text for manifests and logs), uploads streamed straight to disk.
+    """
+
+    def __init__(self, service: ExtractionService, max_upload_bytes: int):
+        self.service = service
+        self.max_upload_bytes = max_upload_bytes
+
+    async def __call__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, content_type, body = await self.handle(reader, writer)
+        except HttpError as exc:
+            status, content_type, body = exc.status, "application/json", self.json_body({"error": str(exc)})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as exc:
+            traceback.print_exc()
+            status, content_type, body = (HTTPStatus.INTERNAL_SERVER_ERROR, "application/json",
+                                          self.json_body({"error": f"{type(exc).__name__}: {exc}"}))
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+        try:
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def json_body(data: Any) -> bytes:
+        return (json.dumps(data, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Tuple[HTTPStatus, str, bytes]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "request headers too large")
+        request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+        try:
+            method, target, _version = request_line.split(" ", 2)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"malformed request line {request_line!r}")
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        url = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        parts = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/") if p]
+        service = self.service
+
+        if parts == ["health"] and method == "GET":
+            return HTTPStatus.OK, "application/json", self.json_body(service.health())
+        if parts == ["colleges"] and method == "GET":
+            return HTTPStatus.OK, "application/json", self.json_body(service.colleges)
+        if parts == ["jobs"] and method == "GET":
+            jobs = sorted(service.jobs.values(), key=lambda job: job["submitted"], reverse=True)
+            return HTTPStatus.OK, "application/json", self.json_body([service.describe(job) for job in jobs])
+        if parts == ["jobs"] and method == "POST":
+            job = await self.upload(reader, writer, headers, query)
+            return HTTPStatus.ACCEPTED, "application/json", self.json_body(service.describe(job))
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = service.jobs.get(parts[1])
+            if job is None:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"no job {parts[1]!r}")
+            if len(parts) == 2 and method == "GET":
+                return HTTPStatus.OK, "application/json", self.json_body(service.describe(job))
+            if len(parts) == 2 and method == "DELETE":
+                if not service.cancel(job):
+                    raise HttpError(HTTPStatus.CONFLICT, f"job {job['id']} is {job['status']}, only queued jobs can be cancelled")
+                return HTTPStatus.ACCEPTED, "application/json", self.json_body(service.describe(job))
+            if parts[2:] == ["manifest"] and method == "GET":
+                return self.manifest(job, query)
+            if parts[2:] == ["log"] and method == "GET":
+                log = Path(job["log"])
+                return HTTPStatus.OK, "text/plain; charset=utf-8", log.read_bytes() if log.is_file() else b""
+        raise HttpError(HTTPStatus.NOT_FOUND, f"no route for {method} {url.path}")
+
+    async def upload(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                     headers: Dict[str, str], query: Dict[str, str]) -> Dict[str, Any]:
+        """Stream a POST /jobs body to disk and queue it."""
+        service = self.service
+        if not query.get("college"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "missing ?college=")
+        college = extractor.find_college(service.colleges, query["college"])
+        if college is None:
+            known = ", ".join(c["folder"] for c in service.colleges)
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"unknown college {query['college']!r} (known: {known})")
+        options = job_options(query)
+        if headers.get("content-type", "").startswith("multipart/"):
+            raise HttpError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "send the PDF as the raw body (curl --data-binary @file.pdf)")
+        if "content-length" not in headers:
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Content-Length is required")
+        value = headers["content-length"]
+        if not (value.isascii() and value.isdigit()):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"malformed Content-Length {value!r}")
+        length = int(value)
+        if length == 0:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "the request body is empty")
+        if length > self.max_upload_bytes:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                            f"PDF is {length / 1024 / 1024:.1f} MB, the limit is {self.max_upload_bytes / 1024 / 1024:.0f} MB")
+        if headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+
+        job_id, pdf = service.new_upload()
+        partial = pdf.with_name(pdf.name + ".partial")
+        try:
+            with open(partial, "wb") as f:
+                remaining = length
+                while remaining:
+                    chunk = await reader.readexactly(min(remaining, UPLOAD_CHUNK))
+                    if remaining == length and not chunk.startswith(b"%PDF-"):
+                        raise HttpError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "the request body is not a PDF")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            os.replace(partial, pdf)
+        finally:
+            partial.unlink(missing_ok=True)
+        filename = query.get("filename") or headers.get("x-filename") or f"{job_id}.pdf"
+        return service.submit(job_id, college, pdf, filename, options)
+
+    def manifest(self, job: Dict[str, Any], query: Dict[str, str]) -> Tuple[HTTPStatus, str, bytes]:
+        manifest_csv = Path(job["manifest"])
+        if job["status"] != "done" or not manifest_csv.is_file():
+            raise HttpError(HTTPStatus.CONFLICT if job["status"] in ("queued", "running") else HTTPStatus.NOT_FOUND,
+                            f"job {job['id']} is {job['status']} and has no manifest")
+        data = manifest_csv.read_bytes()
+        if query.get("format") == "json":
+            rows: List[Dict[str, str]] = list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+            return HTTPStatus.OK, "application/json", self.json_body(rows)
+        return HTTPStatus.OK, "text/csv; charset=utf-8", data
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+async def serve(args: argparse.Namespace, project_root: Path) -> None:
+    cache = None
+    if not args.no_cache:
+        cache = extractor.PageCache(project_root / ".cache" / "page_parse")
+    store = extractor.ImageStore(project_root / extractor.STORE_DIRNAME, args.link_mode) if args.link_mode != "off" else None
+    catalogue_path = None
+    if not args.no_catalogue:
+        catalogue_path = Path(args.catalogue).expanduser() if args.catalogue else project_root / extractor.CATALOGUE_FILENAME
+    extract_options = {"cache": cache, "store": store, "quiet": True}
+
+    service = ExtractionService(project_root, args.workers or (os.cpu_count() or 1), extract_options, catalogue_path)
+    await service.start()
+    server = await asyncio.start_server(HttpHandler(service, int(args.max_upload_mb * 1024 * 1024)), args.host, args.port)
+    print(f"🌐 Listening on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        # SIGTERM stops the service like Ctrl+C (not available on Windows)
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        print("\n🛑 Shutting down...")
+        server.close()
+        await service.close()
+        # Only now that no job can be writing
+        extractor.prune_store(store, project_root)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP service that runs PDF extractions on a pool of warm worker processes.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes, i.e. jobs run at once (default: all cores)")
+    parser.add_argument("--max_upload_mb", type=float, default=200.0, help="Largest PDF accepted")
+    parser.add_argument("--link_mode", choices=list(extractor.ImageStore.LINK_MODES) + ["off"], default="hardlink",
+                        help="Store each unique image once in .image_store/ and link it into the college folder (off = write plain files; "
+                             "symlink is for local use only - the links break outside this checkout)")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Don't read or write the page-parse cache")
+    parser.add_argument("--catalogue", type=str, default=None, help="SQLite catalogue path (default: catalogue.sqlite in the project root)")
+    parser.add_argument("--no-catalogue", dest="no_catalogue", action="store_true", help="Don't update the SQLite catalogue")
+    args = parser.parse_args()
+
+    project_root = Path(__file__).resolve().parent.parent
+    try:
+        asyncio.run(serve(args, project_root))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Shared fixtures for the extraction script tests.
+
+Run from the project root:
+    python -m pytest -q scripts/tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import benchmark_extraction  # noqa: E402
+
+
+@pytest.fixture
+def flyer(tmp_path: Path) -> Path:
+    """A small synthetic flyer (2 pages of 8 captioned images, some repeated)."""
+    path = tmp_path / "flyer.pdf"
+    benchmark_extraction.build_flyer(path, pages=2, images_per_page=8, dup_ratio=0.2, image_px=120)
+    return path
@@ -0,0 +1,25 @@
+import json
+from pathlib import Path
+
+import build_catalogue_bundle as bundle
+
+
+def test_image_index_keeps_same_file_name_in_each_category(tmp_path: Path):
+    config = {
+        "name": "Test",
+        "categories": [
+            {"path": "tshirt/men", "images": ["M100.png", "M101.png"]},
+            {"path": "tshirt/women", "images": ["M100.png"]},
+        ],
+    }
+    config_dir = tmp_path / "src" / "config" / "colleges"
+    config_dir.mkdir(parents=True)
+    (config_dir / "Test.json").write_text(json.dumps(config), encoding="utf-8")
+
+    entry = bundle.compile_college(tmp_path, {"folder": "Test", "config": "Test"})
+
+    assert entry["imageIndex"] == {
+        "tshirt/men/M100.png": [0, 0],
+        "tshirt/men/M101.png": [0, 1],
+        "tshirt/women/M100.png": [1, 0],
+    }
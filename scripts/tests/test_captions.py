@@ -0,0 +1,115 @@
+import csv
+import random
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+import benchmark_extraction
+import extract_pdf_images_with_captions as extractor
+
+
+def manifest_rows(outdir: Path):
+    with open(outdir / "manifest.csv", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_repeated_image_keeps_its_caption_from_neighbours(tmp_path: Path):
+    """A repeated placement's caption must not go to the caption-less image next to it."""
+    rng = random.Random(1)
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    repeated = page.insert_image(fitz.Rect(50, 50, 150, 175), stream=benchmark_extraction.make_image(rng, 100))
+    page.insert_text((50, 184), "M100000001 SH2FDC Custom Logo Maroon Beanie", fontsize=5)
+
+    page = doc.new_page(width=612, height=792)
+    page.insert_image(fitz.Rect(50, 50, 150, 175), xref=repeated)
+    page.insert_image(fitz.Rect(160, 50, 260, 175), stream=benchmark_extraction.make_image(rng, 100))
+    # Only the repeated image has a caption; its neighbour is within the extended window
+    page.insert_text((50, 184), "M100000002 SH2FDC Youth Tee", fontsize=7)
+    pdf = tmp_path / "flyer.pdf"
+    doc.save(pdf.as_posix())
+
+    outdir = tmp_path / "public" / "Bench"
+    extractor.extract_images_with_captions(pdf, outdir, quiet=True, write_threads=0)
+
+    page2 = [row for row in manifest_rows(outdir) if row["page"] == "2"]
+    assert [row["caption"] for row in page2] == ["page2_image2"]
+
+
+def test_caption_above_rows_all_get_their_captions(tmp_path: Path):
+    """With captions above each row, the first row must not take the second row's captions."""
+    rng = random.Random(2)
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    captions = []
+    for row, top in enumerate((100, 320)):
+        for col, left in enumerate((50, 200, 350)):
+            page.insert_image(fitz.Rect(left, top, left + 100, top + 100), stream=benchmark_extraction.make_image(rng, 100))
+            caption = f"M1000000{row}{col} SH2FDC Tee {row}{col}"
+            # Right above the image, and within the below-image window of the row on top
+            page.insert_text((left, top - 8), caption, fontsize=7)
+            captions.append(caption)
+    pdf = tmp_path / "flyer.pdf"
+    doc.save(pdf.as_posix())
+
+    outdir = tmp_path / "public" / "Bench"
+    extractor.extract_images_with_captions(pdf, outdir, quiet=True, write_threads=0)
+
+    assert [row["caption"] for row in manifest_rows(outdir)] == captions
+
+
+def test_banner_image_placed_again_under_another_caption_is_skipped(tmp_path: Path):
+    """The hash of a skipped banner still counts for duplicates, as before lazy reads."""
+    image = benchmark_extraction.make_image(random.Random(4), 100)
+    doc = fitz.open()
+    for caption in ("M100000001 SH2FDC Banner 3x5", "M100000002 SH2FDC Custom Logo Tee"):
+        # Separate documents, so the same bytes end up in two image objects
+        part = fitz.open()
+        page = part.new_page(width=612, height=792)
+        page.insert_image(fitz.Rect(50, 50, 150, 175), stream=image)
+        page.insert_text((50, 184), caption, fontsize=7)
+        doc.insert_pdf(part)
+    assert len({img[0] for pno in range(2) for img in doc[pno].get_images()}) == 2
+    pdf = tmp_path / "flyer.pdf"
+    doc.save(pdf.as_posix())
+
+    outdir = tmp_path / "public" / "Bench"
+    stats = {}
+    extractor.extract_images_with_captions(pdf, outdir, quiet=True, write_threads=0, stats=stats)
+
+    assert manifest_rows(outdir) == []
+    assert stats["banners"] == 1 and stats["duplicates"] == 1
+
+
+def test_sweep_counts_follow_the_evaluated_setting(tmp_path: Path):
+    rng = random.Random(5)
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    page.insert_image(fitz.Rect(50, 50, 150, 175), stream=benchmark_extraction.make_image(rng, 100))
+    page.insert_image(fitz.Rect(160, 50, 260, 175), stream=benchmark_extraction.make_image(rng, 100))
+    # Overlaps 10% of the left image and is centred under the right one
+    page.insert_text((140, 190), "M100000001 SH2FDC Custom Logo Tee Shirt in Maroon and Gray", fontsize=8)
+    pdf = tmp_path / "flyer.pdf"
+    doc.save(pdf.as_posix())
+
+    bboxes = [placement["bbox"] for placement in extractor.images_from_page(doc[0])]
+    lines = extractor.parse_page(doc[0])["lines"]
+    assert extractor.assign_captions(bboxes[:1], lines, min_overlap_ratio=0.05) == [lines[0][0]]
+    assert extractor.assign_captions(bboxes[:1], lines, min_overlap_ratio=0.3) == [None]
+
+    results = extractor.sweep_caption_parameters(pdf, [110], [0.05, 0.3])
+    # Both images fit the line at 0.05 and the left one loses it; at 0.3 only the right one fits
+    assert [(r["fallbacks"], r["displaced"], r["unmatched_captions"]) for r in results] == [(1, 1, 0), (1, 0, 0)]
+
+
+def test_overrides_pin_curated_items_ahead_of_rules():
+    rules = extractor.CategoryRules(
+        [{"id": "hat", "category": "hat", "keywords": ["hat"]}],
+        {"id": "default", "category": "tshirt/men"},
+        overrides={"M100438383": "tshirt/women", "M100485992": "hat"},
+    )
+
+    assert rules.categorize("M100438383 SH2FDW Custom Hat DTFN on Forest") == "tshirt/women"
+    assert rules.categorize("M100485992 SHE2CH Custom Spartan on Green") == "hat"
+    assert rules.categorize("M100000001 Custom Spartan on Green") == "tshirt/men"
+    assert rules.hits["override"] == 2
@@ -0,0 +1,49 @@
+import json
+import threading
+from pathlib import Path
+
+import extract_pdf_images_with_captions as extractor
+
+
+def test_results_through_waits_only_for_earlier_jobs():
+    writer = extractor.BackgroundWriter(threads=2)
+    release = threading.Event()
+    try:
+        writer.submit(1, "slow", release.wait)
+        writer.submit(1, "fast", lambda: "fast")
+        first = writer.submitted
+        assert writer.results_through(0) == []
+        assert writer.results_through(first) is None
+
+        release.set()
+        assert writer.flush() == [True, "fast"]
+        assert writer.results_through(first) == []
+    finally:
+        release.set()
+        writer.close()
+
+
+def test_pages_are_checkpointed_without_waiting_for_writes(flyer: Path, tmp_path: Path, monkeypatch):
+    outdir = tmp_path / "public" / "Bench"
+    flushes = []
+    flush = extractor.ImageWriter.flush
+
+    def counting_flush(self):
+        flushes.append(self)
+        flush(self)
+
+    entries = []
+    write = extractor.Checkpoint.write
+
+    def recording_write(self, entry):
+        entries.append(json.loads(json.dumps(entry)))
+        write(self, entry)
+
+    monkeypatch.setattr(extractor.ImageWriter, "flush", counting_flush)
+    monkeypatch.setattr(extractor.Checkpoint, "write", recording_write)
+    extractor.extract_images_with_captions(flyer, outdir, quiet=True, write_threads=2)
+
+    # Only commit() waits for the writes; pages are checkpointed in order
+    assert len(flushes) == 1
+    pages = [entry["page"] for entry in entries]
+    assert pages == list(range(len(pages)))
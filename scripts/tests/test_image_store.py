@@ -0,0 +1,16 @@
+from pathlib import Path
+
+import pytest
+
+import extract_pdf_images_with_captions as extractor
+
+
+@pytest.mark.parametrize("link_mode", extractor.ImageStore.LINK_MODES)
+def test_rerun_leaves_no_tmp_files(flyer: Path, tmp_path: Path, link_mode: str):
+    outdir = tmp_path / "public" / "Bench"
+    store = extractor.ImageStore(tmp_path / extractor.STORE_DIRNAME, link_mode)
+    for _ in range(2):
+        extractor.extract_images_with_captions(flyer, outdir, store=store, quiet=True)
+
+    assert not list(tmp_path.rglob("*.tmp"))
+    assert list(outdir.rglob("*.png"))
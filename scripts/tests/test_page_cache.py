@@ -0,0 +1,45 @@
+import os
+import time
+from pathlib import Path
+
+import extract_pdf_images_with_captions as extractor
+
+
+def fill(cache: extractor.PageCache, keys):
+    for key in keys:
+        cache.put(key, {"height": 792.0, "lines": [], "images": []})
+
+
+def test_get_survives_an_entry_evicted_meanwhile(tmp_path: Path, monkeypatch):
+    cache = extractor.PageCache(tmp_path / "cache")
+    fill(cache, ["a"])
+
+    def evicted(path, *args, **kwargs):
+        os.unlink(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(extractor.os, "utime", evicted)
+    assert cache.get("a") is None
+
+
+def test_evict_skips_temp_files_and_vanished_entries(tmp_path: Path, monkeypatch):
+    cache = extractor.PageCache(tmp_path / "cache", max_bytes=0)
+    fill(cache, ["a", "b", "c"])
+    writing = cache.cache_dir / "d.json.123.tmp"
+    writing.write_text("{")
+    stale = cache.cache_dir / "e.json.456.tmp"
+    stale.write_text("{")
+    old = time.time() - 2 * cache.STALE_TMP_SECONDS
+    os.utime(stale, (old, old))
+
+    # Another process evicts "b" after this one listed the directory
+    unlink = Path.unlink
+
+    def racing_unlink(self, *args, **kwargs):
+        if self.name == "b.json":
+            unlink(self)
+        return unlink(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "unlink", racing_unlink)
+    assert cache.evict() == 2
+    assert sorted(path.name for path in cache.cache_dir.iterdir()) == ["d.json.123.tmp"]
@@ -0,0 +1,32 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import extract_pdf_images_with_captions as extractor
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def save_png(path: Path, size: tuple) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, (120, 30, 40)).save(path)
+
+
+def test_tall_image_and_broken_category_dont_abort(tmp_path: Path):
+    save_png(tmp_path / "banner-like" / "tall.png", (100, 20000))
+    save_png(tmp_path / "banner-like" / "small.png", (100, 120))
+    (tmp_path / "beanie").mkdir()
+    (tmp_path / "beanie" / "broken.png").write_bytes(b"not an image")
+    save_png(tmp_path / "hat" / "ok.png", (100, 120))
+    category_image_map = {"banner-like": ["small.png", "tall.png"], "beanie": ["broken.png"], "hat": ["ok.png"]}
+
+    rebuilt = extractor.build_sprites(tmp_path, category_image_map, {}, width=160)
+
+    assert rebuilt == 2
+    with open(tmp_path / extractor.SPRITE_DIRNAME / "banner-like.json", encoding="utf-8") as f:
+        sprite_map = json.load(f)
+    assert all(sheet["height"] <= extractor.SPRITE_MAX_HEIGHT for sheet in sprite_map["sheets"])
+    assert sprite_map["images"]["tall.png"]["h"] == extractor.SPRITE_MAX_HEIGHT
+    assert (tmp_path / extractor.SPRITE_DIRNAME / "hat.json").exists()
+    assert not (tmp_path / extractor.SPRITE_DIRNAME / "beanie.json").exists()
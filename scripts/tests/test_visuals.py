@@ -0,0 +1,47 @@
+import csv
+import random
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+import benchmark_extraction
+import extract_pdf_images_with_captions as extractor
+
+
+def flat_png(width: int, rgb: bytes) -> bytes:
+    return fitz.Pixmap(fitz.csRGB, width, width, rgb * (width * width), 0).tobytes("png")
+
+
+def test_undecodable_and_flat_images_are_written_without_near_duplicate_matches(tmp_path: Path):
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    images = [
+        benchmark_extraction.make_image(random.Random(3), 100),
+        flat_png(100, b"\xff\xff\xff"),
+        flat_png(120, b"\x80\x80\x80"),
+    ]
+    xrefs = []
+    for n, image in enumerate(images):
+        left = 50 + 150 * n
+        xrefs.append(page.insert_image(fitz.Rect(left, 50, left + 100, 175), stream=image))
+        page.insert_text((left, 190), f"M10000000{n} SH2FDC Tee {n}", fontsize=7)
+    # A JPEG stream MuPDF can't decode
+    doc.update_stream(xrefs[0], b"\xff\xd8\xff\xe0 not a jpeg", compress=False)
+    doc.xref_set_key(xrefs[0], "Filter", "/DCTDecode")
+    pdf = tmp_path / "flyer.pdf"
+    doc.save(pdf.as_posix())
+
+    outdir = tmp_path / "public" / "Bench"
+    extractor.extract_images_with_captions(pdf, outdir, quiet=True, write_threads=0)
+
+    with open(outdir / "manifest.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3 and all((outdir / row["output_path"]).is_file() for row in rows)
+    assert all(row[field] == "" for field in extractor.VISUAL_FIELDS for row in rows[:1])
+    assert not any(row["near_duplicate_of"] for row in rows)
+
+
+def test_dhash_bits_ignores_missing_and_flat_hashes():
+    assert extractor.dhash_bits("") is None
+    assert extractor.dhash_bits("0" * 16) is None
+    assert extractor.dhash_bits("00000000000000ff") == 255
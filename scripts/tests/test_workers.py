@@ -0,0 +1,31 @@
+import csv
+from pathlib import Path
+
+import extract_pdf_images_with_captions as extractor
+
+CAPTIONS = {"max_vertical_gap": 110, "min_overlap_ratio": 0.30}
+
+
+def test_workers_only_decode_images_that_are_kept(flyer: Path):
+    parsed = extractor.parse_page_range(flyer.as_posix(), 0, 2, hash_images=True)
+    placements = [placement for page in parsed for placement in page["images"] if placement["xref"]]
+    assert placements and all(placement.get("hash") and "visuals" not in placement for placement in placements)
+
+    pages = list(extractor.iter_parsed_pages(flyer, workers=2, captions=CAPTIONS))
+    decoded = {placement["hash"] for _, page in pages for placement in page["images"] if placement.get("visuals")}
+    wanted = extractor.placements_to_decode(
+        [(pno, extractor.parse_page_range(flyer.as_posix(), pno, pno + 1, hash_images=True)[0]) for pno in range(2)],
+        CAPTIONS, set(),
+    )
+    assert decoded == {placement["hash"] for _, placement in wanted}
+    assert len(decoded) < len({placement["hash"] for placement in placements})
+
+
+def test_workers_match_a_serial_run(flyer: Path, tmp_path: Path):
+    manifests = []
+    for workers in (1, 2):
+        outdir = tmp_path / f"workers{workers}" / "Bench"
+        extractor.extract_images_with_captions(flyer, outdir, quiet=True, workers=workers)
+        with open(outdir / "manifest.csv", encoding="utf-8", newline="") as f:
+            manifests.append(list(csv.DictReader(f)))
+    assert manifests[0] == manifests[1]